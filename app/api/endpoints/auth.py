@@ -234,3 +234,16 @@ async def new_device_confirmation(
     response.set_cookie(key="Authorization", value=f"Bearer {token}", **cookie_options)
 
     return UserInAuthResponseModel(token=token)
+
+
+@router.get(
+    path="/jwks"
+)
+async def get_jwks() -> dict:
+    """
+    Returns public keys of the access tokens (JWK Set), so other services can verify tokens without calling the API.
+
+    The set is empty for symmetric algorithms (HS256).
+    """
+
+    return TokenService.get_jwks()
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Path
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.common.swagger.responses.dialogs import CREATE_DIALOG_RESPONSES, GET_MY_DIALOGS_RESPONSES, \
-    UPDATE_DIALOG_RESPONSES, DELETE_DIALOG_RESPONSES
+    UPDATE_DIALOG_RESPONSES, DELETE_DIALOG_RESPONSES, GET_DIALOG_MEDIA_RESPONSES
 from app.common.swagger.responses.dialogs.messages.get_dialog_messages import GET_DIALOG_MESSAGES_RESPONSES
 from app.core.ouath.main import get_current_user
 from app.database.main import get_database
@@ -10,9 +10,11 @@ from app.exception.api import APIException
 from app.models.common.object_id import PyObjectId
 from app.models.common.search.skip_and_limit import SkipAndLimitModel
 from app.models.dialog.dialog import DialogInCreateModel, DialogInResponseModel, DialogInUpdateModel
+from app.models.dialog.media import DialogMediaInResponseModel
 from app.models.dialog.messages import DialogMessageInResponseModel
 from app.models.user.user import UserModel
 from app.services.dialog.dialog import DialogService
+from app.services.dialog.media import DialogMediaService
 from app.services.dialog.message import DialogMessageService
 from app.services.websocket.base import SocketSendTypesEnum
 from app.services.websocket.socket import socket_service
@@ -83,6 +85,34 @@ async def get_dialog_messages(
     return await DialogMessageService.get_dialog_messages(dialog_id, body.skip, body.limit, db)
 
 
+@router.get(
+    path="/{dialogId}/media",
+    status_code=200,
+    responses=GET_DIALOG_MEDIA_RESPONSES
+)
+async def get_dialog_media(
+        dialog_id: PyObjectId = Path(..., alias="dialogId"),
+        body: SkipAndLimitModel = Depends(),
+        current_user: UserModel = Depends(get_current_user),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> list[DialogMediaInResponseModel]:
+    """
+    Get media (images gallery) for dialog, newest first
+
+    * **dialogId**: Dialog ID
+    * **skip**: Media count that will be skipped **(number)**
+    * **limit**: Media count that will be returned **(number)**
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    dialog = await DialogService.get_by_id(dialog_id, db)
+    if not dialog or current_user.id not in (dialog.from_user.id, dialog.to_user.id):
+        raise APIException.not_found("Dialog not found.", translation_key="dialogNotFound")
+
+    return await DialogMediaService.get_by_dialog_id(dialog_id, body.skip, body.limit, db)
+
+
 @router.put(
     path="/{dialogId}",
     responses=UPDATE_DIALOG_RESPONSES
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request, Response
+
+from app.services.image.serving import FileServingService
+
+router = APIRouter()
+
+
+@router.api_route(
+    path="/{folder}/{path:path}",
+    methods=["GET", "HEAD"],
+    include_in_schema=False
+)
+async def get_file(folder: str, path: str, request: Request) -> Response:
+    """
+    Returns uploaded file (chat images and avatars) with caching headers, supports byte ranges.
+    """
+
+    return await FileServingService.serve(folder, path, request)
@@ -0,0 +1,44 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header
+
+from app.common.constants import METRICS_TOKEN
+from app.common.swagger.responses.metrics import GET_METRICS_RESPONSES
+from app.exception.api import APIException
+from app.services.metrics.metrics import MetricsService
+
+router = APIRouter()
+
+
+def check_metrics_token(token: Optional[str]) -> None:
+    """
+    Check the token of the internal metrics endpoint (it isn't available to users).
+
+    :param token: Metrics token from the request.
+
+    :raise APIException: If the token is incorrect or the endpoint is disabled.
+    """
+
+    if not METRICS_TOKEN or not token or not secrets.compare_digest(token, METRICS_TOKEN):
+        raise APIException.not_found("Not found.", translation_key="notFound")
+
+
+@router.get(
+    path="",
+    responses=GET_METRICS_RESPONSES
+)
+async def get_metrics(
+        token: Optional[str] = Header(None, alias="X-Metrics-Token")
+) -> dict:
+    """
+    Returns in-process metrics of the current worker (counters, gauges and timings)
+
+    * **X-Metrics-Token**: Internal metrics token, `METRICS_TOKEN` of the app **(header)**
+
+    **Note:** This endpoint is internal, it is disabled unless `METRICS_TOKEN` is configured.
+    """
+
+    check_metrics_token(token)
+
+    return MetricsService.snapshot()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Path, Query
 from motor.motor_asyncio import AsyncIOMotorClient
 
@@ -5,7 +7,8 @@ from app.common.swagger.responses.search import SEARCH_BY_DIALOG_RESPONSES, SEAR
 from app.core.ouath.main import get_current_user
 from app.database.main import get_database
 from app.models.common.object_id import PyObjectId
-from app.models.search.search import SearchResultModel
+from app.models.common.search.skip_and_limit import SkipAndLimitModel
+from app.models.search.search import SearchResultModel, UsersCursor
 from app.models.user.user import UserModel
 from app.services.search.search import SearchService
 
@@ -18,6 +21,7 @@ router = APIRouter()
 async def search_by_dialog(
         query: str = Query(...),
         dialog_id: PyObjectId = Path(..., alias='dialogId'),
+        body: SkipAndLimitModel = Depends(),
         current_user: UserModel = Depends(get_current_user),
         db: AsyncIOMotorClient = Depends(get_database)
 ) -> SearchResultModel:
@@ -26,11 +30,13 @@ async def search_by_dialog(
 
     * **dialogId**: Dialog ID
     * **query**: search query (string)
+    * **skip**: Messages count that will be skipped **(number)**
+    * **limit**: Messages count that will be returned **(number)**
 
     **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
     """
 
-    return await SearchService.search_by_dialog(query, dialog_id, current_user, db)
+    return await SearchService.search_by_dialog(query, dialog_id, current_user, db, body.skip, body.limit)
 
 
 @router.get(
@@ -40,6 +46,8 @@ async def search_by_dialog(
 )
 async def search(
         query: str = Query(...),
+        body: SkipAndLimitModel = Depends(),
+        users_cursor: Optional[UsersCursor] = Query(None, alias="usersCursor"),
         current_user: UserModel = Depends(get_current_user),
         db: AsyncIOMotorClient = Depends(get_database)
 ) -> SearchResultModel:
@@ -47,8 +55,11 @@ async def search(
     Search dialogs, messages and users in whole app
 
     * **query**: search query (string)
+    * **skip**: Messages count that will be skipped **(number)**
+    * **limit**: Messages count that will be returned **(number)**
+    * **usersCursor**: Cursor of the next users page, `usersCursor` from the previous response **(string)**
 
     **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
     """
 
-    return await SearchService.search(query, current_user, db)
+    return await SearchService.search(query, current_user, db, body.skip, body.limit, users_cursor)
@@ -0,0 +1,270 @@
+from fastapi import APIRouter, Depends, Path, Header, Request
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.common.constants import UPLOAD_MAX_CHUNK_SIZE
+from app.common.swagger.responses.uploads import CREATE_UPLOAD_RESPONSES, GET_UPLOAD_RESPONSES, \
+    APPEND_UPLOAD_RESPONSES, FINALIZE_UPLOAD_RESPONSES, DELETE_UPLOAD_RESPONSES
+from app.core.ouath.main import get_current_user
+from app.database.main import get_database
+from app.exception.api import APIException
+from app.exception.body import APIRequestValidationException
+from app.models.common.exceptions.body import RequestValidationDetails
+from app.models.common.object_id import PyObjectId
+from app.models.image.image import ImageInStorageModel
+from app.models.upload.upload import UploadInCreateModel, UploadInResponseModel, UploadModel, UploadInFinalizeModel
+from app.models.user.user import UserModel
+from app.services.dialog.dialog import DialogService
+from app.services.image.files import FileTooLargeError
+from app.services.image.image import ImageService
+from app.services.image.variants import InvalidImageError
+from app.services.upload.upload import UploadService, UploadOffsetError, UploadChecksumError, UploadIncompleteError
+from app.services.websocket.socket import socket_service
+
+router = APIRouter()
+
+
+def build_upload(upload: UploadModel) -> UploadInResponseModel:
+    """
+    Build upload response.
+
+    :param upload: Upload object.
+
+    :return: Upload in response.
+    """
+
+    return UploadInResponseModel(
+        id=upload.id,
+        size=upload.size,
+        offset=upload.offset,
+        chunk_size=UPLOAD_MAX_CHUNK_SIZE,
+        expires_at=upload.expires_at
+    )
+
+
+def offset_conflict(message: str, translation_key: str, offset: int) -> APIException:
+    """
+    Build conflict error with the current offset of the upload (the client resumes from it).
+
+    :param message: Error message.
+    :param translation_key: Error translation key.
+    :param offset: Current offset of the upload.
+
+    :return: API exception.
+    """
+
+    exception = APIException.conflict(message, translation_key=translation_key)
+    exception.headers = {"Upload-Offset": str(offset)}
+
+    return exception
+
+
+async def get_upload(
+        upload_id: PyObjectId = Path(..., alias="uploadId"),
+        current_user: UserModel = Depends(get_current_user),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> UploadModel:
+    """
+    Get upload of the current user by path.
+
+    :raise APIException: If the upload doesn't exist or has expired.
+    """
+
+    upload = await UploadService.get(upload_id, current_user.id, db)
+    if not upload:
+        raise APIException.not_found("Upload not found.", translation_key="uploadNotFound")
+
+    return upload
+
+
+@router.post(
+    path="",
+    responses=CREATE_UPLOAD_RESPONSES
+)
+async def create_upload(
+        body: UploadInCreateModel,
+        current_user: UserModel = Depends(get_current_user),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> UploadInResponseModel:
+    """
+    Create resumable upload
+
+    * **size**: File size in bytes **(number)**
+    * **checksum**: SHA-256 of the file (hex), it is verified when the upload is finalized **(optional)**
+
+    The file is sent in chunks of at most **chunkSize** bytes with `PATCH /uploads/{uploadId}`, then the upload is
+    finalized with `POST /uploads/{uploadId}/finalize`. Unfinished uploads expire at **expiresAt**.
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    try:
+        upload = await UploadService.create(current_user.id, body.size, db, body.checksum)
+    except FileTooLargeError:
+        raise APIRequestValidationException.from_details([
+            RequestValidationDetails(
+                location="body",
+                message="File is too large.",
+                translation="fileTooLarge",
+                field="size"
+            )
+        ])
+
+    return build_upload(upload)
+
+
+@router.get(
+    path="/{uploadId}",
+    responses=GET_UPLOAD_RESPONSES
+)
+async def get_upload_state(
+        upload: UploadModel = Depends(get_upload)
+) -> UploadInResponseModel:
+    """
+    Get resumable upload
+
+    * **uploadId**: Upload ID
+
+    An interrupted upload is resumed from the returned **offset**.
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    return build_upload(upload)
+
+
+@router.patch(
+    path="/{uploadId}",
+    responses=APPEND_UPLOAD_RESPONSES
+)
+async def append_upload(
+        request: Request,
+        offset: int = Header(..., alias="Upload-Offset", ge=0),
+        upload: UploadModel = Depends(get_upload),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> UploadInResponseModel:
+    """
+    Append chunk to resumable upload
+
+    * **uploadId**: Upload ID
+    * **Upload-Offset**: Offset of the chunk, the current **offset** of the upload **(header)**
+    * Request body: raw chunk bytes (at most **chunkSize**)
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    chunk_too_large_error = APIRequestValidationException.from_details([
+        RequestValidationDetails(
+            location="body",
+            message="Chunk is too large.",
+            translation="fileTooLarge",
+            field="chunk"
+        )
+    ])
+
+    # The chunk isn't read if it can't be appended.
+    if offset != upload.offset:
+        error = UploadOffsetError(upload.offset)
+        raise offset_conflict(str(error), "uploadOffsetIsNotCorrect", error.offset)
+
+    # The chunk is read up to its limit, so a client can't make the server buffer more.
+    chunk = bytearray()
+    async for part in request.stream():
+        chunk.extend(part)
+        if len(chunk) > UPLOAD_MAX_CHUNK_SIZE:
+            raise chunk_too_large_error
+
+    try:
+        upload = await UploadService.append(upload, offset, chunk, db)
+    except UploadOffsetError as e:
+        raise offset_conflict(str(e), "uploadOffsetIsNotCorrect", e.offset)
+    except FileTooLargeError:
+        raise chunk_too_large_error
+
+    return build_upload(upload)
+
+
+@router.post(
+    path="/{uploadId}/finalize",
+    responses=FINALIZE_UPLOAD_RESPONSES
+)
+async def finalize_upload(
+        body: UploadInFinalizeModel,
+        upload: UploadModel = Depends(get_upload),
+        current_user: UserModel = Depends(get_current_user),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> ImageInStorageModel:
+    """
+    Finalize resumable upload and send it in a message
+
+    * **uploadId**: Upload ID
+    * **dialogId**: Dialog ID, the message with the image is sent to it
+    * **text**: Message text **(optional)**
+
+    The checksum of the file is verified, and the file is stored as an image (resized variants are returned in
+    **variants** by max side in pixels). If the file doesn't match its checksum, the upload is reset to offset 0, so
+    the file is sent again with the same upload. The message is delivered to the participants by websocket (the same as with
+    the websocket `UPLOAD_COMMIT` event).
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    # The dialog is checked before the upload is finalized, so the upload can be retried with another dialog.
+    dialog = await DialogService.get_by_id(body.dialog_id, db)
+    if not dialog or current_user.id not in (dialog.from_user.id, dialog.to_user.id):
+        raise APIException.not_found("Dialog not found.", translation_key="dialogNotFound")
+
+    recipient_id = dialog.to_user.id if dialog.from_user.id == current_user.id else dialog.from_user.id
+
+    is_user_can_send_message = await socket_service.check_if_user_can_send_message(current_user.id, recipient_id, db)
+    if not is_user_can_send_message:
+        raise APIException.forbidden("You can't send messages to this user.", translation_key="cantSendMessage")
+
+    try:
+        path, digest = await UploadService.complete(upload, db)
+    except UploadIncompleteError as e:
+        raise offset_conflict(str(e), "uploadIsNotComplete", upload.offset)
+    except UploadChecksumError:
+        raise APIRequestValidationException.from_details([
+            RequestValidationDetails(
+                location="body",
+                message="File doesn't match its checksum.",
+                translation="checksumIsNotCorrect",
+                field="file"
+            )
+        ])
+
+    try:
+        image = await ImageService.upload_file(path, digest, db, upload.folder)
+    except InvalidImageError:
+        raise APIRequestValidationException.from_details([
+            RequestValidationDetails(
+                location="body",
+                message="Invalid file type.",
+                translation="invalidFileType",
+                field="file"
+            )
+        ])
+
+    await socket_service.create_message(current_user.id, recipient_id, dialog.id, body.text, image, db)
+
+    return image
+
+
+@router.delete(
+    path="/{uploadId}",
+    status_code=204,
+    responses=DELETE_UPLOAD_RESPONSES
+)
+async def delete_upload(
+        upload: UploadModel = Depends(get_upload),
+        db: AsyncIOMotorClient = Depends(get_database)
+) -> None:
+    """
+    Cancel resumable upload
+
+    * **uploadId**: Upload ID
+
+    **Note:** This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
+    """
+
+    await UploadService.delete(upload, db)
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends, UploadFile, File, Response
 from fastapi.encoders import jsonable_encoder
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.common.constants import MAX_AVATAR_SIZE
 from app.common.swagger.responses.users import GET_ME_RESPONSES, GET_MY_SESSIONS_RESPONSES, \
     GET_MY_BLOCKED_USERS_RESPONSES, UPDATE_ME_RESPONSES, UPDATE_MY_AVATAR_RESPONSES, BLACKLIST_USER_RESPONSES
 from app.common.swagger.responses.users.delete_me import DELETE_ME_RESPONSES
@@ -19,7 +20,10 @@ from app.models.user.sessions import UserSessionInResponseModel, UserSessionType
 from app.models.user.user import UserModel, UserInUpdateModel, UserInResponseModel
 from app.services.dialog.dialog import DialogService
 from app.services.dialog.message import DialogMessageService
+from app.services.image.files import FileTooLargeError
 from app.services.image.image import ImageService
+from app.services.image.variants import InvalidImageError
+from app.services.search.cache import SearchCacheService
 from app.services.user.blacklist import BlacklistService
 from app.services.user.sessions import UserSessionService
 from app.services.user.user import UserService
@@ -134,6 +138,7 @@ async def update_me(
             setattr(current_user.settings, key, value)
 
     await UserService.update(current_user, db)
+    SearchCacheService.invalidate_profile(current_user.id)
 
     return body.dict(exclude_unset=True, by_alias=True)
 
@@ -152,47 +157,53 @@ async def update_avatar(
 
     * Allowed file types: **jpg, jpeg, png**
     * Max file size: **5MB**
+    * Resized variants (WebP by default) are returned in **photoVariants** by max side in pixels
 
     **Note**: This endpoint is protected by OAuth2 scheme. It requires a valid access token to be sent in the **Authorization** header or cookie.
     """
 
-    max_file_size = 1024 * 1024 * 5  # 5 MB
     allowed_extensions = ["jpg", "jpeg", "png"]
+    file_too_large_error = RequestValidationDetails(
+        location="file",
+        message="File is too large.",
+        translation="fileIsTooLarge",
+        field="file"
+    )
+    invalid_file_type_error = RequestValidationDetails(
+        location="file",
+        message="Invalid file type.",
+        translation="invalidFileType",
+        field="file"
+    )
 
     # Allow to add image from bytes array.
     if isinstance(file, bytes):
-        filename = await ImageService.upload_bytes_image(file, "avatars")
+        try:
+            image = await ImageService.upload_bytes_image(file, db, "avatars", MAX_AVATAR_SIZE)
+        except FileTooLargeError:
+            raise APIRequestValidationException.from_details([file_too_large_error])
+        except InvalidImageError:
+            raise APIRequestValidationException.from_details([invalid_file_type_error])
 
-        current_user.photo_url = filename
-        await ImageService.delete_image(current_user.photo_url, "avatars")
-        await UserService.update(current_user, db)
+        await UserService.set_avatar(image, current_user, db)
+        SearchCacheService.invalidate_profile(current_user.id)
 
-        return {"photoURL": filename}
+        return {"photoURL": image.url, "photoVariants": image.variants}
 
-    error = None
     if file.filename.split(".")[-1] not in allowed_extensions:
-        error = RequestValidationDetails(
-            location="file",
-            message="Invalid file type.",
-            translation="invalidFileType",
-            field="file"
-        )
+        raise APIRequestValidationException.from_details([invalid_file_type_error])
 
-    if len(await file.read()) > max_file_size:
-        error = RequestValidationDetails(
-            location="file",
-            message="File is too large.",
-            translation="fileIsTooLarge",
-            field="file"
-        )
+    # The size is checked while the file is streamed to disk, the real format is checked when it is processed.
+    try:
+        await UserService.update_avatar(file, current_user, db)
+    except FileTooLargeError:
+        raise APIRequestValidationException.from_details([file_too_large_error])
+    except InvalidImageError:
+        raise APIRequestValidationException.from_details([invalid_file_type_error])
 
-    if error:
-        raise APIRequestValidationException.from_details([error])
+    SearchCacheService.invalidate_profile(current_user.id)
 
-    await ImageService.delete_image(current_user.photo_url, "avatars")
-    await UserService.update_avatar(file, current_user, db)
-
-    return {"photoURL": current_user.photo_url}
+    return {"photoURL": current_user.photo_url, "photoVariants": current_user.photo_variants}
 
 
 @router.post(
@@ -213,6 +224,7 @@ async def block_or_unblock_user(
     """
 
     blocked_state = await BlacklistService.block_or_unblock_user(body, current_user, db)
+    SearchCacheService.invalidate_users([current_user.id, body.blacklisted_user_id])
 
     user = await UserService.build_user_response(current_user, db)
 
@@ -263,16 +275,13 @@ async def delete_me(
 
     socket_service.emit_to_user(SocketSendTypesEnum.DELETE_USER, current_user.id, {})
 
-    connections = socket_service.find_connections_by_user_id(current_user.id)
-    if not connections:
-        return None
-
-    for connection in connections:
-       await socket_service.disconnect(connection.websocket)
+    for connection in socket_service.find_connections_by_user_id(current_user.id):
+        await socket_service.disconnect(connection.websocket)
 
     await DialogService.delete_all_dialogs(current_user.id, db)
     await DialogMessageService.delete_all_messages(current_user.id, db)
 
     await UserService.delete(current_user, db)
+    SearchCacheService.invalidate_profile(current_user.id)
 
     return None
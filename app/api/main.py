@@ -4,6 +4,8 @@ from app.api.endpoints.auth import router as auth_router
 from app.api.endpoints.users import router as users_router
 from app.api.endpoints.dialogs import router as dialogs_router
 from app.api.endpoints.search import router as search_router
+from app.api.endpoints.metrics import router as metrics_router
+from app.api.endpoints.uploads import router as uploads_router
 from app.api.endpoints.test.main import router as test_router
 
 router = APIRouter()
@@ -15,4 +17,6 @@ router.include_router(auth_router, tags=["Authentication"], prefix="/auth")
 router.include_router(users_router, tags=["Users"], prefix="/users")
 router.include_router(dialogs_router, tags=["Dialogs"], prefix="/dialogs")
 router.include_router(search_router, tags=["Search"], prefix="/search")
+router.include_router(uploads_router, tags=["Uploads"], prefix="/uploads")
+router.include_router(metrics_router, tags=["Metrics"], prefix="/metrics")
 router.include_router(test_router, tags=["Test"], prefix="/test")
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Micro benchmarks.
+
+Every module is run as a script, e.g. `python -m app.benchmarks.email_templates`.
+"""
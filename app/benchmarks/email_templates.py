@@ -0,0 +1,75 @@
+"""
+Email templates render throughput.
+
+Compares rendering with precompiled (cached) templates against loading the template from the environment on every
+render (the previous behaviour).
+
+Usage: python -m app.benchmarks.email_templates [--iterations 2000]
+"""
+import argparse
+import time
+
+from jinja2 import Environment, PackageLoader, select_autoescape
+
+from app.models.user.settings import LanguagesEnum
+from app.services.mail.templates import EmailTemplateService
+
+TEMPLATES = {
+    "activation": {"username": "john", "url": "http://localhost:5173/activation?token=token"},
+    "reset_password": {"username": "john", "url": "http://localhost:5173/reset-password?token=token"},
+    "new_device": {"username": "john", "secret": "123456"},
+    "two_factor": {"username": "john", "secret": "123456"},
+}
+
+
+def benchmark(title: str, render, iterations: int) -> None:
+    """
+    Render all templates `iterations` times and print the throughput.
+
+    :param title: Benchmark title.
+    :param render: Render function (template name, variables) -> HTML.
+    :param iterations: Count of renders of every template.
+    """
+
+    started_at = time.perf_counter()
+
+    for _ in range(iterations):
+        for name, variables in TEMPLATES.items():
+            render(name, variables)
+
+    elapsed = time.perf_counter() - started_at
+    renders = iterations * len(TEMPLATES)
+
+    print(f"{title:<24} {renders / elapsed:>10.0f} renders/s ({elapsed * 1000 / renders:.3f} ms per render)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Environment without caches: every render loads and compiles the template.
+    uncached_env = Environment(
+        loader=PackageLoader("app", "templates"),
+        autoescape=select_autoescape(["html"]),
+        cache_size=0
+    )
+    benchmark(
+        "uncached",
+        lambda name, variables: uncached_env.get_template(f"{name}.html").render(**variables),
+        max(args.iterations // 20, 1)
+    )
+
+    started_at = time.perf_counter()
+    EmailTemplateService.load_templates()
+    print(f"{'precompile':<24} {(time.perf_counter() - started_at) * 1000:>10.1f} ms")
+
+    benchmark(
+        "precompiled",
+        lambda name, variables: EmailTemplateService.render(name, LanguagesEnum.ENGLISH, **variables),
+        args.iterations
+    )
+
+
+if __name__ == "__main__":
+    main()
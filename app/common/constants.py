@@ -6,12 +6,111 @@ import os
 USERS_COLLECTION = "users"
 DIALOGS_COLLECTION = "dialogs"
 DIALOG_MESSAGES_COLLECTION = "dialog_messages"
+DIALOG_MEDIA_COLLECTION = "dialog_media"
+MAIL_OUTBOX_COLLECTION = "mail_outbox"
+IMAGE_BLOBS_COLLECTION = "image_blobs"
+UPLOADS_COLLECTION = "uploads"
 
 PUBLIC_FOLDER = "public"
 
+# Folders of uploaded images (inside the public folder) and cache lifetime of content-addressed files (in seconds).
+IMAGE_FOLDERS = ("uploads", "avatars")
+IMMUTABLE_FILE_MAX_AGE = 365 * 24 * 60 * 60
+
+# File uploads: size of the I/O thread pool, chunk size and max size (in bytes) of chat images and avatars.
+FILE_IO_WORKERS = int(os.getenv("FILE_IO_WORKERS", "4"))
+FILE_CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+MAX_AVATAR_SIZE = int(os.getenv("MAX_AVATAR_SIZE", str(5 * 1024 * 1024)))
+
+# Resumable uploads: max size of a chunk (in bytes) and lifetime of an unfinished upload (in seconds).
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(512 * 1024)))
+UPLOAD_EXPIRATION = int(os.getenv("UPLOAD_EXPIRATION", str(24 * 60 * 60)))
+
+# Image variants: size of the processing pool, max sides (in pixels) of the resized variants, their format (WEBP or
+# JPEG) and encoding quality.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+IMAGE_VARIANT_SIZES = tuple(int(size) for size in os.getenv("IMAGE_VARIANT_SIZES", "64,320,1280").split(","))
+IMAGE_VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT", "WEBP").upper()
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+
+# Garbage collection of unreferenced images: interval between runs and grace period (in seconds), images per batch.
+IMAGE_GC_INTERVAL = float(os.getenv("IMAGE_GC_INTERVAL", "600"))
+IMAGE_GC_GRACE_PERIOD = float(os.getenv("IMAGE_GC_GRACE_PERIOD", "3600"))
+IMAGE_GC_BATCH_SIZE = int(os.getenv("IMAGE_GC_BATCH_SIZE", "100"))
+
+# Sweeping of orphaned files (not referenced by messages or users): interval between batches and grace period (in
+# seconds), files per batch.
+ORPHAN_SWEEP_INTERVAL = float(os.getenv("ORPHAN_SWEEP_INTERVAL", "60"))
+ORPHAN_SWEEP_GRACE_PERIOD = float(os.getenv("ORPHAN_SWEEP_GRACE_PERIOD", "86400"))
+ORPHAN_SWEEP_BATCH_SIZE = int(os.getenv("ORPHAN_SWEEP_BATCH_SIZE", "500"))
+# Comma separated previous URLs of the app (file URLs keep the host they were created with), references with them
+# are also checked by the sweeper.
+ORPHAN_SWEEP_URL_ALIASES = os.getenv("ORPHAN_SWEEP_URL_ALIASES", "")
+
+# Count of generated avatars cached by initials and palette.
+AVATAR_CACHE_SIZE = 4096
+
 FRONTEND_URL = os.getenv("CLIENT_URL", "http://localhost:5173")
 SELF_URL = os.getenv("APP_URL", "http://localhost:8000")
 
+# Token of the internal metrics endpoint (it is sent in the `X-Metrics-Token` header), the endpoint is disabled if
+# the token is empty.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Bcrypt cost of new password hashes (existing hashes are rehashed on login) and size of the hashing thread pool.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_MAX_WORKERS = int(os.getenv("HASH_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Outbound HTTP client: timeout (in seconds), connections pool size and concurrent requests per host.
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "2"))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+HTTP_CLIENT_MAX_PER_HOST = int(os.getenv("HTTP_CLIENT_MAX_PER_HOST", "10"))
+# Share of requests that can be retried, consecutive failures that open the circuit of the host and its cooldown.
+HTTP_CLIENT_RETRY_BUDGET = float(os.getenv("HTTP_CLIENT_RETRY_BUDGET", "0.1"))
+HTTP_CLIENT_BREAKER_FAILURES = int(os.getenv("HTTP_CLIENT_BREAKER_FAILURES", "5"))
+HTTP_CLIENT_BREAKER_COOLDOWN = float(os.getenv("HTTP_CLIENT_BREAKER_COOLDOWN", "30"))
+
+# Path to the GeoIP database in MaxMind DB format (if empty, locations are unknown) and the count of cached locations.
+GEOIP_DATABASE = os.getenv("GEOIP_DATABASE", "")
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", "10000"))
+
+# Comma separated IP-addresses/networks of reverse proxies whose `X-Forwarded-For` header is trusted.
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")
+
+# Mail worker: count of workers, outbox poll interval and idle time before the SMTP connection is closed (seconds).
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_POLL_INTERVAL = float(os.getenv("MAIL_POLL_INTERVAL", "5"))
+MAIL_SMTP_IDLE_TIMEOUT = float(os.getenv("MAIL_SMTP_IDLE_TIMEOUT", "60"))
+# Retries with exponential backoff (delays in seconds) and the lock of a claimed email.
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_DELAY = float(os.getenv("MAIL_RETRY_DELAY", "10"))
+MAIL_MAX_RETRY_DELAY = float(os.getenv("MAIL_MAX_RETRY_DELAY", "600"))
+MAIL_LOCK_TIMEOUT = float(os.getenv("MAIL_LOCK_TIMEOUT", "120"))
+# Directory of the compiled email templates cache (system temp directory by default).
+MAIL_TEMPLATES_CACHE = os.getenv("MAIL_TEMPLATES_CACHE", "")
+# Max count of emails per recipient in the window (in seconds).
+MAIL_RECIPIENT_LIMIT = int(os.getenv("MAIL_RECIPIENT_LIMIT", "10"))
+MAIL_RECIPIENT_WINDOW = float(os.getenv("MAIL_RECIPIENT_WINDOW", "3600"))
+
+# Max count of verified tokens cached by the worker.
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+
+# Login attempts limits per IP, per username and for the whole worker (0 disables a limit) in the sliding window.
+LOGIN_LIMIT_PER_IP = int(os.getenv("LOGIN_LIMIT_PER_IP", "20"))
+LOGIN_LIMIT_PER_USERNAME = int(os.getenv("LOGIN_LIMIT_PER_USERNAME", "10"))
+LOGIN_LIMIT_GLOBAL = int(os.getenv("LOGIN_LIMIT_GLOBAL", "200"))
+LOGIN_LIMIT_WINDOW = float(os.getenv("LOGIN_LIMIT_WINDOW", "60"))
+
+# Deadlines (in seconds) of the global search sections, a section that didn't finish in time is returned empty.
+SEARCH_DIALOGS_TIMEOUT = float(os.getenv("SEARCH_DIALOGS_TIMEOUT", "1.5"))
+SEARCH_MESSAGES_TIMEOUT = float(os.getenv("SEARCH_MESSAGES_TIMEOUT", "2"))
+SEARCH_USERS_TIMEOUT = float(os.getenv("SEARCH_USERS_TIMEOUT", "1.5"))
+
+# Search results cache: max count of cached sections and their lifetime (in seconds).
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "10000"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+
 cookie_options = {
     "httponly": True,
     "secure": True,
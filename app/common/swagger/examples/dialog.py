@@ -34,7 +34,7 @@ DIALOG_EXAMPLE = DialogInResponseModel(
     id=PyObjectId("5f9f1b9b9b9b9b9b9b9b9b9b"),
     label="Dialog example",
     user=USER_EXAMPLE,
-    images=[],
+    media_count=0,
     unread_messages=1,
     is_pinned=False,
     is_notifications_enabled=True,
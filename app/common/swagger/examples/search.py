@@ -12,7 +12,7 @@ MESSAGES_EXAMPLE = [
         id=PyObjectId("5f9f1b9b9b9b9b9b9b9b9b9b"),
         label="Search example 1",
         user=UserInDialogResponseModel(**USER_EXAMPLE),
-        images=[],
+        media_count=0,
         unread_messages=1,
         is_pinned=False,
         is_notifications_enabled=True,
@@ -25,7 +25,7 @@ MESSAGES_EXAMPLE = [
         id=PyObjectId("5f9f1b9b9b9b9b9b9b9b9b9c"),
         label="Search example 2",
         user=UserInDialogResponseModel(**USER_EXAMPLE),
-        images=[],
+        media_count=0,
         unread_messages=1,
         is_pinned=False,
         is_notifications_enabled=True,
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from app.common.constants import UPLOAD_MAX_CHUNK_SIZE, SELF_URL, PUBLIC_FOLDER, IMAGE_VARIANT_SIZES
+from app.models.common.object_id import PyObjectId
+from app.models.image.image import ImageInStorageModel
+from app.models.upload.upload import UploadInResponseModel
+
+# Upload example model (for swagger).
+UPLOAD_EXAMPLE = UploadInResponseModel(
+    id=PyObjectId("5f9f1b9b9b9b9b9b9b9b9b9b"),
+    size=1048576,
+    offset=524288,
+    chunk_size=UPLOAD_MAX_CHUNK_SIZE,
+    expires_at=datetime(2023, 1, 1),
+)
+
+UPLOAD_EXAMPLE_SCHEMA = UploadInResponseModel.schema()
+
+# Stored image example model (for swagger).
+UPLOADED_IMAGE_EXAMPLE = ImageInStorageModel(
+    url=f"{SELF_URL}/{PUBLIC_FOLDER}/uploads/9f/86/{'9f86d081' * 8}.jpg",
+    variants={
+        str(size): f"{SELF_URL}/{PUBLIC_FOLDER}/uploads/9f/86/{'9f86d081' * 8}_{size}.webp"
+        for size in IMAGE_VARIANT_SIZES
+    },
+)
+
+UPLOADED_IMAGE_EXAMPLE_SCHEMA = ImageInStorageModel.schema()
@@ -62,6 +62,11 @@ USER_EXAMPLE = UserInResponseModel(
     first_name="Test",
     last_name="Test",
     photo_url="https://i.imgur.com/1Q1Z1Zm.png",
+    photo_variants={
+        "64": "https://i.imgur.com/1Q1Z1Zm_64.webp",
+        "320": "https://i.imgur.com/1Q1Z1Zm_320.webp",
+        "1280": "https://i.imgur.com/1Q1Z1Zm.png",
+    },
     is_active=True,
     settings=SETTINGS_EXAMPLE,
     sessions=SESSIONS_EXAMPLE,
@@ -81,5 +81,15 @@ LOGIN_RESPONSES = {
                 'schema': RequestValidationDetails.schema()
             }
         }
+    },
+    429: {
+        'description': 'Too many login attempts (see the `Retry-After` header).',
+        'content': {
+            'application/json': {
+                'example': APIException.too_many_requests("Too many login attempts. Please try again later.", 60,
+                                                          translation_key="tooManyLoginAttempts"),
+                'schema': APIExceptionModel.schema()
+            }
+        }
     }
 }
@@ -1,5 +1,6 @@
 from app.common.swagger.responses.dialogs.create_dialog import CREATE_DIALOG_RESPONSES
 from app.common.swagger.responses.dialogs.delete_dialog import DELETE_DIALOG_RESPONSES
 from app.common.swagger.responses.dialogs.get_my_dialogs import GET_MY_DIALOGS_RESPONSES
+from app.common.swagger.responses.dialogs.media.get_dialog_media import GET_DIALOG_MEDIA_RESPONSES
 from app.common.swagger.responses.dialogs.messages.get_dialog_messages import GET_DIALOG_MESSAGES_RESPONSES
 from app.common.swagger.responses.dialogs.update_dialog import UPDATE_DIALOG_RESPONSES
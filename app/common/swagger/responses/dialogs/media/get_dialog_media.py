@@ -0,0 +1,57 @@
+from fastapi.encoders import jsonable_encoder
+
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.exception.api import APIException
+from app.models.common.exceptions.body import APIRequestValidationModel, RequestValidationDetails
+from app.models.common.object_id import PyObjectId
+from app.models.dialog.media import DialogMediaInResponseModel
+
+GET_DIALOG_MEDIA_RESPONSES = {
+    200: {
+        'description': 'Dialog media fetched successfully.',
+        'content': {
+            'application/json': {
+                'example': [jsonable_encoder(DialogMediaInResponseModel(
+                    id=PyObjectId("60f1b1b1b1b1b1b1b1b1b1c1"),
+                    dialog_id=PyObjectId("5f9f1b9b9b9b9b9b9b9b9b9b"),
+                    message_id=PyObjectId("60f1b1b1b1b1b1b1b1b1b1b1"),
+                    sender_id=PyObjectId("5f9b1b5b9b9b9b9b9b9b9b9b"),
+                    file="http://localhost:8000/public/uploads/image.png",
+                    sent_at="2023-01-01T00:00:00",
+                ))],
+                'schema': DialogMediaInResponseModel.schema()
+            }
+        }
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    404: {
+        'description': 'Dialog not found (or the user isn\'t its participant).',
+        'content': {
+            'application/json': {
+                'example': APIException.not_found("Dialog not found.", translation_key="dialogNotFound")
+            }
+        }
+    },
+    422: {
+        'description': 'Invalid JSON body.',
+        'content': {
+            'application/json': {
+                'examples': {
+                    'Incorrect dialog ID': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="Incorrect Dialog ID.",
+                                    location="query",
+                                    field="dialogId",
+                                    translation="incorrectDialogId"
+                                ),
+                            ]
+                        )
+                    }
+                },
+                'schema': RequestValidationDetails.schema()
+            }
+        }
+    }
+}
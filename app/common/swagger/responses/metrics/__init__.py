@@ -0,0 +1 @@
+from app.common.swagger.responses.metrics.get_metrics import GET_METRICS_RESPONSES
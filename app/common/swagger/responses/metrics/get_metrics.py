@@ -0,0 +1,24 @@
+from app.exception.api import APIException
+
+GET_METRICS_RESPONSES = {
+    200: {
+        'description': 'Metrics fetched successfully.',
+        'content': {
+            'application/json': {
+                'example': {
+                    'counters': {'search_cache_hits{section="users"}': 10},
+                    'gauges': {'search_cache_hit_rate{section="users"}': 0.5},
+                    'timings': {}
+                }
+            }
+        }
+    },
+    404: {
+        'description': 'Metrics token is incorrect (or the metrics endpoint is disabled).',
+        'content': {
+            'application/json': {
+                'example': APIException.not_found("Not found.", translation_key="notFound")
+            }
+        }
+    }
+}
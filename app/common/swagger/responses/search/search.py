@@ -29,6 +29,18 @@ SEARCH_RESPONSES = {
                                 ),
                             ]
                         )
+                    },
+                    'Incorrect users cursor': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="Invalid cursor",
+                                    location="query",
+                                    field="usersCursor",
+                                    translation="cursorIsNotCorrect"
+                                ),
+                            ]
+                        )
                     }
                 },
                 'schema': RequestValidationDetails.schema()
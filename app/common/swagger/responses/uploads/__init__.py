@@ -0,0 +1,5 @@
+from app.common.swagger.responses.uploads.append_upload import APPEND_UPLOAD_RESPONSES
+from app.common.swagger.responses.uploads.create_upload import CREATE_UPLOAD_RESPONSES
+from app.common.swagger.responses.uploads.delete_upload import DELETE_UPLOAD_RESPONSES
+from app.common.swagger.responses.uploads.finalize_upload import FINALIZE_UPLOAD_RESPONSES
+from app.common.swagger.responses.uploads.get_upload import GET_UPLOAD_RESPONSES
@@ -0,0 +1,56 @@
+from app.common.swagger.examples.upload import UPLOAD_EXAMPLE, UPLOAD_EXAMPLE_SCHEMA
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.exception.api import APIException
+from app.models.common.exceptions.body import APIRequestValidationModel, RequestValidationDetails
+
+APPEND_UPLOAD_RESPONSES = {
+    200: {
+        'description': 'Chunk appended successfully.',
+        'content': {
+            'application/json': {
+                'example': UPLOAD_EXAMPLE,
+                'schema': UPLOAD_EXAMPLE_SCHEMA
+            }
+        }
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    404: {
+        'description': 'Upload not found (or expired).',
+        'content': {
+            'application/json': {
+                'example': APIException.not_found("Upload not found.", translation_key="uploadNotFound")
+            }
+        }
+    },
+    409: {
+        'description': 'Chunk doesn\'t start at the current offset (it is returned in the `Upload-Offset` header).',
+        'content': {
+            'application/json': {
+                'example': APIException.conflict("Chunk must start at offset 524288.",
+                                                 translation_key="uploadOffsetIsNotCorrect")
+            }
+        }
+    },
+    422: {
+        'description': 'Invalid chunk.',
+        'content': {
+            'application/json': {
+                'examples': {
+                    'Chunk too large': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="Chunk is too large.",
+                                    location="body",
+                                    field="chunk",
+                                    translation="fileTooLarge"
+                                ),
+                            ]
+                        )
+                    }
+                },
+                'schema': RequestValidationDetails.schema()
+            }
+        }
+    }
+}
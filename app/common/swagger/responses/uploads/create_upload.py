@@ -0,0 +1,50 @@
+from app.common.swagger.examples.upload import UPLOAD_EXAMPLE, UPLOAD_EXAMPLE_SCHEMA
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.models.common.exceptions.body import APIRequestValidationModel, RequestValidationDetails
+
+CREATE_UPLOAD_RESPONSES = {
+    200: {
+        'description': 'Upload created successfully.',
+        'content': {
+            'application/json': {
+                'example': UPLOAD_EXAMPLE,
+                'schema': UPLOAD_EXAMPLE_SCHEMA
+            }
+        }
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    422: {
+        'description': 'Invalid JSON body.',
+        'content': {
+            'application/json': {
+                'examples': {
+                    'File too large': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="File is too large.",
+                                    location="body",
+                                    field="size",
+                                    translation="fileTooLarge"
+                                ),
+                            ]
+                        )
+                    },
+                    'Incorrect checksum': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="Incorrect checksum.",
+                                    location="body",
+                                    field="checksum",
+                                    translation="checksumIsNotCorrect"
+                                ),
+                            ]
+                        )
+                    }
+                },
+                'schema': RequestValidationDetails.schema()
+            }
+        }
+    }
+}
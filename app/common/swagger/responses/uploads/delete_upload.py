@@ -0,0 +1,17 @@
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.exception.api import APIException
+
+DELETE_UPLOAD_RESPONSES = {
+    204: {
+        'description': 'Upload cancelled successfully.'
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    404: {
+        'description': 'Upload not found (or expired).',
+        'content': {
+            'application/json': {
+                'example': APIException.not_found("Upload not found.", translation_key="uploadNotFound")
+            }
+        }
+    }
+}
@@ -0,0 +1,83 @@
+from app.common.swagger.examples.upload import UPLOADED_IMAGE_EXAMPLE, UPLOADED_IMAGE_EXAMPLE_SCHEMA
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.exception.api import APIException
+from app.models.common.exceptions.body import APIRequestValidationModel, RequestValidationDetails
+
+FINALIZE_UPLOAD_RESPONSES = {
+    200: {
+        'description': 'Upload finalized and sent in a message successfully.',
+        'content': {
+            'application/json': {
+                'example': UPLOADED_IMAGE_EXAMPLE,
+                'schema': UPLOADED_IMAGE_EXAMPLE_SCHEMA
+            }
+        }
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    403: {
+        'description': 'The user can\'t send messages to the recipient (one of them blocked the other).',
+        'content': {
+            'application/json': {
+                'example': APIException.forbidden("You can't send messages to this user.",
+                                                  translation_key="cantSendMessage")
+            }
+        }
+    },
+    404: {
+        'description': 'Upload (or dialog) not found.',
+        'content': {
+            'application/json': {
+                'examples': {
+                    'Upload not found': {
+                        'value': APIException.not_found("Upload not found.", translation_key="uploadNotFound")
+                    },
+                    'Dialog not found': {
+                        'value': APIException.not_found("Dialog not found.", translation_key="dialogNotFound")
+                    }
+                }
+            }
+        }
+    },
+    409: {
+        'description': 'Not all bytes are received (the current offset is returned in the `Upload-Offset` header).',
+        'content': {
+            'application/json': {
+                'example': APIException.conflict("Upload isn't complete.", translation_key="uploadIsNotComplete")
+            }
+        }
+    },
+    422: {
+        'description': 'Invalid file (on checksum mismatch the upload is reset to offset 0).',
+        'content': {
+            'application/json': {
+                'examples': {
+                    'Checksum mismatch': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="File doesn't match its checksum.",
+                                    location="body",
+                                    field="file",
+                                    translation="checksumIsNotCorrect"
+                                ),
+                            ]
+                        )
+                    },
+                    'Invalid file type': {
+                        'value': APIRequestValidationModel(
+                            details=[
+                                RequestValidationDetails(
+                                    message="Invalid file type.",
+                                    location="body",
+                                    field="file",
+                                    translation="invalidFileType"
+                                ),
+                            ]
+                        )
+                    }
+                },
+                'schema': RequestValidationDetails.schema()
+            }
+        }
+    }
+}
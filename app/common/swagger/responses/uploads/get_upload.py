@@ -0,0 +1,24 @@
+from app.common.swagger.examples.upload import UPLOAD_EXAMPLE, UPLOAD_EXAMPLE_SCHEMA
+from app.common.swagger.responses.common.not_authorized import USER_NOT_AUTHORIZED_RESPONSE
+from app.exception.api import APIException
+
+GET_UPLOAD_RESPONSES = {
+    200: {
+        'description': 'Upload fetched successfully.',
+        'content': {
+            'application/json': {
+                'example': UPLOAD_EXAMPLE,
+                'schema': UPLOAD_EXAMPLE_SCHEMA
+            }
+        }
+    },
+    401: USER_NOT_AUTHORIZED_RESPONSE,
+    404: {
+        'description': 'Upload not found (or expired).',
+        'content': {
+            'application/json': {
+                'example': APIException.not_found("Upload not found.", translation_key="uploadNotFound")
+            }
+        }
+    }
+}
@@ -27,6 +27,7 @@ description = """
 * Read messages
 * Receive new message notifications from the user
 * Delete recent user sessions
+* Search dialogs, messages and users as you type (results are streamed section by section)
 
 ## Links
 * [GitHub](https://github.com/Real-Time-Messenger/FlyMessenger-server) - Our GitHub repository
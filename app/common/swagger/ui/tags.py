@@ -15,5 +15,9 @@ tags_metadata = [
     {
         "name": "Search",
         "description": "Operations with search",
+    },
+    {
+        "name": "Metrics",
+        "description": "In-process metrics of the worker",
     }
 ]
\ No newline at end of file
@@ -0,0 +1 @@
+from app.common.utils.rate_limit.main import SlidingWindowRateLimiter
@@ -0,0 +1,104 @@
+import time
+from typing import Optional
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window rate limiter.
+
+    The window is approximated with two fixed windows (the previous window count is weighted by its overlap with the
+    sliding window), so every key takes constant memory regardless of the count of hits.
+    """
+
+    # Stale keys are pruned when the store grows by this count of keys.
+    PRUNE_INTERVAL = 1024
+
+    def __init__(self, limit: int, window: float):
+        """
+        :param limit: Max count of hits in the window (0 disables the limiter).
+        :param window: Window size (in seconds).
+        """
+
+        self.limit = limit
+        self.window = window
+
+        # Key -> (start of the current fixed window, count in the current window, count in the previous window)
+        self._windows: dict[str, tuple[float, int, int]] = {}
+        self._prune_at = self.PRUNE_INTERVAL
+
+    def get_retry_after(self, key: str, now: Optional[float] = None) -> float:
+        """
+        Get time until the key can be hit again.
+
+        :param key: Rate limit key (e.g. IP address).
+        :param now: Current time (monotonic).
+
+        :return: Seconds to wait (0 if the key is not limited).
+        """
+
+        if self.limit <= 0:
+            return 0
+
+        now = time.monotonic() if now is None else now
+        start, current, previous = self._get_window(key, now)
+
+        elapsed = (now - start) / self.window
+        if previous * (1 - elapsed) + current < self.limit:
+            return 0
+
+        if current >= self.limit:
+            # The key is limited until the current window becomes the previous one and decays enough.
+            return max(start + self.window * (2 - self.limit / current) - now, 0.001)
+
+        # Wait until the weight of the previous window decays enough.
+        return max(start + self.window * (1 - (self.limit - current) / previous) - now, 0.001)
+
+    def hit(self, key: str, now: Optional[float] = None) -> None:
+        """
+        Count a hit of the key.
+
+        :param key: Rate limit key.
+        :param now: Current time (monotonic).
+        """
+
+        if self.limit <= 0:
+            return
+
+        now = time.monotonic() if now is None else now
+        start, current, previous = self._get_window(key, now)
+        self._windows[key] = (start, current + 1, previous)
+
+        if len(self._windows) >= self._prune_at:
+            self._prune(now)
+
+    def _get_window(self, key: str, now: float) -> tuple[float, int, int]:
+        """
+        Get the current fixed window of the key (the stored window is shifted if it's outdated).
+
+        :param key: Rate limit key.
+        :param now: Current time (monotonic).
+
+        :return: Start of the current window, count in the current window and count in the previous window.
+        """
+
+        current_start = now - now % self.window
+
+        start, current, previous = self._windows.get(key, (current_start, 0, 0))
+        if start == current_start:
+            return start, current, previous
+
+        if start == current_start - self.window:
+            return current_start, 0, current
+
+        return current_start, 0, 0
+
+    def _prune(self, now: float) -> None:
+        """
+        Remove keys which don't have hits in the last two windows.
+
+        :param now: Current time (monotonic).
+        """
+
+        outdated_start = now - now % self.window - self.window
+        self._windows = {key: value for key, value in self._windows.items() if value[0] >= outdated_start}
+        self._prune_at = len(self._windows) + self.PRUNE_INTERVAL
@@ -0,0 +1 @@
+from app.common.utils.search.main import normalize_search_text, split_search_tokens, build_search_prefixes
@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from typing import Optional
+
+# Max length of the stored prefixes (longer query tokens are truncated to it).
+MAX_PREFIX_LENGTH = 20
+
+# Count of ranks of the search keys (see `build_ranked_search_keys`).
+SEARCH_RANKS = 6
+
+
+def normalize_search_text(text: Optional[str]) -> str:
+    """
+    Normalize text for search: lowercase it and strip diacritics (e.g. "Jõgi" -> "jogi").
+
+    :param text: Text to normalize.
+
+    :return: Normalized text.
+    """
+
+    if not text:
+        return ""
+
+    text = unicodedata.normalize("NFKD", text.casefold())
+
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def split_search_tokens(text: Optional[str]) -> list[str]:
+    """
+    Split text into normalized search tokens (words are split by any non-alphanumeric character).
+
+    :param text: Text to split.
+
+    :return: List of tokens (each token is truncated to `MAX_PREFIX_LENGTH`).
+    """
+
+    return [token[:MAX_PREFIX_LENGTH] for token in re.split(r"[\W_]+", normalize_search_text(text)) if token]
+
+
+def build_search_prefixes(*texts: Optional[str]) -> list[str]:
+    """
+    Build all prefixes of all tokens of the texts (for search-as-you-type).
+
+    :param texts: Texts to index.
+
+    :return: Sorted list of unique prefixes.
+    """
+
+    prefixes = set()
+    for text in texts:
+        for token in split_search_tokens(text):
+            prefixes.update(token[:length] for length in range(1, len(token) + 1))
+
+    return sorted(prefixes)
+
+
+def build_ranked_search_keys(
+        username: Optional[str],
+        first_name: Optional[str],
+        last_name: Optional[str],
+        email_name: Optional[str]
+) -> list[str]:
+    """
+    Build search prefixes with their rank (`<rank>:<prefix>`, the lower rank is the better match).
+
+    Every prefix is stored once with its best rank: full username token, username prefix, full name token, name
+    prefix, full email token, email prefix. So the users are ordered by relevance by the index on the keys.
+
+    :param username: Username.
+    :param first_name: First name.
+    :param last_name: Last name.
+    :param email_name: Local part of the email.
+
+    :return: Sorted list of ranked prefixes.
+    """
+
+    ranks = {}
+    for group, texts in enumerate(((username,), (first_name, last_name), (email_name,))):
+        for text in texts:
+            for token in split_search_tokens(text):
+                for length in range(1, len(token) + 1):
+                    rank = group * 2 + (0 if length == len(token) else 1)
+                    ranks[token[:length]] = min(rank, ranks.get(token[:length], rank))
+
+    return sorted(f"{rank}:{prefix}" for prefix, rank in ranks.items())
+
+
+def get_ranked_search_keys(token: str) -> list[str]:
+    """
+    Get the search keys of the token with every rank.
+
+    :param token: Search token.
+
+    :return: List of ranked keys.
+    """
+
+    return [f"{rank}:{token}" for rank in range(SEARCH_RANKS)]
@@ -0,0 +1,6 @@
+"""
+One-off data migrations.
+
+Every migration is a module with an async `migrate(db)` function and can be run directly, e.g.:
+    python -m app.database.migrations.dialog_media
+"""
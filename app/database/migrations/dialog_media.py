@@ -0,0 +1,53 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.common.constants import DIALOG_MESSAGES_COLLECTION, DIALOG_MEDIA_COLLECTION
+from app.database.main import get_database
+
+
+async def migrate(db: AsyncIOMotorClient, batch_size: int = 1000) -> int:
+    """
+    Backfill the dialog media index from the existing messages with a file.
+
+    The migration is idempotent: entries are upserted by message ID.
+
+    :param db: Database connection object.
+    :param batch_size: Count of messages written per bulk operation.
+
+    :return: Count of processed messages.
+    """
+
+    processed = 0
+    operations = []
+
+    messages = db[DIALOG_MESSAGES_COLLECTION].find({"file": {"$ne": None}})
+    async for message in messages:
+        operations.append(UpdateOne(
+            {"messageId": message["_id"]},
+            {"$setOnInsert": {
+                "dialogId": message["dialogId"],
+                "messageId": message["_id"],
+                "senderId": message["senderId"],
+                "file": message["file"],
+                "sentAt": message["sentAt"],
+            }},
+            upsert=True
+        ))
+
+        if len(operations) == batch_size:
+            await db[DIALOG_MEDIA_COLLECTION].bulk_write(operations, ordered=False)
+            processed += len(operations)
+            operations = []
+
+    if operations:
+        await db[DIALOG_MEDIA_COLLECTION].bulk_write(operations, ordered=False)
+        processed += len(operations)
+
+    return processed
+
+
+if __name__ == "__main__":
+    count = asyncio.run(migrate(get_database()))
+    print(f"Indexed {count} media messages.")
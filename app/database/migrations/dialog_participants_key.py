@@ -0,0 +1,63 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+from app.common.constants import DIALOGS_COLLECTION, DIALOG_MESSAGES_COLLECTION, DIALOG_MEDIA_COLLECTION
+from app.database.main import get_database
+from app.database.utils import create_participants_key_index
+from app.models.dialog.dialog import DialogModel
+
+
+async def migrate(db: AsyncIOMotorClient) -> tuple[int, int]:
+    """
+    Backfill the canonical participants key for the existing dialogs.
+
+    Dialogs are keyed from the oldest one, so the oldest dialog of a pair is kept. Dialogs which duplicate an already
+    keyed pair (created by the old check-then-insert race) are merged into it: their messages and media are moved to
+    the kept dialog, then they are removed. The migration can be run again if it was interrupted.
+
+    :param db: Database connection object.
+
+    :return: Count of updated dialogs and count of merged duplicates.
+    """
+
+    # Duplicates are detected by the unique index, so it must exist before dialogs are keyed.
+    await create_participants_key_index(db)
+
+    updated = 0
+    merged = 0
+
+    dialogs = db[DIALOGS_COLLECTION].find({"participantsKey": {"$exists": False}}).sort("_id", 1)
+    async for dialog in dialogs:
+        participants_key = DialogModel.build_participants_key(dialog["fromUser"]["_id"], dialog["toUser"]["_id"])
+
+        try:
+            await db[DIALOGS_COLLECTION].update_one(
+                {"_id": dialog["_id"]},
+                {"$set": {"participantsKey": participants_key}}
+            )
+            updated += 1
+            continue
+        except DuplicateKeyError:
+            pass
+
+        kept_dialog = await db[DIALOGS_COLLECTION].find_one({"participantsKey": participants_key}, {"_id": 1})
+
+        await db[DIALOG_MESSAGES_COLLECTION].update_many(
+            {"dialogId": dialog["_id"]},
+            {"$set": {"dialogId": kept_dialog["_id"]}}
+        )
+        await db[DIALOG_MEDIA_COLLECTION].update_many(
+            {"dialogId": dialog["_id"]},
+            {"$set": {"dialogId": kept_dialog["_id"]}}
+        )
+        await db[DIALOGS_COLLECTION].delete_one({"_id": dialog["_id"]})
+        merged += 1
+
+    return updated, merged
+
+
+if __name__ == "__main__":
+    count, merged_count = asyncio.run(migrate(get_database()))
+    print(f"Updated {count} dialogs, merged {merged_count} duplicated dialogs.")
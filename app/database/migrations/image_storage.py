@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from PIL import Image, UnidentifiedImageError
+from pymongo import UpdateOne
+
+from app.common.constants import DIALOG_MESSAGES_COLLECTION, DIALOG_MEDIA_COLLECTION, USERS_COLLECTION, \
+    IMAGE_BLOBS_COLLECTION, PUBLIC_FOLDER, IMAGE_FOLDERS, FILE_CHUNK_SIZE
+from app.database.main import get_database
+from app.services.image.image import ImageService
+from app.services.image.storage import ImageStorageService
+from app.services.image.variants import IMAGE_EXTENSIONS
+
+# Legacy image URL: `.../<public folder>/<folder>/<file name>` (files were stored flat).
+LEGACY_URL_PATTERN = re.compile(rf"/{re.escape(PUBLIC_FOLDER)}/(?P<folder>[^/]+)/(?P<name>[^/]+)$")
+
+# References to images: collection, URL field and whether the references are counted.
+REFERENCES = (
+    (DIALOG_MESSAGES_COLLECTION, "file", True),
+    (USERS_COLLECTION, "photoURL", True),
+    (DIALOG_MEDIA_COLLECTION, "file", False),
+)
+
+
+def link_legacy_file(folder: str, name: str) -> Optional[dict]:
+    """
+    Link legacy file into the content-addressed layout (the legacy file is kept until references are updated).
+
+    :param folder: Folder name.
+    :param name: Legacy file name.
+
+    :return: Stored image fields (None if the file isn't an image).
+    """
+
+    path = os.path.join(PUBLIC_FOLDER, folder, name)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(FILE_CHUNK_SIZE):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+
+    # Legacy files were always named `.png`, so the extension is taken from the real format.
+    try:
+        with Image.open(path) as image:
+            extension = IMAGE_EXTENSIONS.get(image.format, name.rsplit(".", 1)[-1])
+    except (UnidentifiedImageError, OSError):
+        return None
+
+    shard = ImageStorageService.get_shard(digest)
+    target_name = f"{shard}/{digest}.{extension}"
+    target = os.path.join(PUBLIC_FOLDER, folder, *target_name.split("/"))
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if not os.path.exists(target):
+        try:
+            os.link(path, target)
+        except OSError:
+            # Hard links aren't supported by the file system.
+            temp_path = f"{target}.{os.getpid()}.tmp"
+            with open(path, "rb") as source, open(temp_path, "wb") as destination:
+                while chunk := source.read(FILE_CHUNK_SIZE):
+                    destination.write(chunk)
+            os.replace(temp_path, target)
+
+    return {
+        "_id": ImageStorageService.build_key(folder, digest),
+        "url": ImageService._url(target_name, folder),
+        "files": [f"{folder}/{target_name}"],
+        "size": os.path.getsize(target),
+    }
+
+
+async def rewrite_references(
+        db: AsyncIOMotorClient,
+        collection: str,
+        field: str,
+        is_counted: bool,
+        blobs: dict[tuple[str, str], dict],
+        batch_size: int
+) -> None:
+    """
+    Rewrite references to legacy files.
+
+    :param db: Database connection object.
+    :param collection: Collection name.
+    :param field: URL field.
+    :param is_counted: Whether the references are counted.
+    :param blobs: Stored image fields by folder and name of the legacy file.
+    :param batch_size: Count of documents written per bulk operation.
+    """
+
+    operations, urls = [], []
+
+    async def flush() -> None:
+        if is_counted:
+            await ImageStorageService.add_references(urls, db)
+
+        if operations:
+            await db[collection].bulk_write(operations, ordered=False)
+
+    documents = db[collection].find({field: {"$regex": LEGACY_URL_PATTERN.pattern}}, {field: 1})
+    async for document in documents:
+        match = LEGACY_URL_PATTERN.search(document[field])
+        blob = blobs.get((match.group("folder"), match.group("name"))) if match else None
+        if not blob:
+            continue
+
+        operations.append(UpdateOne(
+            {"_id": document["_id"], field: document[field]},
+            {"$set": {field: blob["url"]}}
+        ))
+        urls.append(blob["url"])
+
+        if len(operations) == batch_size:
+            await flush()
+            operations, urls = [], []
+
+    await flush()
+
+
+async def migrate(db: AsyncIOMotorClient, batch_size: int = 1000) -> int:
+    """
+    Move legacy flat uploads and avatars into the content-addressed sharded layout.
+
+    Every legacy file is linked into the new layout and registered as a stored image, references in messages, media
+    and users are rewritten, then the legacy file is removed. Reference counts are incremented before references are
+    rewritten, so an interrupted migration can only leave extra references (images are kept), and it can be run
+    again.
+
+    :param db: Database connection object.
+    :param batch_size: Count of documents written per bulk operation.
+
+    :return: Count of moved files.
+    """
+
+    loop = asyncio.get_running_loop()
+
+    # Legacy file by folder and name.
+    blobs: dict[tuple[str, str], dict] = {}
+    for folder in IMAGE_FOLDERS:
+        directory = os.path.join(PUBLIC_FOLDER, folder)
+        if not os.path.isdir(directory):
+            continue
+
+        for entry in os.scandir(directory):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+
+            blob = await loop.run_in_executor(None, link_legacy_file, folder, entry.name)
+            if blob:
+                blobs[(folder, entry.name)] = blob
+
+    if not blobs:
+        return 0
+
+    now = datetime.utcnow()
+    for key, blob in {blob["_id"]: blob for blob in blobs.values()}.items():
+        fields = {name: value for name, value in blob.items() if name != "_id"}
+
+        await db[IMAGE_BLOBS_COLLECTION].update_one(
+            {"_id": key},
+            {"$setOnInsert": {**fields, "variants": {}, "refCount": 0, "unreferencedAt": now, "createdAt": now}},
+            upsert=True
+        )
+
+    for collection, field, is_counted in REFERENCES:
+        await rewrite_references(db, collection, field, is_counted, blobs, batch_size)
+
+    for folder, name in blobs:
+        os.remove(os.path.join(PUBLIC_FOLDER, folder, name))
+
+    return len(blobs)
+
+
+if __name__ == "__main__":
+    count = asyncio.run(migrate(get_database()))
+    print(f"Moved {count} files into the content-addressed layout.")
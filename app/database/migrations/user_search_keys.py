@@ -0,0 +1,50 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from app.common.constants import USERS_COLLECTION
+from app.common.utils.search.main import build_ranked_search_keys
+from app.database.main import get_database
+
+
+async def migrate(db: AsyncIOMotorClient, batch_size: int = 1000) -> int:
+    """
+    Build search keys for all existing users.
+
+    The keys are rebuilt for every user, so the migration can also be used after changing the key format.
+
+    :param db: Database connection object.
+    :param batch_size: Count of users written per bulk operation.
+
+    :return: Count of updated users.
+    """
+
+    updated = 0
+    operations = []
+
+    users = db[USERS_COLLECTION].find({}, {"firstName": 1, "lastName": 1, "username": 1, "email": 1})
+    async for user in users:
+        search_keys = build_ranked_search_keys(
+            user.get("username"),
+            user.get("firstName"),
+            user.get("lastName"),
+            (user.get("email") or "").split("@")[0],
+        )
+        operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {"searchKeys": search_keys}}))
+
+        if len(operations) == batch_size:
+            await db[USERS_COLLECTION].bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+
+    if operations:
+        await db[USERS_COLLECTION].bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    return updated
+
+
+if __name__ == "__main__":
+    count = asyncio.run(migrate(get_database()))
+    print(f"Updated search keys of {count} users.")
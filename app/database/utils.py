@@ -1,8 +1,11 @@
 import os
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT
 
-from app.database.main import db, DATABASE_URL
+from app.common.constants import DIALOG_MEDIA_COLLECTION, DIALOGS_COLLECTION, DIALOG_MESSAGES_COLLECTION, \
+    USERS_COLLECTION, MAIL_OUTBOX_COLLECTION, IMAGE_BLOBS_COLLECTION, UPLOADS_COLLECTION
+from app.database.main import db, DATABASE_URL, get_database
 
 
 async def connect_to_mongo():
@@ -11,3 +14,70 @@ async def connect_to_mongo():
 
 async def close_mongo_connection():
     db.client.close()
+
+
+async def create_participants_key_index(database: AsyncIOMotorClient):
+    """
+    Create unique index of dialog participants (it is also required by the backfill migration).
+
+    Only dialogs with the key are indexed, so the index can be built before the backfill migration.
+    """
+
+    await database[DIALOGS_COLLECTION].create_index(
+        "participantsKey",
+        unique=True,
+        partialFilterExpression={"participantsKey": {"$type": "string"}}
+    )
+
+
+async def create_indexes():
+    """
+    Create indexes required by the application.
+
+    Index creation is idempotent, so it is safe to call it on every startup.
+    """
+
+    database = get_database()
+
+    await database[DIALOG_MEDIA_COLLECTION].create_index([("dialogId", ASCENDING), ("sentAt", DESCENDING)])
+
+    await create_participants_key_index(database)
+
+    # Dialog history, last messages and unread counters.
+    await database[DIALOG_MESSAGES_COLLECTION].create_index([("dialogId", ASCENDING), ("sentAt", DESCENDING)])
+
+    # Full-text index for messages search, every message is stemmed by its own `language` field.
+    await database[DIALOG_MESSAGES_COLLECTION].create_index(
+        [("text", TEXT)],
+        default_language="english",
+        language_override="language"
+    )
+
+    # References to files (they are checked by the orphaned files sweeper).
+    await database[DIALOG_MESSAGES_COLLECTION].create_index(
+        "file",
+        partialFilterExpression={"file": {"$type": "string"}}
+    )
+    await database[USERS_COLLECTION].create_index("photoURL")
+
+    # Users search-as-you-type (prefix keys, `_id` is used as the pagination cursor).
+    await database[USERS_COLLECTION].create_index([("searchKeys", ASCENDING), ("_id", ASCENDING)])
+
+    # Mail outbox: due emails, one pending copy of identical emails, per-recipient limits and cleanup of sent emails.
+    await database[MAIL_OUTBOX_COLLECTION].create_index([("status", ASCENDING), ("nextAttemptAt", ASCENDING)])
+    await database[MAIL_OUTBOX_COLLECTION].create_index(
+        "dedupKey",
+        unique=True,
+        partialFilterExpression={"status": "pending"}
+    )
+    await database[MAIL_OUTBOX_COLLECTION].create_index([("recipient", ASCENDING), ("sentAt", ASCENDING)])
+    await database[MAIL_OUTBOX_COLLECTION].create_index("sentAt", expireAfterSeconds=7 * 24 * 60 * 60)
+
+    # Garbage collection of unreferenced images (referenced images have no `unreferencedAt`).
+    await database[IMAGE_BLOBS_COLLECTION].create_index(
+        "unreferencedAt",
+        partialFilterExpression={"unreferencedAt": {"$type": "date"}}
+    )
+
+    # Unfinished uploads expire (their temporary files are removed by the orphaned files sweeper).
+    await database[UPLOADS_COLLECTION].create_index("expiresAt", expireAfterSeconds=0)
@@ -1,4 +1,5 @@
-from typing import Union
+import math
+from typing import Union, Optional
 
 from fastapi import status
 
@@ -6,6 +7,9 @@ from fastapi import status
 class APIException(Exception):
     """ Base class for all API exceptions. """
 
+    # Extra response headers (e.g. `Retry-After`).
+    headers: Optional[dict[str, str]] = None
+
     def __init__(self, code: int, message: str, translation_key: Union[str, None] = None):
         self.code = code
         self.message = message
@@ -33,3 +37,15 @@ class APIException(Exception):
     def not_found(message: str, translation_key: Union[str, None] = None):
         return APIException(code=status.HTTP_404_NOT_FOUND, message=message, translation_key=translation_key)
 
+    @staticmethod
+    def conflict(message: str, translation_key: Union[str, None] = None):
+        return APIException(code=status.HTTP_409_CONFLICT, message=message, translation_key=translation_key)
+
+    @staticmethod
+    def too_many_requests(message: str, retry_after: float, translation_key: Union[str, None] = None):
+        exception = APIException(code=status.HTTP_429_TOO_MANY_REQUESTS, message=message,
+                                 translation_key=translation_key)
+        exception.headers = {"Retry-After": str(max(math.ceil(retry_after), 1))}
+
+        return exception
+
@@ -7,18 +7,32 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import ValidationError
 from starlette import status
 from starlette.exceptions import WebSocketException
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
+from app.api.endpoints.files import router as files_router
 from app.api.main import router as main_router
+from app.common.constants import PUBLIC_FOLDER
 from app.common.swagger.ui.main import swagger_obj
 from app.database.main import get_database
-from app.database.utils import connect_to_mongo, close_mongo_connection
+from app.database.utils import connect_to_mongo, close_mongo_connection, create_indexes
 from app.exception.api import APIException
 from app.exception.body import APIRequestValidationException
 from app.models.common.exceptions.body import APIRequestValidationModel, RequestValidationDetails
+from app.services.hash.hash import HashService
+from app.services.http.client import HttpClientService
+from app.services.image.collector import ImageCollectorService
+from app.services.image.files import FileIOService
+from app.services.image.sweeper import OrphanSweeperService
+from app.services.image.variants import ImageVariantService
+from app.services.location.location import LocationService
+from app.services.mail.templates import EmailTemplateService
+from app.services.mail.worker import MailWorkerService
+from app.services.token.token import TokenService
 from app.services.websocket.socket import socket_service
 
 app = FastAPI(**swagger_obj)
@@ -33,12 +47,37 @@ app.add_middleware(
 
 app.include_router(main_router, prefix="/api")
 
+# Uploaded files are served by the files route, other public files (e.g. logo) are served as static files.
+app.include_router(files_router, prefix=f"/{PUBLIC_FOLDER}")
 
-@app.middleware("http")
-async def decode_response(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["Accept-Encoding"] = "gzip, deflate, br"
-    return response
+
+class DecodeResponseMiddleware:
+    """
+    Adds `Accept-Encoding` header to responses.
+
+    It is a pure ASGI middleware (not `BaseHTTPMiddleware`), so response messages are passed as they are, e.g. files
+    are still sent with the zero-copy send extension.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                MutableHeaders(scope=message)["Accept-Encoding"] = "gzip, deflate, br"
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(DecodeResponseMiddleware)
 
 
 @app.exception_handler(APIException)
@@ -51,7 +90,8 @@ async def api_exception_handler(_: Request, exc: APIException):
             "message": exc.message,
             "code": exc.code,
             "translation": exc.translation_key,
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -89,7 +129,23 @@ async def validation_exception_handler(_: Request, exc: RequestValidationError):
 
 
 app.add_event_handler("startup", connect_to_mongo)
+app.add_event_handler("startup", create_indexes)
+app.add_event_handler("startup", TokenService.load_keys)
+app.add_event_handler("startup", LocationService.open_database)
+app.add_event_handler("startup", HttpClientService.start)
+app.add_event_handler("startup", EmailTemplateService.load_templates)
+app.add_event_handler("startup", MailWorkerService.start)
+app.add_event_handler("startup", ImageCollectorService.start)
+app.add_event_handler("startup", OrphanSweeperService.start)
+app.add_event_handler("shutdown", MailWorkerService.stop)
+app.add_event_handler("shutdown", ImageCollectorService.stop)
+app.add_event_handler("shutdown", OrphanSweeperService.stop)
 app.add_event_handler("shutdown", close_mongo_connection)
+app.add_event_handler("shutdown", HashService.shutdown)
+app.add_event_handler("shutdown", FileIOService.shutdown)
+app.add_event_handler("shutdown", ImageVariantService.shutdown)
+app.add_event_handler("shutdown", LocationService.close_database)
+app.add_event_handler("shutdown", HttpClientService.close)
 
 app.mount("/public", StaticFiles(directory="public", html=True), name="public")
 
@@ -129,7 +185,14 @@ async def websocket_endpoint(
             if not websocket.client_state:
                 continue
 
-            data = await websocket.receive_text()
-            await socket_service.handle_connection(websocket, data, credentials, db)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            # Binary frames carry chunks of uploads, text frames carry events.
+            if message.get("bytes") is not None:
+                await socket_service.handle_binary(websocket, message["bytes"], credentials, db)
+            elif message.get("text") is not None:
+                await socket_service.handle_connection(websocket, message["text"], credentials, db)
     except WebSocketDisconnect:
         await socket_service.disconnect(websocket)
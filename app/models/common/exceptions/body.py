@@ -34,6 +34,13 @@ class InvalidObjectId(PydanticValueError):
     msg_template = 'Invalid ID'
 
 
+class InvalidSearchCursor(PydanticValueError):
+    """ `Invalid search cursor` custom exception. """
+
+    code = 'invalid_search_cursor'
+    msg_template = 'Invalid cursor'
+
+
 class NotCorrectLength(PydanticValueError):
     """ `Not correct length` custom exception. """
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import Field
+from pydantic import Field, root_validator
 
 from app.models.common.mongo.base_model import MongoModel
 from app.models.common.object_id import PyObjectId
@@ -29,6 +29,22 @@ class DialogModel(MongoModel):
     id: PyObjectId = Field(default_factory=PyObjectId)
     from_user: UserInDialogModel = Field(..., alias="fromUser")
     to_user: UserInDialogModel = Field(..., alias="toUser")
+    participants_key: Optional[str] = Field(default=None, alias="participantsKey")
+
+    @staticmethod
+    def build_participants_key(first_user_id: PyObjectId, second_user_id: PyObjectId) -> str:
+        """ Build canonical key of the participant pair (it doesn't depend on who started the dialog). """
+
+        return ":".join(sorted([str(first_user_id), str(second_user_id)]))
+
+    @root_validator(skip_on_failure=True)
+    def set_participants_key(cls, values: dict) -> dict:
+        """ Fill participants key from dialog users (if it is not set yet). """
+
+        if values.get("participants_key") is None:
+            values["participants_key"] = cls.build_participants_key(values["from_user"].id, values["to_user"].id)
+
+        return values
 
 
 class UserInDialogResponseModel(MongoModel):
@@ -39,6 +55,7 @@ class UserInDialogResponseModel(MongoModel):
     first_name: str = Field(..., alias="firstName")
     last_name: Optional[str] = Field(default=None, alias="lastName")
     photo_url: Optional[str] = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
     is_blocked: bool = Field(default=False, alias="isBlocked")
     is_online: Optional[bool] = Field(default=False, alias="isOnline")
     last_activity: Optional[datetime] = Field(default=None, alias="lastActivity")
@@ -51,6 +68,7 @@ class UserInLastMessageModel(MongoModel):
     first_name: str = Field(..., alias="firstName")
     last_name: Optional[str] = Field(default=None, alias="lastName")
     photo_url: Optional[str] = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
 
 
 class LastMessageInDialogModel(MongoModel):
@@ -59,6 +77,7 @@ class LastMessageInDialogModel(MongoModel):
     id: PyObjectId = Field(...)
     text: Optional[str] = Field()
     file: Optional[str] = Field()
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
     sent_at: datetime = Field(alias="sentAt")
     is_read: bool = Field(default=False, alias="isRead")
     sender: UserInLastMessageModel = Field(...)
@@ -69,7 +88,7 @@ class DialogInResponseModel(MongoModel):
 
     id: PyObjectId = Field(...)
     user: UserInDialogResponseModel = Field(...)
-    images: list[str] = Field(default_factory=list)
+    media_count: int = Field(default=0, alias="mediaCount")
     unread_messages: int = Field(default=0, alias="unreadMessages")
     is_pinned: bool = Field(default=False, alias="isPinned")
     is_notifications_enabled: bool = Field(default=True, alias="isNotificationsEnabled")
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from pydantic import Field
+
+from app.models.common.mongo.base_model import MongoModel
+from app.models.common.object_id import PyObjectId
+
+
+class DialogMediaModel(MongoModel):
+    """ Base model for dialog media (index entry for every message with a file). """
+
+    id: PyObjectId = Field(default_factory=PyObjectId)
+    dialog_id: PyObjectId = Field(..., alias="dialogId")
+    message_id: PyObjectId = Field(..., alias="messageId")
+    sender_id: PyObjectId = Field(..., alias="senderId")
+    file: str = Field(...)
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
+    sent_at: datetime = Field(..., alias="sentAt")
+
+
+class DialogMediaInResponseModel(MongoModel):
+    """ Response model for dialog media. """
+
+    id: PyObjectId = Field(...)
+    dialog_id: PyObjectId = Field(..., alias="dialogId")
+    message_id: PyObjectId = Field(..., alias="messageId")
+    sender_id: PyObjectId = Field(..., alias="senderId")
+    file: str = Field(...)
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
+    sent_at: datetime = Field(..., alias="sentAt")
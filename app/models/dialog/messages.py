@@ -5,6 +5,7 @@ from pydantic import Field, constr, BaseModel
 
 from app.models.common.mongo.base_model import MongoModel
 from app.models.common.object_id import PyObjectId
+from app.models.user.settings import LanguagesEnum
 
 
 class DialogMessageInCreateModel(MongoModel):
@@ -14,6 +15,8 @@ class DialogMessageInCreateModel(MongoModel):
     sender_id: PyObjectId = Field(..., alias="senderId")
     text: Optional[str] = Field()
     file: Optional[str] = Field()
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
+    language: LanguagesEnum = Field(default=LanguagesEnum.ENGLISH)
 
     # TODO: Test it
     # class Config:
@@ -28,6 +31,7 @@ class SenderInDialogMessageModel(MongoModel):
     first_name: str = Field(..., alias="firstName")
     last_name: Optional[str] = Field(default=None, alias="lastName")
     photo_url: Optional[str] = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
 
 
 class DialogMessageModel(MongoModel):
@@ -38,9 +42,13 @@ class DialogMessageModel(MongoModel):
     sender_id: PyObjectId = Field(..., alias="senderId")
     text: Optional[str] = Field(None)
     file: Optional[str] = Field(None)
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
     is_read: bool = Field(default=False, alias="isRead")
     sent_at: datetime = Field(default=str(datetime.now(tz=None).isoformat()), alias="sentAt")
 
+    # Language of the text index entry (it is used for stemming, see `TEXT_SEARCH_LANGUAGES`).
+    language: str = Field(default="english")
+
 
 class DialogMessageInResponseModel(MongoModel):
     """ Response model for dialog message. """
@@ -50,5 +58,6 @@ class DialogMessageInResponseModel(MongoModel):
     sender: SenderInDialogMessageModel = Field(...)
     text: Optional[constr(curtail_length=1000, strip_whitespace=False)] = Field()
     file: Optional[str] = Field()
+    file_variants: dict[str, str] = Field(default_factory=dict, alias="fileVariants")
     is_read: bool = Field(default=False, alias="isRead")
     sent_at: datetime = Field(..., alias="sentAt")
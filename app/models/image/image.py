@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from app.models.common.mongo.base_model import MongoModel
+
+
+class ImageInStorageModel(BaseModel):
+    """ Model for stored image (original and its resized variants). """
+
+    url: str = Field(...)
+
+    # URL of the resized variant by its max side in pixels (sizes larger than the original point to the original).
+    variants: dict[str, str] = Field(default_factory=dict)
+
+
+class ImageBlobModel(MongoModel):
+    """ Base model for content-addressed image (stored once for every identical upload). """
+
+    # `<folder>/<SHA-256 of the uploaded bytes>`.
+    id: str = Field(...)
+    url: str = Field(...)
+    variants: dict[str, str] = Field(default_factory=dict)
+
+    # Paths of the stored files (relative to the public folder) and their total size in bytes.
+    files: list[str] = Field(default_factory=list)
+    size: int = Field(default=0)
+
+    # Count of messages and avatars that reference the image, it is collected after the grace period once unreferenced.
+    ref_count: int = Field(default=0, alias="refCount")
+    unreferenced_at: Optional[datetime] = Field(default_factory=datetime.utcnow, alias="unreferencedAt")
+
+    # Set while the garbage collector removes the files (the image is treated as absent then).
+    collecting_at: Optional[datetime] = Field(default=None, alias="collectingAt")
+    created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import Field
+
+from app.common.types.str_enum import StrEnumBase
+from app.models.common.mongo.base_model import MongoModel
+from app.models.common.object_id import PyObjectId
+from app.models.user.settings import LanguagesEnum
+
+
+class MailStatusEnum(StrEnumBase):
+    """ Outbox email statuses enum. """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class MailOutboxModel(MongoModel):
+    """ Base model for outbox email (it is sent by the mail worker). """
+
+    id: PyObjectId = Field(default_factory=PyObjectId)
+    recipient: str = Field(...)
+    subject: str = Field(...)
+
+    # The email is rendered by the mail worker.
+    template: str = Field(...)
+    language: LanguagesEnum = Field(default=LanguagesEnum.ENGLISH)
+    context: dict = Field(default_factory=dict)
+
+    # Hash of recipient, subject, template, language and context (identical pending emails are stored once).
+    dedup_key: str = Field(..., alias="dedupKey")
+
+    status: MailStatusEnum = Field(default=MailStatusEnum.PENDING)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None, alias="lastError")
+
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, alias="nextAttemptAt")
+    locked_until: Optional[datetime] = Field(default=None, alias="lockedUntil")
+    created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
+    sent_at: Optional[datetime] = Field(default=None, alias="sentAt")
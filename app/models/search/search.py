@@ -1,13 +1,96 @@
+from typing import Optional
+
+from bson import ObjectId
 from pydantic import Field
 
+from app.common.types.str_enum import StrEnumBase
+from app.common.utils.search.main import SEARCH_RANKS
+from app.models.common.exceptions.body import InvalidSearchCursor
 from app.models.common.mongo.base_model import MongoModel
+from app.models.common.object_id import PyObjectId
 from app.models.dialog.dialog import DialogInResponseModel
 from app.models.user.user import UserInSearchModel
 
 
+class SearchSectionsEnum(StrEnumBase):
+    """ Sections of the search result. """
+
+    DIALOGS = "dialogs"
+    MESSAGES = "messages"
+    USERS = "users"
+
+
+class UsersCursor(str):
+    """
+    Cursor of the users search page (`<rank>:<user ID>`).
+
+    Users are ordered by the rank of their search key, then by ID, so the cursor is the rank and the ID of the last
+    user of the previous page (the ID is empty if no users of the rank were returned yet).
+    """
+
+    rank: int
+    last_id: Optional[PyObjectId]
+
+    @classmethod
+    def build(cls, rank: int, last_id: Optional[PyObjectId] = None) -> "UsersCursor":
+        cursor = cls(f"{rank}:{last_id or ''}")
+        cursor.rank = rank
+        cursor.last_id = last_id
+
+        return cursor
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        if isinstance(v, cls):
+            return v
+
+        rank, _, last_id = str(v).partition(":")
+        if not rank.isdigit() or int(rank) >= SEARCH_RANKS or (last_id and not ObjectId.is_valid(last_id)):
+            raise InvalidSearchCursor(translation_key="cursorIsNotCorrect")
+
+        return cls.build(int(rank), ObjectId(last_id) if last_id else None)
+
+    @classmethod
+    def __modify_schema__(cls, field_schema):
+        field_schema.update(type="string")
+
+
 class SearchResultModel(MongoModel):
     """ Model for search result. """
 
     dialogs: list[DialogInResponseModel] = Field(default_factory=list)
     messages: list[DialogInResponseModel] = Field(default_factory=list)
-    users: list[UserInSearchModel] = Field(default_factory=list)
\ No newline at end of file
+    users: list[UserInSearchModel] = Field(default_factory=list)
+    users_cursor: Optional[UsersCursor] = Field(default=None, alias="usersCursor")
+
+    # Sections which have more results than returned.
+    truncated: list[SearchSectionsEnum] = Field(default_factory=list)
+
+    # Sections which didn't finish before their deadline (they are returned empty).
+    timed_out: list[SearchSectionsEnum] = Field(default_factory=list, alias="timedOut")
+
+
+class SearchSectionResultModel(MongoModel):
+    """ Model for result of one search section (it is streamed over websocket). """
+
+    section: SearchSectionsEnum = Field(...)
+    data: list = Field(default_factory=list)
+    users_cursor: Optional[UsersCursor] = Field(default=None, alias="usersCursor")
+    truncated: bool = Field(default=False)
+    timed_out: bool = Field(default=False, alias="timedOut")
+
+
+class SearchCacheModel(MongoModel):
+    """
+    Model for the previous search of a websocket connection.
+
+    Complete sections of the previous query are reused (filtered) when the next query refines it.
+    """
+
+    query: str = Field(...)
+    dialogs: Optional[list[DialogInResponseModel]] = Field(default=None)
+    users: Optional[list[UserInSearchModel]] = Field(default=None)
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import Field, constr
+
+from app.models.common.mongo.base_model import MongoModel
+from app.models.common.object_id import PyObjectId
+
+
+class UploadModel(MongoModel):
+    """ Base model for resumable upload (chunks are appended to a temporary file). """
+
+    id: PyObjectId = Field(default_factory=PyObjectId)
+    user_id: PyObjectId = Field(..., alias="userId")
+    folder: str = Field(default="uploads")
+
+    # Declared size and SHA-256 (hex) of the file, count of received bytes.
+    size: int = Field(...)
+    checksum: Optional[str] = Field(default=None)
+    offset: int = Field(default=0)
+
+    # Set while a chunk is written, so concurrent requests can't append at the same offset.
+    locked_until: Optional[datetime] = Field(default=None, alias="lockedUntil")
+
+    created_at: datetime = Field(default_factory=datetime.utcnow, alias="createdAt")
+    expires_at: datetime = Field(..., alias="expiresAt")
+
+
+class UploadInCreateModel(MongoModel):
+    """ Model for creating resumable upload. """
+
+    size: int = Field(..., gt=0)
+    checksum: Optional[constr(regex=r"^[0-9a-fA-F]{64}$")] = Field(default=None)
+
+
+class UploadInFinalizeModel(MongoModel):
+    """ Model for finalizing resumable upload. """
+
+    dialog_id: PyObjectId = Field(..., alias="dialogId")
+    text: Optional[str] = Field(default=None)
+
+
+class UploadInResponseModel(MongoModel):
+    """ Model for resumable upload in response (the client sends the next chunk from `offset`). """
+
+    id: PyObjectId = Field(...)
+    size: int = Field(...)
+    offset: int = Field(...)
+    chunk_size: int = Field(..., alias="chunkSize")
+    expires_at: datetime = Field(..., alias="expiresAt")
@@ -28,3 +28,4 @@ class BlacklistedUserInResponseModel(MongoModel):
     first_name: str = Field(..., alias="firstName")
     last_name: Optional[str] = Field(default=None, alias="lastName")
     photo_url: Optional[str] = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
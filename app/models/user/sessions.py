@@ -29,6 +29,14 @@ class UserSessionModel(MongoModel):
     created_at: datetime = Field(default=datetime.utcnow(), alias="createdAt")
 
 
+class UserSessionRequestContextModel(MongoModel):
+    """ Model for session attributes of the current request (they are compared with stored sessions). """
+
+    ip_address: str = Field(...)
+    location: str = Field(...)
+    client_type: Optional[str] = Field(None)
+
+
 class UserSessionInResponseModel(MongoModel):
     """ Response model for user sessions. """
 
@@ -20,6 +20,15 @@ class LanguagesEnum(StrEnumBase):
     ESTONIAN = "et"
 
 
+# Languages of the MongoDB text index for every UI language.
+# MongoDB has no Estonian stemmer, so Estonian texts are only tokenized (without stemming and stop words).
+TEXT_SEARCH_LANGUAGES = {
+    LanguagesEnum.ENGLISH: "english",
+    LanguagesEnum.RUSSIAN: "russian",
+    LanguagesEnum.ESTONIAN: "none",
+}
+
+
 class UserSettingsModel(MongoModel):
     """ Base model for user settings. """
 
@@ -4,6 +4,7 @@ from typing import Union, Optional
 from pydantic import BaseModel, Field, EmailStr, validator, root_validator, SecretStr, constr, conbytes, StrictBytes, \
     StrictStr
 
+from app.common.utils.search.main import build_ranked_search_keys
 from app.common.pydantic.validators import username_validator, password_validator, passwords_match_validator, \
     email_validator, password_confirm_validator, first_name_validator, last_name_validator
 from app.models.common.mongo.base_model import MongoModel
@@ -25,6 +26,7 @@ class UserModel(MongoModel):
     last_name: Optional[str] = Field(default=None, max_length=25, alias="lastName")
     is_active: bool = Field(default=False, alias="isActive")
     photo_url: Optional[str] = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
     is_online: Optional[bool] = Field(default=False, alias="isOnline")
     last_activity: Optional[datetime] = Field(default=datetime.now(tz=None), alias="lastActivity")
     created_at: datetime = Field(default=datetime.utcnow(), alias="createdAt")
@@ -40,14 +42,34 @@ class UserModel(MongoModel):
 
     is_test: bool = Field(default=False, alias="isTest")
 
+    # Normalized prefixes of names, username and email with their rank (it is used by users search).
+    search_keys: list[str] = Field(default_factory=list, alias="searchKeys")
+
     @validator("password", pre=True)
     def hash_password(cls, pw: str) -> str:
-        """ Hash password before save to database (if password is not hashed yet). """
+        """
+        Hash password before save to database (if password is not hashed yet).
+
+        Services hash passwords with `HashService.get_hash` in advance, so this blocking fallback isn't used by them.
+        """
 
         if HashService.is_hashed(pw):
             return pw
 
-        return HashService.get_hash(pw)
+        return HashService.get_hash_sync(pw)
+
+    @root_validator(skip_on_failure=True)
+    def set_search_keys(cls, values: dict) -> dict:
+        """ Rebuild search keys, so they always match the current user fields. """
+
+        values["search_keys"] = build_ranked_search_keys(
+            values.get("username"),
+            values.get("first_name"),
+            values.get("last_name"),
+            values.get("email", "").split("@")[0],
+        )
+
+        return values
 
 
 class UserInSignUpModel(MongoModel):
@@ -99,6 +121,7 @@ class UserInResponseModel(MongoModel):
     last_name: Optional[StrictStr] = Field(None, alias="lastName")
     is_active: bool = Field(..., alias="isActive")
     photo_url: str = Field(alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
     is_online: Optional[bool] = Field(default=True, alias="isOnline")
     last_activity: Optional[datetime] = Field(default=None, alias="lastActivity")
     created_at: datetime = Field(..., alias="createdAt")
@@ -127,6 +150,7 @@ class UserInSearchModel(MongoModel):
     id: PyObjectId = Field(...)
     username: str = Field(...)
     photo_url: str = Field(..., alias="photoURL")
+    photo_variants: dict[str, str] = Field(default_factory=dict, alias="photoVariants")
     email: EmailStr = Field(...)
     first_name: str = Field(..., alias="firstName")
     last_name: Optional[str] = Field(..., alias="lastName")
@@ -16,8 +16,10 @@ from app.models.user.user import UserInSignUpModel, UserInEventResponseModel, Us
     UserInActivationModel, UserInCallResetPasswordModel, UserInResetPasswordModel, UserInTwoFactorAuthenticationModel
 from app.models.user.utils.response_types import AuthResponseType
 from app.services.auth.new_device import NewDeviceService
+from app.services.auth.throttle import LoginThrottleService
 from app.services.auth.two_factor import TwoFactorService
 from app.services.hash.hash import HashService
+from app.services.location.location import LocationService
 from app.services.mail.mail import EmailService
 from app.services.token.token import TokenService
 from app.services.user.sessions import UserSessionService
@@ -69,6 +71,8 @@ class AuthService:
         :return: **Token** (if the login success) or **AuthResponseType.NEW_DEVICE, AuthResponseType.TWO_FACTOR, AuthResponseType.ACTIVATION_REQUIRED** (if the login was successful, but confirmation is required).
         """
 
+        LoginThrottleService.check(LocationService.get_client_ip(request), body.username)
+
         user = await UserService.authenticate(body.username, body.password.get_secret_value(), db)
 
         is_user_foreign = await UserSessionService.is_foreign_user(user, request)
@@ -140,6 +144,8 @@ class AuthService:
             email=user.email,
             subject="Activate your account",
             template="activation",
+            db=db,
+            language=user.settings.language,
             username=user.username,
             url=f"{ACTIVATION_PAGE}?token={user.activation_token}",
         )
@@ -227,6 +233,8 @@ class AuthService:
             user.email,
             "Password recovery request",
             "reset_password",
+            db,
+            language=user.settings.language,
             url=f"{RESET_PASSWORD}?token={token}",
             username=user.username
         )
@@ -270,13 +278,13 @@ class AuthService:
                 translation_key="resetPasswordTokenIsExpired"
             )
 
-        if HashService.verify_password(body.password, user.password):
+        if await HashService.verify_password(body.password, user.password):
             raise APIException.bad_request(
                 "You cannot use the same password as before.",
                 translation_key="cannotUseSamePassword"
             )
 
-        user.password = HashService.get_hash(body.password)
+        user.password = await HashService.get_hash(body.password)
         # user.reset_password_token = None
 
         await UserService.update(user, db)
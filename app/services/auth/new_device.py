@@ -37,6 +37,8 @@ class NewDeviceService:
             user.email,
             "Authentication on a new device",
             "new_device",
+            db,
+            language=user.settings.language,
             username=user.username,
             secret=secret
         )
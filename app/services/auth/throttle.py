@@ -0,0 +1,56 @@
+from typing import Optional
+
+from app.common.constants import LOGIN_LIMIT_PER_IP, LOGIN_LIMIT_PER_USERNAME, LOGIN_LIMIT_GLOBAL, LOGIN_LIMIT_WINDOW
+from app.common.utils.rate_limit import SlidingWindowRateLimiter
+from app.exception.api import APIException
+from app.services.metrics.metrics import MetricsService
+
+
+class LoginThrottleService:
+    """
+    Login throttle service.
+
+    This service limits login attempts per IP, per username and for the whole worker, so credential stuffing can't
+    saturate the worker with bcrypt verifications, lookups and emails. Limits are checked before any of this work.
+    Counters are kept in memory of the worker (every worker limits its own share of the traffic).
+    """
+
+    _limiters = {
+        "ip": SlidingWindowRateLimiter(LOGIN_LIMIT_PER_IP, LOGIN_LIMIT_WINDOW),
+        "username": SlidingWindowRateLimiter(LOGIN_LIMIT_PER_USERNAME, LOGIN_LIMIT_WINDOW),
+        "global": SlidingWindowRateLimiter(LOGIN_LIMIT_GLOBAL, LOGIN_LIMIT_WINDOW),
+    }
+
+    @staticmethod
+    def check(ip: Optional[str], username: str) -> None:
+        """
+        Check login limits and count the attempt (rejected attempts are not counted).
+
+        :param ip: Client IP address.
+        :param username: Username or email from the login body.
+
+        :raise APIException: If any limit is exceeded (with `Retry-After`).
+        """
+
+        keys = {
+            "ip": ip or "unknown",
+            "username": username.strip().lower(),
+            "global": "global",
+        }
+
+        retry_after = 0
+        for scope, key in keys.items():
+            scope_retry_after = LoginThrottleService._limiters[scope].get_retry_after(key)
+            if scope_retry_after:
+                MetricsService.increment("login_throttled", scope=scope)
+                retry_after = max(retry_after, scope_retry_after)
+
+        if retry_after:
+            raise APIException.too_many_requests(
+                "Too many login attempts. Please try again later.",
+                retry_after,
+                translation_key="tooManyLoginAttempts"
+            )
+
+        for scope, key in keys.items():
+            LoginThrottleService._limiters[scope].hit(key)
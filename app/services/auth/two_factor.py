@@ -36,6 +36,8 @@ class TwoFactorService:
             user.email,
             "Two-factor authentication",
             "two_factor",
+            db,
+            language=user.settings.language,
             username=user.username,
             secret=secret
         )
@@ -1,14 +1,18 @@
 from typing import Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.common.constants import DIALOGS_COLLECTION
 from app.exception.api import APIException
 from app.models.common.object_id import PyObjectId
 from app.models.dialog.dialog import DialogInCreateModel, DialogModel, DialogInResponseModel, DialogInUpdateModel, \
-    UserInDialogResponseModel, UserInDialogModel
+    UserInDialogResponseModel, UserInDialogModel, LastMessageInDialogModel, UserInLastMessageModel
 from app.models.user.user import UserModel
+from app.services.dialog.media import DialogMediaService
 from app.services.dialog.message import DialogMessageService
+from app.services.search.cache import SearchCacheService
 from app.services.user.blacklist import BlacklistService
 from app.services.user.user import UserService
 
@@ -43,18 +47,20 @@ class DialogService:
     @staticmethod
     async def get_by_user_id(
             user_id: PyObjectId,
-            db: AsyncIOMotorClient
+            db: AsyncIOMotorClient,
+            limit: int = 100
     ) -> list[DialogModel]:
         """
         Get dialog by user id.
 
         :param user_id: User ID.
         :param db: Database connection object.
+        :param limit: Max count of dialogs (0 means no limit).
 
         :return: Dialog object.
         """
 
-        dialog = db[DIALOGS_COLLECTION].find({"$or": [{"fromUser._id": user_id}, {"toUser._id": user_id}]}).limit(100)
+        dialog = db[DIALOGS_COLLECTION].find({"$or": [{"fromUser._id": user_id}, {"toUser._id": user_id}]}).limit(limit)
         if not dialog:
             return []
 
@@ -76,13 +82,13 @@ class DialogService:
         :return: Dialog object.
         """
 
-        dialog = await db[DIALOGS_COLLECTION].find_one(
-            {"$or": [{"fromUser._id": user_id, "toUser._id": receiver_id},
-                     {"fromUser._id": receiver_id, "toUser._id": user_id}]})
+        participants_key = DialogModel.build_participants_key(user_id, receiver_id)
+
+        dialog = await db[DIALOGS_COLLECTION].find_one({"participantsKey": participants_key})
         if not dialog:
             return None
 
-        return DialogModel.from_mongo(dialog) if dialog else None
+        return DialogModel.from_mongo(dialog)
 
     @staticmethod
     async def create(body: DialogInCreateModel, current_user: UserModel, db: AsyncIOMotorClient) -> DialogModel:
@@ -96,10 +102,6 @@ class DialogService:
         :return: New dialog object.
         """
 
-        is_dialog_exist = await DialogService.get_by_user_and_receiver_id(current_user.id, body.to_user_id, db)
-        if is_dialog_exist:
-            raise APIException.bad_request("Dialog already exist.", translation_key="dialogAlreadyExist")
-
         is_adding_self = body.to_user_id == current_user.id
         if is_adding_self:
             raise APIException.bad_request("You can't add yourself to dialog.",
@@ -114,8 +116,24 @@ class DialogService:
 
         dialog_body = DialogModel(from_user=from_user_payload, to_user=to_user_payload)
 
-        new_dialog = await db.dialogs.insert_one(dialog_body.mongo())
-        return await DialogService.get_by_id(new_dialog.inserted_id, db)
+        # Insert the dialog only if there is no dialog for this pair yet (the unique index on
+        # `participantsKey` guarantees that concurrent requests can't create a duplicate).
+        try:
+            existing_dialog = await db[DIALOGS_COLLECTION].find_one_and_update(
+                {"participantsKey": dialog_body.participants_key},
+                {"$setOnInsert": dialog_body.mongo(exclude={"participants_key"})},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            raise APIException.bad_request("Dialog already exist.", translation_key="dialogAlreadyExist")
+
+        if existing_dialog:
+            raise APIException.bad_request("Dialog already exist.", translation_key="dialogAlreadyExist")
+
+        SearchCacheService.invalidate_users([current_user.id, body.to_user_id])
+
+        return dialog_body
 
     @staticmethod
     async def get_dialogs(current_user: UserModel, db: AsyncIOMotorClient) -> list[DialogInResponseModel]:
@@ -164,13 +182,13 @@ class DialogService:
 
         is_me_blocked = await BlacklistService.get_user_in_blacklist(current_user.id, user)
 
-        images = [message.file for message in messages if message.file]
+        media_count = await DialogMediaService.count(new_dialog.id, db)
 
         dialog = new_dialog.from_user if new_dialog.from_user.id == current_user.id else new_dialog.to_user
 
         return DialogInResponseModel(
             last_message=last_message,
-            images=images,
+            media_count=media_count,
             unread_messages=unread_messages,
             messages=messages,
             user=user_in_dialog,
@@ -179,10 +197,82 @@ class DialogService:
             **dialog.dict(exclude={"id"})
         )
 
+    @staticmethod
+    async def build_dialog_summaries(
+            dialogs: list[DialogModel],
+            current_user: UserModel,
+            db: AsyncIOMotorClient,
+            include_last_message: bool = True
+    ) -> list[DialogInResponseModel]:
+        """
+        Build dialogs for response without message history.
+
+        Unlike `build_dialog`, every query is made once for all dialogs, so the count of database round trips
+        doesn't depend on the count of dialogs.
+
+        :param dialogs: List of dialog objects.
+        :param current_user: Current user object.
+        :param db: Database connection object.
+        :param include_last_message: Whether to fetch the last message of every dialog.
+
+        :return: List of response dialog objects.
+        """
+
+        if not dialogs:
+            return []
+
+        dialog_ids = [dialog.id for dialog in dialogs]
+        partner_ids = [dialog.to_user.id if dialog.from_user.id == current_user.id else dialog.from_user.id
+                       for dialog in dialogs]
+
+        users = {user.id: user for user in await UserService.get_by_ids(partner_ids, db)}
+        users[current_user.id] = current_user
+
+        unread_messages = await DialogMessageService.get_unread_messages_counts(dialog_ids, current_user.id, db)
+        media_counts = await DialogMediaService.count_by_dialog_ids(dialog_ids, db)
+        last_messages = await DialogMessageService.get_last_messages(dialog_ids, db) if include_last_message else {}
+
+        result = []
+        for dialog, partner_id in zip(dialogs, partner_ids):
+            user = users.get(partner_id)
+            if not user:
+                continue
+
+            user_in_dialog = UserInDialogResponseModel(**user.dict())
+            user_in_dialog.is_blocked = await BlacklistService.get_user_in_blacklist(user.id, current_user) is not None
+
+            is_me_blocked = await BlacklistService.get_user_in_blacklist(current_user.id, user)
+
+            last_message = None
+            message = last_messages.get(dialog.id)
+            if message and message.sender_id in users:
+                last_message = LastMessageInDialogModel(
+                    sender=UserInLastMessageModel(**users[message.sender_id].dict()),
+                    sent_at=message.sent_at,
+                    **message.dict(exclude={"sent_at"})
+                )
+
+            dialog_user = dialog.from_user if dialog.from_user.id == current_user.id else dialog.to_user
+
+            result.append(DialogInResponseModel(
+                last_message=last_message,
+                media_count=media_counts.get(dialog.id, 0),
+                unread_messages=unread_messages.get(dialog.id, 0),
+                messages=[],
+                user=user_in_dialog,
+                is_me_blocked=bool(is_me_blocked),
+                id=dialog.id,
+                **dialog_user.dict(exclude={"id"})
+            ))
+
+        return result
+
     @staticmethod
     async def search(query: str, current_user: UserModel, db: AsyncIOMotorClient) -> list[DialogInResponseModel]:
         """
-        Search dialogs by query.
+        Search dialogs by query (by the dialog partner name).
+
+        Partners are matched with one indexed query over users, and only the matching dialogs are built.
 
         :param query: Search query.
         :param current_user: Current user object.
@@ -191,15 +281,36 @@ class DialogService:
         :return: List of dialogs.
         """
 
-        dialogs = await DialogService.get_dialogs(current_user, db)
-        result = []
+        dialogs = await DialogService.get_by_user_id(current_user.id, db, limit=0)
+        if not dialogs:
+            return []
 
-        for dialog in dialogs:
-            if dialog.user.photo_url is not None and query.lower() in dialog.user.first_name.lower() or (
-                    dialog.user.last_name is not None and query.lower() in dialog.user.last_name.lower()):
-                result.append(dialog)
+        partner_ids = [dialog.to_user.id if dialog.from_user.id == current_user.id else dialog.from_user.id
+                       for dialog in dialogs]
 
-        return result
+        matched_ids = await UserService.get_ids_by_name(query, partner_ids, db)
+        if not matched_ids:
+            return []
+
+        return await DialogService.build_dialog_summaries(
+            [dialog for dialog, partner_id in zip(dialogs, partner_ids) if partner_id in matched_ids],
+            current_user,
+            db
+        )
+
+    @staticmethod
+    def matches_search(dialog: DialogInResponseModel, query: str) -> bool:
+        """
+        Check if dialog matches the search query (with the same rules as `search`).
+
+        :param dialog: Response dialog object.
+        :param query: Search query.
+
+        :return: True if dialog matches the query, False otherwise.
+        """
+
+        return UserService.matches_name_search(dialog.user.first_name, dialog.user.last_name, query,
+                                               dialog.user.photo_url)
 
     @staticmethod
     async def update(dialog_id: PyObjectId, body: DialogInUpdateModel, current_user: UserModel,
@@ -233,7 +344,8 @@ class DialogService:
 
                 setattr(dialog_user, key, value)
 
-        await db[DIALOGS_COLLECTION].find_one_and_update({"_id": dialog.id}, {"$set": dialog.mongo()})
+        await db[DIALOGS_COLLECTION].find_one_and_update({"_id": dialog.id}, {"$set": dialog.mongo(exclude={"participants_key"})})
+        SearchCacheService.invalidate_users([current_user.id])
 
         # return await DialogService.build_dialog(dialog, current_user, db)
         return {
@@ -280,6 +392,9 @@ class DialogService:
         await db[DIALOGS_COLLECTION].delete_one({"_id": dialog_id})
 
         await DialogMessageService.delete_by_dialog_id(dialog_id, db)
+        await DialogMediaService.delete_by_dialog_id(dialog_id, db)
+
+        SearchCacheService.invalidate_users([dialog.from_user.id, dialog.to_user.id])
 
     @staticmethod
     async def delete_all_dialogs(user_id: PyObjectId, db: AsyncIOMotorClient) -> None:
@@ -290,6 +405,20 @@ class DialogService:
         :param db: Database connection object.
         """
 
-        await db[DIALOGS_COLLECTION].delete_many({"$or": [{"fromUser._id": user_id}, {"toUser._id": user_id}]})
+        query = {"$or": [{"fromUser._id": user_id}, {"toUser._id": user_id}]}
+
+        # All removed dialogs (only their IDs and participants are fetched).
+        dialogs = await db[DIALOGS_COLLECTION].find(query, {"_id": 1, "fromUser._id": 1, "toUser._id": 1}) \
+            .to_list(length=None)
+
+        await db[DIALOGS_COLLECTION].delete_many(query)
+
+        await DialogMediaService.delete_by_dialog_ids([dialog["_id"] for dialog in dialogs], db)
 
         await DialogMessageService.delete_all_messages(user_id, db)
+
+        SearchCacheService.invalidate_users(
+            {user_id}
+            | {dialog["fromUser"]["_id"] for dialog in dialogs}
+            | {dialog["toUser"]["_id"] for dialog in dialogs}
+        )
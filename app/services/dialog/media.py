@@ -0,0 +1,116 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.common.constants import DIALOG_MEDIA_COLLECTION
+from app.models.common.object_id import PyObjectId
+from app.models.dialog.media import DialogMediaModel, DialogMediaInResponseModel
+from app.models.dialog.messages import DialogMessageModel
+
+
+class DialogMediaService:
+    """
+    Service for dialog media.
+
+    This class is responsible for maintaining the media index of dialogs (images gallery).
+    Every message with a file has a matching entry in the index, keyed by `(dialogId, sentAt)`.
+    """
+
+    @staticmethod
+    async def create(
+            message: DialogMessageModel,
+            db: AsyncIOMotorClient
+    ) -> DialogMediaModel:
+        """
+        Add a message file to the media index.
+
+        :param message: Dialog message object (with a file).
+        :param db: Database connection object.
+
+        :return: New dialog media object.
+        """
+
+        media = DialogMediaModel(
+            dialog_id=message.dialog_id,
+            message_id=message.id,
+            sender_id=message.sender_id,
+            file=message.file,
+            file_variants=message.file_variants,
+            sent_at=message.sent_at,
+        )
+
+        await db[DIALOG_MEDIA_COLLECTION].insert_one(media.mongo())
+        return media
+
+    @staticmethod
+    async def get_by_dialog_id(
+            dialog_id: PyObjectId,
+            skip: int,
+            limit: int,
+            db: AsyncIOMotorClient
+    ) -> list[DialogMediaInResponseModel]:
+        """
+        Get dialog media (newest first).
+
+        :param dialog_id: Dialog ID.
+        :param skip: Skip.
+        :param limit: Limit.
+        :param db: Database connection object.
+
+        :return: List of dialog media.
+        """
+
+        media = db[DIALOG_MEDIA_COLLECTION].find({"dialogId": dialog_id}).sort("sentAt", -1).skip(skip).limit(limit)
+
+        return [DialogMediaInResponseModel.from_mongo(item) for item in await media.to_list(length=limit)]
+
+    @staticmethod
+    async def count(dialog_id: PyObjectId, db: AsyncIOMotorClient) -> int:
+        """
+        Get dialog media count.
+
+        :param dialog_id: Dialog ID.
+        :param db: Database connection object.
+
+        :return: Media count.
+        """
+
+        return await db[DIALOG_MEDIA_COLLECTION].count_documents({"dialogId": dialog_id})
+
+    @staticmethod
+    async def count_by_dialog_ids(dialog_ids: list[PyObjectId], db: AsyncIOMotorClient) -> dict[PyObjectId, int]:
+        """
+        Get media count of several dialogs (in one query).
+
+        :param dialog_ids: List of dialog IDs.
+        :param db: Database connection object.
+
+        :return: Media count by dialog ID (dialogs without media are missing).
+        """
+
+        counts = db[DIALOG_MEDIA_COLLECTION].aggregate([
+            {"$match": {"dialogId": {"$in": dialog_ids}}},
+            {"$group": {"_id": "$dialogId", "count": {"$sum": 1}}},
+        ])
+
+        return {item["_id"]: item["count"] async for item in counts}
+
+    @staticmethod
+    async def delete_by_dialog_id(dialog_id: PyObjectId, db: AsyncIOMotorClient) -> None:
+        """
+        Delete media by dialog ID.
+
+        :param dialog_id: Dialog ID.
+        :param db: Database connection object.
+        """
+
+        await db[DIALOG_MEDIA_COLLECTION].delete_many({"dialogId": dialog_id})
+
+    @staticmethod
+    async def delete_by_dialog_ids(dialog_ids: list[PyObjectId], db: AsyncIOMotorClient) -> None:
+        """
+        Delete media of several dialogs.
+
+        :param dialog_ids: List of dialog IDs.
+        :param db: Database connection object.
+        """
+
+        await db[DIALOG_MEDIA_COLLECTION].delete_many({"dialogId": {"$in": dialog_ids}})
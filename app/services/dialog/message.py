@@ -6,9 +6,11 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.common.constants import DIALOG_MESSAGES_COLLECTION
 from app.models.common.object_id import PyObjectId
-from app.models.dialog.dialog import DialogInResponseModel, LastMessageInDialogModel, UserInLastMessageModel
 from app.models.dialog.messages import DialogMessageInCreateModel, DialogMessageModel, DialogMessageInResponseModel, \
     SenderInDialogMessageModel
+from app.models.user.settings import LanguagesEnum, TEXT_SEARCH_LANGUAGES
+from app.services.dialog.media import DialogMediaService
+from app.services.image.storage import ImageStorageService
 from app.services.user.user import UserService
 
 
@@ -52,10 +54,21 @@ class DialogMessageService:
         :return: New dialog message object.
         """
 
-        new_message_body = DialogMessageModel(**body.dict(), sent_at=datetime.now(tz=None))
+        new_message_body = DialogMessageModel(
+            **body.dict(exclude={"language"}),
+            language=TEXT_SEARCH_LANGUAGES[body.language],
+            sent_at=datetime.now(tz=None)
+        )
 
         new_dialog_message = await db[DIALOG_MESSAGES_COLLECTION].insert_one(new_message_body.mongo())
-        return await DialogMessageService.get_by_id(new_dialog_message.inserted_id, db)
+        new_message = await DialogMessageService.get_by_id(new_dialog_message.inserted_id, db)
+
+        # Keep the media index (images gallery) and references to the stored images in sync with messages.
+        if new_message.file:
+            await DialogMediaService.create(new_message, db)
+            await ImageStorageService.add_references([new_message.file], db)
+
+        return new_message
 
     @staticmethod
     async def build_message(
@@ -179,69 +192,85 @@ class DialogMessageService:
         )
 
     @staticmethod
-    async def get_by_text(
-            query: str,
-            dialog_id: PyObjectId,
+    async def get_unread_messages_counts(
+            dialog_ids: list[PyObjectId],
+            user_id: PyObjectId,
             db: AsyncIOMotorClient
-    ) -> list[DialogMessageModel]:
+    ) -> dict[PyObjectId, int]:
         """
-        Get messages by text.
+        Get unread messages count of several dialogs (in one query).
 
-        :param query: Search query.
-        :param dialog_id: Dialog ID.
+        :param dialog_ids: List of dialog IDs.
+        :param user_id: User ID.
         :param db: Database connection object.
 
-        :return: Dialog message object.
+        :return: Unread messages count by dialog ID (dialogs without unread messages are missing).
         """
 
-        query = re.sub(r"[^\w\s.]", "", query)
+        counts = db[DIALOG_MESSAGES_COLLECTION].aggregate([
+            {"$match": {"dialogId": {"$in": dialog_ids}, "senderId": {"$ne": user_id}, "isRead": False}},
+            {"$group": {"_id": "$dialogId", "count": {"$sum": 1}}},
+        ])
 
-        messages = db[DIALOG_MESSAGES_COLLECTION].find(
-            {
-                "text": {"$regex": query, "$options": "i"},
-                "dialogId": dialog_id,
-            }
-        ).sort("sentAt", -1).limit(100)
-        if not messages:
-            return []
+        return {item["_id"]: item["count"] async for item in counts}
 
-        return [DialogMessageModel.from_mongo(message) async for message in messages]
+    @staticmethod
+    async def get_last_messages(
+            dialog_ids: list[PyObjectId],
+            db: AsyncIOMotorClient
+    ) -> dict[PyObjectId, DialogMessageModel]:
+        """
+        Get last message of several dialogs (in one query).
+
+        :param dialog_ids: List of dialog IDs.
+        :param db: Database connection object.
+
+        :return: Last message by dialog ID (dialogs without messages are missing).
+        """
+
+        messages = db[DIALOG_MESSAGES_COLLECTION].aggregate([
+            {"$match": {"dialogId": {"$in": dialog_ids}}},
+            {"$sort": {"dialogId": 1, "sentAt": -1}},
+            {"$group": {"_id": "$dialogId", "message": {"$first": "$$ROOT"}}},
+        ])
+
+        return {item["_id"]: DialogMessageModel.from_mongo(item["message"]) async for item in messages}
 
     @staticmethod
-    async def search(
+    async def get_by_text(
             query: str,
-            dialogs: list[DialogInResponseModel],
-            db: AsyncIOMotorClient
-    ) -> list[DialogInResponseModel]:
+            dialog_ids: list[PyObjectId],
+            db: AsyncIOMotorClient,
+            language: LanguagesEnum = LanguagesEnum.ENGLISH,
+            skip: int = 0,
+            limit: int = 100
+    ) -> list[DialogMessageModel]:
         """
-        Search messages.
+        Get messages by text (using the full-text index), the most relevant first.
 
         :param query: Search query.
-        :param dialogs: Dialogs.
+        :param dialog_ids: Dialog IDs to search in.
         :param db: Database connection object.
+        :param language: Search query language (is used for stemming and stop words).
+        :param skip: Skip.
+        :param limit: Limit.
 
-        :return: List of dialogs.
+        :return: Dialog message object.
         """
 
-        result = []
-        for dialog in dialogs:
-            messages = await DialogMessageService.get_by_text(query, dialog.id, db)
-
-            for message in messages:
-                sender = await UserService.get_by_id(message.sender_id, db)
-
-                result.append(
-                    DialogInResponseModel(
-                        **dialog.dict(exclude={"last_message"}),
-                        last_message=LastMessageInDialogModel(
-                            sender=UserInLastMessageModel(**sender.dict()),
-                            sent_at=message.sent_at,
-                            **message.dict(exclude={"sent_at"})
-                        )
-                    )
-                )
+        query = re.sub(r"[^\w\s.]", "", query).strip()
+        if not query or not dialog_ids:
+            return []
 
-        return result
+        messages = db[DIALOG_MESSAGES_COLLECTION].find(
+            {
+                "$text": {"$search": query, "$language": TEXT_SEARCH_LANGUAGES[language]},
+                "dialogId": {"$in": dialog_ids},
+            },
+            {"score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"}), ("sentAt", -1)]).skip(skip).limit(limit)
+
+        return [DialogMessageModel.from_mongo(message) async for message in messages]
 
     @staticmethod
     async def delete_by_dialog_id(dialog_id: PyObjectId, db: AsyncIOMotorClient) -> None:
@@ -252,6 +281,7 @@ class DialogMessageService:
         :param db: Database connection object.
         """
 
+        await DialogMessageService._release_files({"dialogId": dialog_id}, db)
         await db[DIALOG_MESSAGES_COLLECTION].delete_many({"dialogId": dialog_id})
 
     @staticmethod
@@ -301,4 +331,18 @@ class DialogMessageService:
         :param db: Database connection object.
         """
 
+        await DialogMessageService._release_files({"senderId": user_id}, db)
         await db[DIALOG_MESSAGES_COLLECTION].delete_many({"senderId": user_id})
+
+    @staticmethod
+    async def _release_files(query: dict, db: AsyncIOMotorClient) -> None:
+        """
+        Release the stored images of messages (before the messages are deleted).
+
+        :param query: Messages query.
+        :param db: Database connection object.
+        """
+
+        messages = db[DIALOG_MESSAGES_COLLECTION].find({**query, "file": {"$ne": None}}, {"file": 1})
+
+        await ImageStorageService.release([message["file"] async for message in messages], db)
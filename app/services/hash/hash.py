@@ -1,23 +1,54 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
 import bcrypt
 
+from app.common.constants import BCRYPT_ROUNDS, HASH_MAX_WORKERS
+from app.services.metrics.metrics import MetricsService
+
+T = TypeVar("T")
+
+
 class HashService:
     """
     Hash service.
 
     This service is used to hash and compare passwords.
+    Bcrypt is slow by design, so hashing runs in a bounded thread pool (bcrypt releases the GIL) instead of the event
+    loop. The count of waiting and running operations is exposed in metrics.
     """
 
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pending = 0
+
+    @staticmethod
+    async def get_hash(password: str) -> str:
+        """
+        Hash a password for storing (in the worker pool).
+
+        :param password: Password to hash.
+
+        :return: Hashed password.
+        """
+
+        return await HashService._run("hash", HashService.get_hash_sync, password)
+
     @staticmethod
-    def get_hash(password: str) -> str:
+    def get_hash_sync(password: str) -> str:
         """
-        Hash a password for storing.
+        Hash a password for storing (blocking, it must not be called in the event loop).
 
         :param password: Password to hash.
 
         :return: Hashed password.
         """
 
-        return bcrypt.hashpw(password=password.encode("utf-8"), salt=bcrypt.gensalt()).decode("utf-8")
+        return bcrypt.hashpw(
+            password=password.encode("utf-8"),
+            salt=bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+        ).decode("utf-8")
 
     @staticmethod
     def is_hashed(password: str) -> bool:
@@ -32,9 +63,38 @@ class HashService:
         return password.startswith("$2b$") and len(password) == 60
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
+    def needs_rehash(hashed_password: str) -> bool:
+        """
+        Check if a password was hashed with a different cost than the current `BCRYPT_ROUNDS`.
+
+        :param hashed_password: Hashed password.
+
+        :return: True if password must be hashed again, False otherwise.
+        """
+
+        # Bcrypt hash format: $2b$<cost>$<salt and hash>
+        try:
+            return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+        except (IndexError, ValueError):
+            return True
+
+    @staticmethod
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a stored password against one provided by user (in the worker pool).
+
+        :param plain_password: Password to check.
+        :param hashed_password: Hashed password.
+
+        :return: True if password is correct, False otherwise.
+        """
+
+        return await HashService._run("verify", HashService.verify_password_sync, plain_password, hashed_password)
+
+    @staticmethod
+    def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
         """
-        Verify a stored password against one provided by user.
+        Verify a stored password against one provided by user (blocking, it must not be called in the event loop).
 
         :param plain_password: Password to check.
         :param hashed_password: Hashed password.
@@ -43,3 +103,54 @@ class HashService:
         """
 
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    @staticmethod
+    async def _run(operation: str, function: Callable[..., T], *args) -> T:
+        """
+        Run hash operation in the worker pool.
+
+        :param operation: Operation name (for metrics).
+        :param function: Blocking function.
+        :param args: Function arguments.
+
+        :return: Function result.
+        """
+
+        if HashService._executor is None:
+            HashService._executor = ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS, thread_name_prefix="hash")
+
+        HashService._pending += 1
+        HashService._update_gauges()
+
+        def run() -> T:
+            # Measured in the worker, so the time spent in the queue isn't included.
+            started_at = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                MetricsService.observe("hash_duration_seconds", time.perf_counter() - started_at, operation=operation)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(HashService._executor, run)
+        finally:
+            HashService._pending -= 1
+            HashService._update_gauges()
+
+    @staticmethod
+    def _update_gauges() -> None:
+        """
+        Update pool metrics (operations in progress and operations waiting for a free worker).
+        """
+
+        MetricsService.set_gauge("hash_pool_pending", HashService._pending)
+        MetricsService.set_gauge("hash_pool_queue_depth", max(HashService._pending - HASH_MAX_WORKERS, 0))
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Shut down the worker pool (on application shutdown).
+        """
+
+        if HashService._executor is not None:
+            HashService._executor.shutdown(wait=False, cancel_futures=True)
+            HashService._executor = None
@@ -0,0 +1,251 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+
+from app.common.constants import HTTP_CLIENT_TIMEOUT, HTTP_CLIENT_MAX_CONNECTIONS, HTTP_CLIENT_MAX_PER_HOST, \
+    HTTP_CLIENT_RETRY_BUDGET, HTTP_CLIENT_BREAKER_FAILURES, HTTP_CLIENT_BREAKER_COOLDOWN
+from app.services.metrics.metrics import MetricsService
+
+# Methods that are safe to retry.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """ Raised when requests to the host are stopped by the circuit breaker. """
+
+
+class HostBusyError(httpx.HTTPError):
+    """ Raised when the concurrency limit of the host isn't freed in time. """
+
+
+class HostState:
+    """
+    Outbound requests state of the host (concurrency limit, circuit breaker and retry budget).
+    """
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(HTTP_CLIENT_MAX_PER_HOST)
+
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.is_probing = False
+
+        # Every request adds `HTTP_CLIENT_RETRY_BUDGET` tokens, every retry takes one token.
+        self.retry_tokens = 1.0
+
+
+class HttpClientService:
+    """
+    Service for outbound HTTP requests.
+
+    This class keeps one application-lifetime HTTP client with keep-alive connections (it is opened and closed by
+    the startup/shutdown handlers). Every host has its own concurrency limit, retry budget and circuit breaker:
+    after `HTTP_CLIENT_BREAKER_FAILURES` consecutive failures the host is skipped for `HTTP_CLIENT_BREAKER_COOLDOWN`
+    seconds, then one probe request decides whether the circuit is closed again.
+    """
+
+    _client: Optional[httpx.AsyncClient] = None
+    _hosts: dict[str, HostState] = defaultdict(HostState)
+
+    @staticmethod
+    async def start() -> None:
+        """
+        Open the client (on application startup).
+        """
+
+        if HttpClientService._client is None:
+            HttpClientService._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(HTTP_CLIENT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=HTTP_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_CLIENT_MAX_CONNECTIONS
+                ),
+            )
+
+    @staticmethod
+    async def close() -> None:
+        """
+        Close the client (on application shutdown).
+        """
+
+        if HttpClientService._client is not None:
+            await HttpClientService._client.aclose()
+            HttpClientService._client = None
+
+    @staticmethod
+    async def get(url: str, **kwargs) -> httpx.Response:
+        """
+        Send GET request.
+
+        :param url: Request URL.
+        :param kwargs: Request arguments (see `httpx.AsyncClient.request`).
+
+        :return: Response object.
+        """
+
+        return await HttpClientService.request("GET", url, **kwargs)
+
+    @staticmethod
+    async def request(method: str, url: str, retries: int = 1, **kwargs) -> httpx.Response:
+        """
+        Send request.
+
+        Idempotent requests are retried on connection errors and 5xx responses while the retry budget of the host
+        allows it, so retries can't multiply the load on a failing host.
+
+        :param method: HTTP method.
+        :param url: Request URL.
+        :param retries: Max count of retries.
+        :param kwargs: Request arguments (see `httpx.AsyncClient.request`).
+
+        :raise CircuitOpenError: If the circuit of the host is open.
+        :raise HostBusyError: If the concurrency limit of the host isn't freed in time.
+        :raise httpx.HTTPError: If the request failed.
+
+        :return: Response object.
+        """
+
+        await HttpClientService.start()
+
+        host = httpx.URL(url).host
+        state = HttpClientService._hosts[host]
+
+        state.retry_tokens = min(state.retry_tokens + HTTP_CLIENT_RETRY_BUDGET, 10.0)
+        attempt = 0
+
+        while True:
+            is_probe = HttpClientService._before_request(host, state)
+
+            try:
+                response = await HttpClientService._send(host, state, method, url, **kwargs)
+            except HostBusyError:
+                # The host didn't fail, it is only saturated by this process.
+                raise
+            except httpx.TransportError:
+                HttpClientService._record_result(host, state, False)
+
+                if not HttpClientService._can_retry(host, state, method, attempt, retries):
+                    raise
+            except httpx.HTTPError:
+                # Other request errors (e.g. decoding errors or too many redirects) aren't retried.
+                HttpClientService._record_result(host, state, False)
+                raise
+            else:
+                is_success = response.status_code < 500
+                HttpClientService._record_result(host, state, is_success)
+
+                if is_success or not HttpClientService._can_retry(host, state, method, attempt, retries):
+                    return response
+            finally:
+                # The probe can also end without a result (e.g. it is cancelled by the caller's timeout), the next
+                # request probes the host again then. Only the probe clears the flag, so other requests that finish
+                # meanwhile can't let a second probe through.
+                if is_probe:
+                    state.is_probing = False
+
+            attempt += 1
+
+    @staticmethod
+    async def _send(host: str, state: HostState, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send request with the concurrency limit of the host and record its latency.
+
+        :param host: Request host.
+        :param state: Host state.
+        :param method: HTTP method.
+        :param url: Request URL.
+        :param kwargs: Request arguments.
+
+        :raise HostBusyError: If the concurrency limit of the host isn't freed in time.
+
+        :return: Response object.
+        """
+
+        # A saturated host fails fast instead of queueing requests without a bound.
+        try:
+            await asyncio.wait_for(state.semaphore.acquire(), HTTP_CLIENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            MetricsService.increment("http_client_queue_timeouts", host=host)
+            raise HostBusyError(f"Too many concurrent requests to {host}.")
+
+        started_at = time.perf_counter()
+        try:
+            return await HttpClientService._client.request(method, url, **kwargs)
+        finally:
+            state.semaphore.release()
+            MetricsService.observe("http_client_duration_seconds", time.perf_counter() - started_at, host=host)
+
+    @staticmethod
+    def _before_request(host: str, state: HostState) -> bool:
+        """
+        Check the circuit breaker of the host.
+
+        :param host: Request host.
+        :param state: Host state.
+
+        :raise CircuitOpenError: If the circuit is open (or a probe request is already in progress).
+
+        :return: True if the request is the probe of the host, False otherwise.
+        """
+
+        if state.opened_at is None:
+            return False
+
+        if time.monotonic() - state.opened_at < HTTP_CLIENT_BREAKER_COOLDOWN or state.is_probing:
+            MetricsService.increment("http_client_rejected", host=host)
+            raise CircuitOpenError(f"Circuit is open for {host}.")
+
+        state.is_probing = True
+
+        return True
+
+    @staticmethod
+    def _record_result(host: str, state: HostState, is_success: bool) -> None:
+        """
+        Record request result in the circuit breaker and metrics.
+
+        :param host: Request host.
+        :param state: Host state.
+        :param is_success: True if the request succeeded.
+        """
+
+        MetricsService.increment("http_client_requests", host=host, result="success" if is_success else "failure")
+
+        if is_success:
+            state.failures = 0
+            state.opened_at = None
+            return
+
+        state.failures += 1
+        if state.opened_at is not None or state.failures >= HTTP_CLIENT_BREAKER_FAILURES:
+            state.opened_at = time.monotonic()
+            MetricsService.increment("http_client_circuit_opened", host=host)
+
+    @staticmethod
+    def _can_retry(host: str, state: HostState, method: str, attempt: int, retries: int) -> bool:
+        """
+        Check if the failed request can be retried (and take a token of the retry budget).
+
+        :param host: Request host.
+        :param state: Host state.
+        :param method: HTTP method.
+        :param attempt: Number of the current retry.
+        :param retries: Max count of retries.
+
+        :return: True if the request can be retried, False otherwise.
+        """
+
+        if method.upper() not in IDEMPOTENT_METHODS or attempt >= retries or state.opened_at is not None:
+            return False
+
+        if state.retry_tokens < 1:
+            MetricsService.increment("http_client_retry_budget_exhausted", host=host)
+            return False
+
+        state.retry_tokens -= 1
+        MetricsService.increment("http_client_retries", host=host)
+
+        return True
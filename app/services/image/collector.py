@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.common.constants import IMAGE_GC_INTERVAL, IMAGE_GC_BATCH_SIZE
+from app.database.main import get_database
+from app.services.image.storage import ImageStorageService
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCollectorService:
+    """
+    Service for the images garbage collector.
+
+    This class removes unreferenced images in the background: every `IMAGE_GC_INTERVAL` seconds batches of images are
+    collected until a batch is incomplete.
+    """
+
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def start() -> None:
+        """
+        Start the collector (on application startup).
+        """
+
+        if ImageCollectorService._task is None:
+            ImageCollectorService._task = asyncio.create_task(ImageCollectorService._run())
+
+    @staticmethod
+    async def stop() -> None:
+        """
+        Stop the collector (on application shutdown).
+        """
+
+        if ImageCollectorService._task is None:
+            return
+
+        ImageCollectorService._task.cancel()
+        await asyncio.gather(ImageCollectorService._task, return_exceptions=True)
+        ImageCollectorService._task = None
+
+    @staticmethod
+    async def _run() -> None:
+        """
+        Collector loop.
+        """
+
+        db = get_database()
+
+        while True:
+            await asyncio.sleep(IMAGE_GC_INTERVAL)
+
+            try:
+                removed, reclaimed = IMAGE_GC_BATCH_SIZE, 0
+                while removed == IMAGE_GC_BATCH_SIZE:
+                    removed, batch_reclaimed = await ImageStorageService.collect_garbage(db)
+                    reclaimed += batch_reclaimed
+
+                if reclaimed:
+                    logger.info("Images garbage collector reclaimed %s bytes.", reclaimed)
+            except Exception:
+                logger.exception("Images garbage collector failed.")
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from uuid import uuid4
+
+from app.common.constants import FILE_IO_WORKERS
+
+T = TypeVar("T")
+
+
+class FileTooLargeError(Exception):
+    """ Raised when a streamed file exceeds its size limit. """
+
+
+class FileIOService:
+    """
+    Service for file I/O.
+
+    Disk operations run in a dedicated thread pool, so the event loop never blocks on disk.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    async def run(function: Callable[..., T], *args: Any) -> T:
+        """
+        Run blocking file operation in the I/O thread pool.
+
+        :param function: Blocking function.
+        :param args: Function arguments.
+
+        :return: Function result.
+        """
+
+        if FileIOService._executor is None:
+            FileIOService._executor = ThreadPoolExecutor(max_workers=FILE_IO_WORKERS, thread_name_prefix="file-io")
+
+        return await asyncio.get_running_loop().run_in_executor(FileIOService._executor, function, *args)
+
+    @staticmethod
+    async def remove(path: str) -> None:
+        """
+        Remove file (missing files are ignored).
+
+        :param path: File path.
+        """
+
+        def remove() -> None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        await FileIOService.run(remove)
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Shut down the I/O thread pool (on application shutdown).
+        """
+
+        if FileIOService._executor is not None:
+            FileIOService._executor.shutdown(wait=True)
+            FileIOService._executor = None
+
+
+class AsyncFileWriter:
+    """
+    Streaming file writer.
+
+    Chunks are written to a temporary file next to the destination in the I/O thread pool. The temporary file is
+    atomically renamed to the destination on success and removed on failure, so readers never see partial files.
+    SHA-256 of the content is computed while it is written.
+
+    Usage:
+        async with AsyncFileWriter(path, max_size) as writer:
+            await writer.write(chunk)
+    """
+
+    def __init__(self, path: str, max_size: Optional[int] = None):
+        """
+        :param path: Destination path.
+        :param max_size: Max file size in bytes (None means no limit).
+        """
+
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+
+        self._temp_path = os.path.join(os.path.dirname(path), f".{uuid4()}.tmp")
+        self._file = None
+        self._hash = hashlib.sha256()
+
+    @property
+    def digest(self) -> str:
+        """
+        SHA-256 of the written content (hex).
+        """
+
+        return self._hash.hexdigest()
+
+    async def __aenter__(self) -> "AsyncFileWriter":
+        def open_file():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return open(self._temp_path, "wb")
+
+        self._file = await FileIOService.run(open_file)
+        return self
+
+    async def write(self, chunk: bytes) -> None:
+        """
+        Write chunk.
+
+        :param chunk: File chunk.
+
+        :raise FileTooLargeError: If the file exceeds its size limit.
+        """
+
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FileTooLargeError(f"File is larger than {self.max_size} bytes.")
+
+        def write() -> None:
+            self._hash.update(chunk)
+            self._file.write(chunk)
+
+        await FileIOService.run(write)
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        def finish() -> None:
+            self._file.close()
+
+            if exc_type is None:
+                os.replace(self._temp_path, self.path)
+                return
+
+            try:
+                os.remove(self._temp_path)
+            except FileNotFoundError:
+                pass
+
+        await FileIOService.run(finish)
@@ -1,13 +1,33 @@
 import base64
 import colorsys
-import random
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
 from uuid import uuid4
+from xml.sax.saxutils import escape
 
-from PIL import Image, ImageDraw, ImageFont
 from fastapi import UploadFile
+from motor.motor_asyncio import AsyncIOMotorClient
 
-from app.common.constants import PUBLIC_FOLDER, SELF_URL
-from app.models.user.user import UserModel
+from app.common.constants import PUBLIC_FOLDER, SELF_URL, FILE_CHUNK_SIZE, MAX_UPLOAD_SIZE, IMAGE_VARIANT_SIZES, \
+    IMAGE_GC_GRACE_PERIOD, AVATAR_CACHE_SIZE
+from app.models.image.image import ImageInStorageModel, ImageBlobModel
+from app.services.image.files import AsyncFileWriter, FileIOService
+from app.services.image.storage import ImageStorageService
+from app.services.image.variants import ImageVariantService, InvalidImageError
+
+# Count of hues of generated avatars.
+AVATAR_HUES = 12
+
+AVATAR_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="200" height="200" viewBox="0 0 200 200">'
+    '<rect width="200" height="200" fill="{background}"/>'
+    '<text x="100" y="100" dy=".35em" fill="{color}" font-family="Arial, Helvetica, sans-serif" font-size="80" '
+    'text-anchor="middle">{initials}</text>'
+    '</svg>'
+)
 
 
 class ImageService:
@@ -17,6 +37,9 @@ class ImageService:
     This class is responsible for performing tasks when image is created, updated, deleted, etc.
     """
 
+    # Generated avatars (and the time they were claimed) by initials and palette.
+    _avatars_cache: OrderedDict[tuple[str, tuple], tuple[ImageInStorageModel, float]] = OrderedDict()
+
     @staticmethod
     def _url(url: str, folder: str = "uploads") -> str:
         """
@@ -28,119 +51,327 @@ class ImageService:
         """
         return f"{SELF_URL}/{PUBLIC_FOLDER}/{folder}/{url}"
 
+    @staticmethod
+    def _path(image_name: str, folder: str = "uploads") -> str:
+        """
+        Build image path on disk.
+
+        :param image_name: Image file name.
+        :param folder: Folder name.
+
+        :return: Image path.
+        """
+
+        return os.path.join(PUBLIC_FOLDER, folder, image_name)
+
+    @staticmethod
+    async def _store(source: str, digest: str, folder: str, db: AsyncIOMotorClient) -> ImageInStorageModel:
+        """
+        Store the uploaded image and its resized variants (or reuse the identical stored image).
+
+        :param source: Path of the uploaded file.
+        :param digest: SHA-256 of the uploaded bytes (hex).
+        :param folder: Folder name.
+        :param db: Database connection object.
+
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: Stored image.
+        """
+
+        key = ImageStorageService.build_key(folder, digest)
+
+        blob = await ImageStorageService.claim(key, db)
+        if blob:
+            await FileIOService.remove(source)
+            return ImageInStorageModel(url=blob.url, variants=blob.variants)
+
+        shard = ImageStorageService.get_shard(digest)
+
+        try:
+            original, variants, total_size = await ImageVariantService.process(
+                source,
+                ImageService._path(shard, folder),
+                digest
+            )
+        except InvalidImageError:
+            await FileIOService.remove(source)
+            raise
+
+        url = ImageService._url(f"{shard}/{original}", folder)
+        image = ImageInStorageModel(
+            url=url,
+            variants={
+                str(size): ImageService._url(f"{shard}/{variants[size]}", folder) if size in variants else url
+                for size in IMAGE_VARIANT_SIZES
+            }
+        )
+
+        await ImageStorageService.create(
+            ImageBlobModel(
+                id=key,
+                url=image.url,
+                variants=image.variants,
+                files=[f"{folder}/{shard}/{name}" for name in (original, *variants.values())],
+                size=total_size
+            ),
+            db
+        )
+
+        return image
+
+    @staticmethod
+    def _upload_path(stem: str, folder: str) -> str:
+        """
+        Build path of the uploaded file (before it is processed).
+
+        :param stem: Unique name of the upload.
+        :param folder: Folder name.
+
+        :return: Upload path.
+        """
+
+        return ImageService._path(f".{stem}.upload", folder)
+
     @staticmethod
     async def upload_base64_image(
             image: dict,
-            folder: str = "uploads"
-    ) -> str:
+            db: AsyncIOMotorClient,
+            folder: str = "uploads",
+            max_size: Optional[int] = MAX_UPLOAD_SIZE
+    ) -> ImageInStorageModel:
         """
         Upload image from base64.
 
+        The image is decoded and written in chunks, so the decoded image is never fully kept in memory.
+
         :param image: Image object.
+        :param db: Database connection object.
+        :param folder: Folder name.
+        :param max_size: Max image size in bytes.
 
-        :return: Image URL.
+        :raise FileTooLargeError: If the image exceeds the size limit.
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: Stored image.
         """
 
-        image_data = base64.b64decode(image["data"])
+        data = "".join(image["data"].split())
+
+        # Every 4 base64 characters are decoded into 3 bytes, so chunks must be aligned to 4 characters.
+        chunk_length = FILE_CHUNK_SIZE // 3 * 4
 
-        image_name = f"{uuid4()}.png"
-        with open(f"{PUBLIC_FOLDER}/{folder}/{image_name}", "wb") as f:
-            f.write(image_data)
+        source = ImageService._upload_path(str(uuid4()), folder)
 
-        return ImageService._url(image_name, folder)
+        async with AsyncFileWriter(source, max_size) as writer:
+            for start in range(0, len(data), chunk_length):
+                await writer.write(base64.b64decode(data[start:start + chunk_length]))
+
+        return await ImageService._store(source, writer.digest, folder, db)
 
     @staticmethod
     async def upload_image(
             image: UploadFile,
-            folder: str = 'uploads'
-    ) -> str:
+            db: AsyncIOMotorClient,
+            folder: str = 'uploads',
+            max_size: Optional[int] = MAX_UPLOAD_SIZE
+    ) -> ImageInStorageModel:
         """
         Upload image.
 
+        The upload is streamed to disk in chunks.
+
         :param image: Image object.
+        :param db: Database connection object.
+        :param folder: Folder name.
+        :param max_size: Max image size in bytes.
 
-        :return: Image URL.
+        :raise FileTooLargeError: If the image exceeds the size limit.
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: Stored image.
         """
 
-        image_name = f'{uuid4()}.png'
+        source = ImageService._upload_path(str(uuid4()), folder)
 
         await image.seek(0)
-        content = await image.read()
-        with open(f'{PUBLIC_FOLDER}/{folder}/{image_name}', 'wb') as f:
-            f.write(content)
+        async with AsyncFileWriter(source, max_size) as writer:
+            while chunk := await image.read(FILE_CHUNK_SIZE):
+                await writer.write(chunk)
 
-        return ImageService._url(image_name, folder)
+        return await ImageService._store(source, writer.digest, folder, db)
 
     @staticmethod
-    async def upload_bytes_image(file: bytes, folder: str = 'uploads') -> str:
+    async def upload_bytes_image(
+            file: bytes,
+            db: AsyncIOMotorClient,
+            folder: str = 'uploads',
+            max_size: Optional[int] = MAX_UPLOAD_SIZE
+    ) -> ImageInStorageModel:
         """
         Upload image from bytes.
 
         :param file: Bytes file.
+        :param db: Database connection object.
+        :param folder: Folder name.
+        :param max_size: Max image size in bytes.
 
-        :return: Image URL.
+        :raise FileTooLargeError: If the image exceeds the size limit.
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: Stored image.
         """
 
-        image_name = f'{uuid4()}.png'
-        with open(f'{PUBLIC_FOLDER}/{folder}/{image_name}', 'wb', encoding="utf-8") as f:
-            f.write(file)
+        source = ImageService._upload_path(str(uuid4()), folder)
+
+        async with AsyncFileWriter(source, max_size) as writer:
+            await writer.write(file)
 
-        return ImageService._url(image_name, folder)
+        return await ImageService._store(source, writer.digest, folder, db)
 
     @staticmethod
-    async def delete_image(url: str, folder: str = 'uploads') -> None:
+    async def upload_file(
+            source: str,
+            digest: str,
+            db: AsyncIOMotorClient,
+            folder: str = 'uploads'
+    ) -> ImageInStorageModel:
         """
-        Delete image.
+        Upload image from a file that is already on disk (e.g. a finalized resumable upload).
+
+        The file is moved into the storage (or removed if the identical image is stored).
+
+        :param source: File path (inside the folder).
+        :param digest: SHA-256 of the file (hex).
+        :param db: Database connection object.
+        :param folder: Folder name.
+
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: Stored image.
+        """
+
+        return await ImageService._store(source, digest, folder, db)
+
+    @staticmethod
+    async def delete_image(
+            url: Optional[str],
+            db: AsyncIOMotorClient,
+            folder: str = 'uploads',
+            variants: Optional[dict[str, str]] = None
+    ) -> None:
+        """
+        Delete image and its variants.
+
+        Content-addressed images can be shared, so only their reference is released (files are removed by the garbage
+        collector). Legacy images are removed right away.
 
         :param url: Image URL.
+        :param db: Database connection object.
         :param folder: Folder name.
+        :param variants: URLs of the image variants.
         """
-        import os
 
-        try:
-            os.remove(f'{PUBLIC_FOLDER}/{folder}/{url.split("/")[-1]}')
-        except FileNotFoundError:
-            pass
+        if ImageStorageService.get_key(url):
+            await ImageStorageService.release([url], db)
+            return
+
+        urls = {url, *(variants or {}).values()} - {None}
+
+        for image_url in urls:
+            await FileIOService.remove(ImageService._path(image_url.split("/")[-1], folder))
 
     @staticmethod
-    async def generate_mock_image(username: str) -> str:
+    async def generate_mock_image(username: str, db: AsyncIOMotorClient) -> ImageInStorageModel:
         """
         Generate mock image.
 
+        The avatar is an SVG with the initials, so no raster work is done. The palette is picked by the username, so
+        the avatar is deterministic: identical avatars are stored once, and they are cached by initials and palette.
+
         :param username: Username.
+        :param db: Database connection object.
 
-        :return: Image URL, which is generated from the initials of the username or firstname.
+        :return: Stored image, which is generated from the initials of the username or firstname.
         """
 
         initials = username[:2].upper()
 
-        background_colors, text_colors = ImageService.generate_color_palette()
+        seed = int.from_bytes(hashlib.sha256(username.encode("utf-8")).digest()[:8], "big")
+        background_colors, text_colors = ImageService.generate_color_palette(seed % AVATAR_HUES / AVATAR_HUES)
+        color = seed // AVATAR_HUES % len(background_colors)
+        palette = (background_colors[color], text_colors[color])
+
+        # Cached avatars are reused without the database while their grace period surely isn't over.
+        cached = ImageService._avatars_cache.get((initials, palette))
+        if cached and time.monotonic() - cached[1] < IMAGE_GC_GRACE_PERIOD / 2:
+            ImageService._avatars_cache.move_to_end((initials, palette))
+            return cached[0]
+
+        svg = ImageService._render_avatar(initials, *palette)
+        digest = hashlib.sha256(svg).hexdigest()
+        key = ImageStorageService.build_key("avatars", digest)
+
+        blob = await ImageStorageService.claim(key, db)
+        if blob:
+            image = ImageInStorageModel(url=blob.url, variants=blob.variants)
+        else:
+            image_name = f"{ImageStorageService.get_shard(digest)}/{digest}.svg"
+            async with AsyncFileWriter(ImageService._path(image_name, "avatars")) as writer:
+                await writer.write(svg)
+
+            # Vector image looks sharp at every size.
+            url = ImageService._url(image_name, "avatars")
+            image = ImageInStorageModel(url=url, variants={str(size): url for size in IMAGE_VARIANT_SIZES})
+
+            await ImageStorageService.create(
+                ImageBlobModel(
+                    id=key,
+                    url=url,
+                    variants=image.variants,
+                    files=[f"avatars/{image_name}"],
+                    size=len(svg)
+                ),
+                db
+            )
+
+        ImageService._avatars_cache[(initials, palette)] = (image, time.monotonic())
+        ImageService._avatars_cache.move_to_end((initials, palette))
+        while len(ImageService._avatars_cache) > AVATAR_CACHE_SIZE:
+            ImageService._avatars_cache.popitem(last=False)
+
+        return image
 
-        size = 200
+    @staticmethod
+    def _render_avatar(initials: str, background_color: tuple, text_color: tuple) -> bytes:
+        """
+        Render avatar.
 
-        image = Image.new('RGB', (size, size), color=random.choice(background_colors))
-        draw = ImageDraw.Draw(image)
-        font = ImageFont.truetype('arial.ttf', 80)
-        text_size = draw.textsize(initials, font=font)
-        text_position = ((size - text_size[0]) / 2, (size - text_size[1]) / 2)
-        draw.text(text_position, initials, fill=random.choice(text_colors), font=font)
+        :param initials: Initials.
+        :param background_color: Background color (RGB).
+        :param text_color: Text color (RGB).
 
-        image_name = f'{uuid4()}.png'
-        image.save(f'{PUBLIC_FOLDER}/avatars/{image_name}')
+        :return: SVG image.
+        """
 
-        return ImageService._url(image_name, "avatars")
+        return AVATAR_TEMPLATE.format(
+            background="#{:02x}{:02x}{:02x}".format(*background_color),
+            color="#{:02x}{:02x}{:02x}".format(*text_color),
+            initials=escape(initials)
+        ).encode("utf-8")
 
     @staticmethod
-    def generate_color_palette() -> list:
+    def generate_color_palette(hue: float) -> tuple[list, list]:
         """
         Generate color palette.
 
+        :param hue: Hue of the first color (from 0 to 1).
+
         :return: Color palette with background and text colors.
         """
 
         NUM_COLORS = 5
 
-        hue = random.random()
         saturation = 0.5
         value = 0.5
         start_color = colorsys.hsv_to_rgb(hue, saturation, value)
@@ -0,0 +1,240 @@
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from typing import BinaryIO, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Scope, Receive, Send
+
+from app.common.constants import PUBLIC_FOLDER, FILE_CHUNK_SIZE, IMAGE_FOLDERS, IMMUTABLE_FILE_MAX_AGE
+from app.exception.api import APIException
+from app.services.image.files import FileIOService
+
+# Path of a content-addressed file inside its folder (the name never points to another content).
+BLOB_PATH_PATTERN = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/(?P<name>[0-9a-f]{64}(?:_\d+)?)\.\w+$")
+
+# Single byte range (multiple ranges aren't supported, the full file is sent for them).
+RANGE_PATTERN = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+
+class FileRangeResponse(Response):
+    """
+    Response with a file or a byte range of it.
+
+    The file is opened before the response is built (so a file removed in the meantime results in 404, not in a broken
+    response), and it is closed after the response is sent. If the server supports the ASGI zero-copy send extension,
+    the file descriptor is passed to it (the kernel copies the file to the socket with `sendfile`). Otherwise, the
+    range is read in chunks in the I/O thread pool.
+    """
+
+    def __init__(
+            self,
+            file: BinaryIO,
+            start: int,
+            length: int,
+            status_code: int,
+            headers: dict[str, str],
+            media_type: Optional[str] = None,
+            send_body: bool = True
+    ):
+        """
+        :param file: Opened file.
+        :param start: Offset of the range.
+        :param length: Length of the range.
+        :param status_code: Response status code.
+        :param headers: Response headers.
+        :param media_type: Content type.
+        :param send_body: False for HEAD requests.
+        """
+
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.headers["content-length"] = str(length)
+
+        self.file = file
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        file = self.file
+
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+            if not self.send_body or not self.length:
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.length,
+                })
+                return
+
+            await FileIOService.run(file.seek, self.start)
+
+            remaining = self.length
+            while remaining > 0:
+                chunk = await FileIOService.run(file.read, min(FILE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+            if remaining > 0:
+                # The file was truncated while it was sent.
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await FileIOService.run(file.close)
+
+
+class FileServingService:
+    """
+    Service for serving uploaded files.
+
+    Content-addressed files never change, so they are served with a strong ETag (their content hash) and an immutable
+    `Cache-Control`. Other files are revalidated by an ETag built from their size and modification time. Single byte
+    ranges are supported (e.g. resuming downloads of large attachments).
+    """
+
+    @staticmethod
+    def _resolve(folder: str, path: str) -> str:
+        """
+        Resolve path of the requested file.
+
+        :param folder: Folder name.
+        :param path: File path inside the folder.
+
+        :raise APIException: If the path is outside the public folders or points to a hidden file (e.g. an upload in
+            progress).
+
+        :return: File path on disk.
+        """
+
+        parts = path.split("/")
+        if folder not in IMAGE_FOLDERS or any(not part or part.startswith(".") for part in parts):
+            raise APIException.not_found("File not found.", translation_key="fileNotFound")
+
+        return os.path.join(PUBLIC_FOLDER, folder, *parts)
+
+    @staticmethod
+    def _parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+        """
+        Parse `Range` header.
+
+        :param header: Header value.
+        :param size: File size.
+
+        :raise ValueError: If the range isn't satisfiable.
+
+        :return: Offset and length of the range (None if the full file is requested).
+        """
+
+        match = RANGE_PATTERN.match(header.strip()) if header else None
+        if not match or (not match.group("start") and not match.group("end")):
+            return None
+
+        if not match.group("start"):
+            # Suffix range, e.g. the last 500 bytes.
+            length = min(int(match.group("end")), size)
+            if not length:
+                raise ValueError("Range isn't satisfiable.")
+
+            return size - length, length
+
+        start = int(match.group("start"))
+        end = min(int(match.group("end")), size - 1) if match.group("end") else size - 1
+        if start >= size or end < start:
+            raise ValueError("Range isn't satisfiable.")
+
+        return start, end - start + 1
+
+    @staticmethod
+    async def serve(folder: str, path: str, request: Request) -> Response:
+        """
+        Serve file.
+
+        :param folder: Folder name.
+        :param path: File path inside the folder.
+        :param request: Request object.
+
+        :raise APIException: If the file doesn't exist.
+
+        :return: File response.
+        """
+
+        file_path = FileServingService._resolve(folder, path)
+
+        try:
+            file = await FileIOService.run(open, file_path, "rb")
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            raise APIException.not_found("File not found.", translation_key="fileNotFound")
+
+        try:
+            response = await FileServingService._build_response(file, file_path, path, request)
+        except BaseException:
+            await FileIOService.run(file.close)
+            raise
+
+        if not isinstance(response, FileRangeResponse):
+            await FileIOService.run(file.close)
+
+        return response
+
+    @staticmethod
+    async def _build_response(file: BinaryIO, file_path: str, path: str, request: Request) -> Response:
+        """
+        Build response for the opened file.
+
+        :param file: Opened file.
+        :param file_path: File path on disk.
+        :param path: File path inside the folder.
+        :param request: Request object.
+
+        :raise APIException: If the path isn't a regular file.
+
+        :return: File response (or a response without the file, e.g. 304).
+        """
+
+        stat = await FileIOService.run(os.fstat, file.fileno())
+        if not S_ISREG(stat.st_mode):
+            raise APIException.not_found("File not found.", translation_key="fileNotFound")
+
+        match = BLOB_PATH_PATTERN.match(path)
+        if match:
+            etag = f'"{match.group("name")}"'
+            cache_control = f"public, max-age={IMMUTABLE_FILE_MAX_AGE}, immutable"
+        else:
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            cache_control = "public, no-cache"
+
+        headers = {"etag": etag, "cache-control": cache_control, "accept-ranges": "bytes"}
+        media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+        if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=304, headers=headers)
+
+        # The range is ignored if the file was changed since the client got its part.
+        if_range = request.headers.get("if-range")
+        range_header = request.headers.get("range") if not if_range or if_range.strip() == etag else None
+
+        try:
+            byte_range = FileServingService._parse_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat.st_size}"})
+
+        send_body = request.method != "HEAD"
+        if byte_range is None:
+            return FileRangeResponse(file, 0, stat.st_size, 200, headers, media_type, send_body)
+
+        start, length = byte_range
+        headers["content-range"] = f"bytes {start}-{start + length - 1}/{stat.st_size}"
+
+        return FileRangeResponse(file, start, length, 206, headers, media_type, send_body)
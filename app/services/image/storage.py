@@ -0,0 +1,227 @@
+import asyncio
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.common.constants import IMAGE_BLOBS_COLLECTION, IMAGE_GC_GRACE_PERIOD, IMAGE_GC_BATCH_SIZE, PUBLIC_FOLDER
+from app.models.image.image import ImageBlobModel
+from app.services.image.files import FileIOService
+from app.services.metrics.metrics import MetricsService
+
+# Content-addressed image URL: `.../<public folder>/<folder>/<shard>/<shard>/<SHA-256>[_<size>].<extension>`.
+BLOB_URL_PATTERN = re.compile(
+    rf"/{re.escape(PUBLIC_FOLDER)}/(?P<folder>[^/]+)/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})"
+    r"(?:_\d+)?\.\w+$"
+)
+
+# Time (in seconds) after which an unfinished collection is considered abandoned (e.g. the worker crashed).
+COLLECTION_TIMEOUT = 60
+
+
+class ImageStorageService:
+    """
+    Service for content-addressed images.
+
+    Identical uploads are stored once: every image is keyed by SHA-256 of the uploaded bytes and is shared by all
+    messages and avatars that reference it. References are counted, and images without references are removed by the
+    garbage collector after the grace period (it covers the time between an upload and the message that uses it).
+    """
+
+    @staticmethod
+    def build_key(folder: str, digest: str) -> str:
+        """
+        Build image key.
+
+        :param folder: Folder name.
+        :param digest: SHA-256 of the uploaded bytes (hex).
+
+        :return: Image key.
+        """
+
+        return f"{folder}/{digest}"
+
+    @staticmethod
+    def get_shard(digest: str) -> str:
+        """
+        Get shard of the image files (two levels of directories, so every directory stays small).
+
+        :param digest: SHA-256 of the uploaded bytes (hex).
+
+        :return: Shard path (relative to the image folder).
+        """
+
+        return f"{digest[:2]}/{digest[2:4]}"
+
+    @staticmethod
+    def get_key(url: Optional[str]) -> Optional[str]:
+        """
+        Get image key by URL of the image or of its variant.
+
+        :param url: Image URL.
+
+        :return: Image key (None if the image isn't content-addressed, e.g. legacy uploads).
+        """
+
+        if not url:
+            return None
+
+        match = BLOB_URL_PATTERN.search(url)
+        if not match:
+            return None
+
+        return ImageStorageService.build_key(match.group("folder"), match.group("digest"))
+
+    @staticmethod
+    async def claim(key: str, db: AsyncIOMotorClient) -> Optional[ImageBlobModel]:
+        """
+        Get stored image to reuse it for a new upload.
+
+        The grace period of an unreferenced image is restarted, so it isn't collected before it is referenced. If the
+        image is being removed by the garbage collector, the removal is awaited, so the files of the new upload are
+        written only after the old files are removed.
+
+        :param key: Image key.
+        :param db: Database connection object.
+
+        :return: Image object (None if the image isn't stored).
+        """
+
+        while True:
+            blob = await db[IMAGE_BLOBS_COLLECTION].find_one_and_update(
+                {"_id": key, "collectingAt": None},
+                [{"$set": {
+                    "unreferencedAt": {"$cond": [{"$gt": ["$refCount", 0]}, None, datetime.utcnow()]},
+                }}],
+                return_document=ReturnDocument.AFTER
+            )
+            if blob:
+                MetricsService.increment("image_storage_dedup_hits")
+                return ImageBlobModel.from_mongo(blob)
+
+            collecting = await db[IMAGE_BLOBS_COLLECTION].find_one({"_id": key}, {"collectingAt": 1})
+            if not collecting:
+                return None
+
+            if collecting.get("collectingAt") is None:
+                # The image was stored concurrently.
+                continue
+
+            if collecting["collectingAt"] < datetime.utcnow() - timedelta(seconds=COLLECTION_TIMEOUT):
+                # The collection was abandoned, all files of the image are written again by the new upload.
+                await db[IMAGE_BLOBS_COLLECTION].delete_one({"_id": key, "collectingAt": collecting["collectingAt"]})
+                return None
+
+            await asyncio.sleep(0.1)
+
+    @staticmethod
+    async def create(blob: ImageBlobModel, db: AsyncIOMotorClient) -> None:
+        """
+        Save stored image.
+
+        :param blob: Image object.
+        :param db: Database connection object.
+        """
+
+        try:
+            await db[IMAGE_BLOBS_COLLECTION].insert_one(blob.mongo())
+        except DuplicateKeyError:
+            # The same image was uploaded concurrently, its files are identical.
+            pass
+
+    @staticmethod
+    async def add_references(urls: list[Optional[str]], db: AsyncIOMotorClient) -> None:
+        """
+        Add references to images (e.g. a message or an avatar uses them).
+
+        :param urls: Image URLs (one item per reference, legacy URLs are ignored).
+        :param db: Database connection object.
+        """
+
+        await ImageStorageService._update_references(urls, 1, db)
+
+    @staticmethod
+    async def release(urls: list[Optional[str]], db: AsyncIOMotorClient) -> None:
+        """
+        Remove references to images (e.g. a message is deleted or an avatar is replaced).
+
+        :param urls: Image URLs (one item per reference, legacy URLs are ignored).
+        :param db: Database connection object.
+        """
+
+        await ImageStorageService._update_references(urls, -1, db)
+
+    @staticmethod
+    async def _update_references(urls: list[Optional[str]], sign: int, db: AsyncIOMotorClient) -> None:
+        """
+        Change reference counts of images (in one batch).
+
+        :param urls: Image URLs.
+        :param sign: 1 to add references, -1 to remove them.
+        :param db: Database connection object.
+        """
+
+        counts = Counter(key for key in map(ImageStorageService.get_key, urls) if key)
+        if not counts:
+            return
+
+        now = datetime.utcnow()
+        await db[IMAGE_BLOBS_COLLECTION].bulk_write([
+            UpdateOne({"_id": key}, [
+                {"$set": {"refCount": {"$add": ["$refCount", sign * count]}}},
+                {"$set": {"unreferencedAt": {"$cond": [
+                    {"$gt": ["$refCount", 0]},
+                    None,
+                    {"$ifNull": ["$unreferencedAt", now]},
+                ]}}},
+            ])
+            for key, count in counts.items()
+        ], ordered=False)
+
+    @staticmethod
+    async def collect_garbage(db: AsyncIOMotorClient, limit: int = IMAGE_GC_BATCH_SIZE) -> tuple[int, int]:
+        """
+        Remove a batch of images that have been unreferenced for longer than the grace period.
+
+        :param db: Database connection object.
+        :param limit: Max count of removed images.
+
+        :return: Count of removed images and reclaimed bytes.
+        """
+
+        cutoff = datetime.utcnow() - timedelta(seconds=IMAGE_GC_GRACE_PERIOD)
+        query = {"refCount": {"$lte": 0}, "unreferencedAt": {"$lte": cutoff}}
+
+        candidates = db[IMAGE_BLOBS_COLLECTION].find(query, {"_id": 1}).limit(limit)
+
+        removed, reclaimed = 0, 0
+        async for candidate in candidates:
+            # The image could be referenced or reused after it was found. While its files are removed, the record is
+            # kept (uploads of the same content wait for the removal), and it is deleted after the files.
+            collecting_at = datetime.utcnow()
+            blob = await db[IMAGE_BLOBS_COLLECTION].find_one_and_update(
+                {"_id": candidate["_id"], **query},
+                {"$set": {"collectingAt": collecting_at}},
+                return_document=ReturnDocument.AFTER
+            )
+            if not blob:
+                continue
+
+            blob = ImageBlobModel.from_mongo(blob)
+            for path in blob.files:
+                await FileIOService.remove(os.path.join(PUBLIC_FOLDER, path))
+
+            await db[IMAGE_BLOBS_COLLECTION].delete_one({"_id": blob.id, "collectingAt": collecting_at})
+
+            removed += 1
+            reclaimed += blob.size
+
+        MetricsService.increment("image_storage_gc_removed", removed)
+        MetricsService.increment("image_storage_gc_reclaimed_bytes", reclaimed)
+
+        return removed, reclaimed
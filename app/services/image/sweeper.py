@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Iterator, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.common.constants import PUBLIC_FOLDER, IMAGE_FOLDERS, IMAGE_BLOBS_COLLECTION, \
+    DIALOG_MESSAGES_COLLECTION, USERS_COLLECTION, ORPHAN_SWEEP_INTERVAL, ORPHAN_SWEEP_GRACE_PERIOD, \
+    ORPHAN_SWEEP_BATCH_SIZE, SELF_URL, ORPHAN_SWEEP_URL_ALIASES
+from app.database.main import get_database
+from app.services.image.files import FileIOService
+from app.services.image.storage import ImageStorageService
+from app.services.metrics.metrics import MetricsService
+
+logger = logging.getLogger(__name__)
+
+# File path (relative to the public folder), size in bytes and modification time.
+FileEntry = tuple[str, int, float]
+
+
+def get_url_prefixes() -> list[str]:
+    """
+    Get prefixes of the file URLs: the app URLs (with both schemes) and the host-relative one.
+
+    :return: List of URL prefixes.
+    """
+
+    prefixes = {f"/{PUBLIC_FOLDER}/"}
+    for url in [SELF_URL, *ORPHAN_SWEEP_URL_ALIASES.split(",")]:
+        _, separator, origin = url.strip().rstrip("/").partition("://")
+        if separator and origin:
+            prefixes.update(f"{scheme}://{origin}/{PUBLIC_FOLDER}/" for scheme in ("http", "https"))
+
+    return sorted(prefixes)
+
+
+def walk_files() -> Iterator[list[FileEntry]]:
+    """
+    Walk the image folders directory by directory.
+
+    :return: Iterator of the files of every directory.
+    """
+
+    for folder in IMAGE_FOLDERS:
+        for directory, directories, names in os.walk(os.path.join(PUBLIC_FOLDER, folder)):
+            directories.sort()
+
+            entries = []
+            for name in sorted(names):
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+
+                path = os.path.relpath(os.path.join(directory, name), PUBLIC_FOLDER).replace(os.sep, "/")
+                entries.append((path, stat.st_size, stat.st_mtime))
+
+            yield entries
+
+
+class OrphanSweeperService:
+    """
+    Service for the orphaned files sweeper.
+
+    Files can be left on disk without references: legacy files of deleted messages and users, files of interrupted
+    uploads and files of stored images whose record was lost. The sweeper walks the image folders incrementally (a
+    batch every `ORPHAN_SWEEP_INTERVAL` seconds), cross-checks the files with references in messages and users (by
+    the exact URLs with the app URL, its aliases and host-relative ones, so the indexes are used), and removes
+    unreferenced files older than the grace period.
+
+    Files of stored images (with a record) are skipped, they are removed by the garbage collector when unreferenced.
+    """
+
+    _task: Optional[asyncio.Task] = None
+
+    # Position of the current pass and its totals.
+    _walker: Optional[Iterator[list[FileEntry]]] = None
+    _removed: int = 0
+    _reclaimed: int = 0
+
+    @staticmethod
+    async def start() -> None:
+        """
+        Start the sweeper (on application startup).
+        """
+
+        if OrphanSweeperService._task is None:
+            OrphanSweeperService._task = asyncio.create_task(OrphanSweeperService._run())
+
+    @staticmethod
+    async def stop() -> None:
+        """
+        Stop the sweeper (on application shutdown).
+        """
+
+        if OrphanSweeperService._task is None:
+            return
+
+        OrphanSweeperService._task.cancel()
+        await asyncio.gather(OrphanSweeperService._task, return_exceptions=True)
+        OrphanSweeperService._task = None
+
+    @staticmethod
+    async def _run() -> None:
+        """
+        Sweeper loop.
+        """
+
+        db = get_database()
+
+        while True:
+            await asyncio.sleep(ORPHAN_SWEEP_INTERVAL)
+
+            try:
+                await OrphanSweeperService.sweep(db)
+            except Exception:
+                logger.exception("Orphaned files sweeper failed.")
+
+    @staticmethod
+    async def sweep(db: AsyncIOMotorClient, limit: int = ORPHAN_SWEEP_BATCH_SIZE) -> tuple[int, int]:
+        """
+        Check the next batch of files and remove orphaned ones.
+
+        :param db: Database connection object.
+        :param limit: Min count of checked files (whole directories are checked, so variants stay with originals).
+
+        :return: Count of removed files and reclaimed bytes.
+        """
+
+        if OrphanSweeperService._walker is None:
+            OrphanSweeperService._walker = walk_files()
+
+        entries: list[FileEntry] = []
+        is_pass_finished = False
+
+        while len(entries) < limit:
+            directory = await FileIOService.run(next, OrphanSweeperService._walker, None)
+            if directory is None:
+                is_pass_finished = True
+                break
+
+            entries.extend(directory)
+
+        orphans = await OrphanSweeperService._find_orphans(entries, db)
+        for path, _, _ in orphans:
+            await FileIOService.remove(os.path.join(PUBLIC_FOLDER, path))
+
+        removed, reclaimed = len(orphans), sum(size for _, size, _ in orphans)
+        MetricsService.increment("orphan_sweep_checked_files", len(entries))
+        MetricsService.increment("orphan_sweep_removed_files", removed)
+        MetricsService.increment("orphan_sweep_reclaimed_bytes", reclaimed)
+
+        OrphanSweeperService._removed += removed
+        OrphanSweeperService._reclaimed += reclaimed
+
+        if is_pass_finished:
+            logger.info(
+                "Orphaned files sweeper finished a pass: %s files removed, %s bytes reclaimed.",
+                OrphanSweeperService._removed,
+                OrphanSweeperService._reclaimed
+            )
+
+            OrphanSweeperService._walker = None
+            OrphanSweeperService._removed, OrphanSweeperService._reclaimed = 0, 0
+
+        return removed, reclaimed
+
+    @staticmethod
+    async def _find_orphans(entries: list[FileEntry], db: AsyncIOMotorClient) -> list[FileEntry]:
+        """
+        Find orphaned files.
+
+        Files of the same image (original and variants) are checked together: they are kept if any of them is
+        referenced or recent.
+
+        :param entries: Checked files.
+        :param db: Database connection object.
+
+        :return: Orphaned files.
+        """
+
+        cutoff = time.time() - ORPHAN_SWEEP_GRACE_PERIOD
+        orphans: list[FileEntry] = []
+
+        # Files by image (stored images by their key, legacy files by their path).
+        images: dict[str, list[FileEntry]] = defaultdict(list)
+        for entry in entries:
+            path, _, modified_at = entry
+
+            # Temporary files of interrupted uploads.
+            if os.path.basename(path).startswith("."):
+                if modified_at < cutoff:
+                    orphans.append(entry)
+
+                continue
+
+            images[ImageStorageService.get_key(f"/{PUBLIC_FOLDER}/{path}") or path].append(entry)
+
+        images = {
+            key: files for key, files in images.items()
+            if all(modified_at < cutoff for _, _, modified_at in files)
+        }
+        if not images:
+            return orphans
+
+        stored = db[IMAGE_BLOBS_COLLECTION].find({"_id": {"$in": list(images)}}, {"_id": 1})
+        async for blob in stored:
+            images.pop(blob["_id"])
+
+        # References are looked up by their exact URLs on the indexed fields (every prefix the URL can have).
+        prefixes = get_url_prefixes()
+        urls = {
+            f"{prefix}{path}": path
+            for files in images.values() for path, _, _ in files for prefix in prefixes
+        }
+
+        referenced = set()
+        messages = db[DIALOG_MESSAGES_COLLECTION].find({"file": {"$in": list(urls), "$type": "string"}}, {"file": 1})
+        referenced.update([urls[message["file"]] async for message in messages])
+
+        users = db[USERS_COLLECTION].find({"photoURL": {"$in": list(urls)}}, {"photoURL": 1})
+        referenced.update([urls[user["photoURL"]] async for user in users])
+
+        for files in images.values():
+            if not any(path in referenced for path, _, _ in files):
+                orphans.extend(files)
+
+        return orphans
@@ -0,0 +1,187 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from app.common.constants import IMAGE_WORKERS, IMAGE_VARIANT_SIZES, IMAGE_VARIANT_FORMAT, IMAGE_VARIANT_QUALITY
+
+# Real formats of the accepted images and extensions of the stored files.
+IMAGE_EXTENSIONS = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+}
+
+assert IMAGE_VARIANT_FORMAT in ("WEBP", "JPEG"), "IMAGE_VARIANT_FORMAT must be WEBP or JPEG."
+
+
+class InvalidImageError(Exception):
+    """ Raised when an uploaded file isn't an image of an accepted format. """
+
+
+def process_image(
+        source: str,
+        directory: str,
+        stem: str,
+        sizes: tuple[int, ...],
+        variant_format: str,
+        quality: int
+) -> tuple[str, dict[int, str], int]:
+    """
+    Store the uploaded image and its resized variants.
+
+    It runs in a worker process. The original is re-encoded in its real format (with EXIF orientation applied), so
+    metadata (EXIF, GPS, comments) is stripped. Animated GIFs are kept as uploaded. The source file is removed.
+    Every file is written under a temporary name and renamed, so concurrent uploads of the same image are safe.
+
+    :param source: Path of the uploaded file.
+    :param directory: Directory of the stored files.
+    :param stem: Name of the stored files (without extension).
+    :param sizes: Max sides (in pixels) of the variants.
+    :param variant_format: Format of the variants.
+    :param quality: Encoding quality of lossy formats.
+
+    :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+    :return: File name of the original, file names of the variants by size (only smaller than the original) and the
+        total size of the files in bytes.
+    """
+
+    written = []
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+        with Image.open(source) as image:
+            if image.format not in IMAGE_EXTENSIONS:
+                raise InvalidImageError(f"Image format {image.format} isn't supported.")
+
+            original = f"{stem}.{IMAGE_EXTENSIONS[image.format]}"
+            is_animated = getattr(image, "is_animated", False)
+            image_format = image.format
+
+            image.load()
+            image = ImageOps.exif_transpose(image)
+
+            if is_animated:
+                os.replace(source, os.path.join(directory, original))
+            else:
+                _save(image, os.path.join(directory, original), image_format, quality)
+            written.append(original)
+
+            variants = {}
+            for size in sorted(sizes):
+                if size >= max(image.size):
+                    continue
+
+                variant = image.copy()
+                variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+                variants[size] = f"{stem}_{size}.{IMAGE_EXTENSIONS[variant_format]}"
+                _save(variant, os.path.join(directory, variants[size]), variant_format, quality)
+                written.append(variants[size])
+
+        return original, variants, sum(os.path.getsize(os.path.join(directory, name)) for name in written)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        for name in written:
+            _remove(os.path.join(directory, name))
+
+        raise InvalidImageError(str(e) or "File isn't a valid image.")
+    finally:
+        _remove(source)
+
+
+def _save(image: Image.Image, path: str, image_format: str, quality: int) -> None:
+    """
+    Save image without metadata.
+
+    :param image: Image.
+    :param path: File path.
+    :param image_format: Image format.
+    :param quality: Encoding quality of lossy formats.
+    """
+
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        # JPEG has no transparency, so transparent pixels are flattened on white.
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        image = image.convert("RGBA")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    elif image_format == "WEBP" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+
+    # Metadata is only written when it is passed explicitly, so nothing is copied from the upload.
+    try:
+        image.save(temp_path, image_format, quality=quality, optimize=image_format != "WEBP")
+        os.replace(temp_path, path)
+    except Exception:
+        _remove(temp_path)
+        raise
+
+
+def _remove(path: str) -> None:
+    """
+    Remove file (missing files are ignored).
+
+    :param path: File path.
+    """
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ImageVariantService:
+    """
+    Service for image variants.
+
+    Decoding and resizing are CPU bound, so images are processed in a dedicated process pool, away from the event loop
+    and the GIL.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    async def process(source: str, directory: str, stem: str) -> tuple[str, dict[int, str], int]:
+        """
+        Store the uploaded image and its resized variants (see `process_image`).
+
+        :param source: Path of the uploaded file.
+        :param directory: Directory of the stored files.
+        :param stem: Name of the stored files (without extension).
+
+        :raise InvalidImageError: If the file isn't an image of an accepted format.
+
+        :return: File name of the original, file names of the variants by size and the total size of the files.
+        """
+
+        if ImageVariantService._executor is None:
+            ImageVariantService._executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            ImageVariantService._executor,
+            process_image,
+            source,
+            directory,
+            stem,
+            IMAGE_VARIANT_SIZES,
+            IMAGE_VARIANT_FORMAT,
+            IMAGE_VARIANT_QUALITY
+        )
+
+    @staticmethod
+    def shutdown() -> None:
+        """
+        Shut down the processing pool (on application shutdown).
+        """
+
+        if ImageVariantService._executor is not None:
+            ImageVariantService._executor.shutdown(wait=True)
+            ImageVariantService._executor = None
@@ -1,8 +1,18 @@
-import httpx
+import ipaddress
+import logging
+from collections import OrderedDict
+from typing import Optional, Union
 
+import maxminddb
 from fastapi import Request
 
+from app.common.constants import GEOIP_DATABASE, GEOIP_CACHE_SIZE, TRUSTED_PROXIES
 from app.exception.api import APIException
+from app.services.metrics.metrics import MetricsService
+
+logger = logging.getLogger(__name__)
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
 
 
 class LocationService:
@@ -10,10 +20,42 @@ class LocationService:
     Service for location.
 
     This class is responsible for getting the user's geolocation and getting the user's IP-address.
+    The IP-address is taken from the request (`X-Forwarded-For` is trusted only from `TRUSTED_PROXIES`), and the
+    location is looked up in the local memory-mapped GeoIP database (MaxMind DB format, e.g. GeoLite2 City), so no
+    third-party API is requested. Without the database every location is unknown.
     """
 
+    _reader: Optional[maxminddb.Reader] = None
+    _cache: OrderedDict[str, dict] = OrderedDict()
+    _trusted_proxies: list[IPNetwork] = [
+        ipaddress.ip_network(proxy.strip(), strict=False) for proxy in TRUSTED_PROXIES.split(",") if proxy.strip()
+    ]
+
+    @staticmethod
+    def open_database() -> None:
+        """
+        Open the GeoIP database (on application startup, it fails if the configured database can't be opened).
+        """
+
+        if not GEOIP_DATABASE:
+            logger.warning("GEOIP_DATABASE isn't configured, locations of sessions are unknown.")
+            return
+
+        if LocationService._reader is None:
+            LocationService._reader = maxminddb.open_database(GEOIP_DATABASE, maxminddb.MODE_MMAP)
+
+    @staticmethod
+    def close_database() -> None:
+        """
+        Close the GeoIP database (on application shutdown).
+        """
+
+        if LocationService._reader is not None:
+            LocationService._reader.close()
+            LocationService._reader = None
+
     @staticmethod
-    async def get_ip_address(request: Request) -> str:
+    def get_ip_address(request: Request) -> str:
         """
         Get user IP-address.
 
@@ -25,29 +67,124 @@ class LocationService:
         if not request.headers.get("User-Agent"):
             raise APIException.bad_request("User-Agent header is required.", translation_key="userAgentHeaderIsRequired")
 
-        user_agent = request.headers.get("User-Agent")
-        async with httpx.AsyncClient() as client:
-            response = await client.get('https://api64.ipify.org?format=json', headers={"User-Agent": user_agent})
-            response = response.json()
+        return LocationService.get_client_ip(request) or "unknown"
 
-        return response.get("ip")
+    @staticmethod
+    def get_client_ip(request: Request) -> Optional[str]:
+        """
+        Get client IP-address of the request.
+
+        If the request came from a trusted proxy, `X-Forwarded-For` is walked from the right (the nearest hop) and
+        the first address which isn't a trusted proxy is the client, so the client can't spoof it.
+
+        :param request: Request object.
+
+        :return: Client IP-address (or None if it is unknown).
+        """
+
+        ip_address = request.client.host if request.client else None
+        if not ip_address or not LocationService._is_trusted_proxy(ip_address):
+            return ip_address
+
+        forwarded_for = request.headers.get("X-Forwarded-For", "")
+        for forwarded_ip in reversed([item.strip() for item in forwarded_for.split(",") if item.strip()]):
+            ip_address = forwarded_ip
+            if not LocationService._is_trusted_proxy(forwarded_ip):
+                break
+
+        return ip_address
 
     @staticmethod
-    async def get_location(ip_address: str) -> dict:
+    def _is_trusted_proxy(ip_address: str) -> bool:
+        """
+        Check if IP-address is a trusted proxy.
+
+        :param ip_address: IP-address.
+
+        :return: True if IP-address is in `TRUSTED_PROXIES`, False otherwise.
+        """
+
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return False
+
+        return any(ip in network for network in LocationService._trusted_proxies)
+
+    @staticmethod
+    async def get_location(ip_address: Optional[str]) -> dict:
         """
         Get user location.
 
         :param ip_address: User IP-address.
 
-        :return: User location (in "city, region, country" format).
+        :return: User location (city, region and country, every field is None if it is unknown).
+        """
+
+        if not ip_address:
+            return LocationService._build_location()
+
+        location = LocationService._cache.get(ip_address)
+        if location is not None:
+            LocationService._cache.move_to_end(ip_address)
+            MetricsService.increment("geoip_cache_hits")
+            return location
+
+        MetricsService.increment("geoip_cache_misses")
+
+        location = LocationService._lookup(ip_address)
+
+        LocationService._cache[ip_address] = location
+        while len(LocationService._cache) > GEOIP_CACHE_SIZE:
+            LocationService._cache.popitem(last=False)
+
+        return location
+
+    @staticmethod
+    def _lookup(ip_address: str) -> dict:
+        """
+        Look up IP-address location in the local database.
+
+        :param ip_address: IP-address.
+
+        :return: User location.
         """
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"https://ipinfo.io/{ip_address}/json")
-            response = response.json()
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return LocationService._build_location()
+
+        if not ip.is_global or LocationService._reader is None:
+            return LocationService._build_location()
+
+        record = LocationService._reader.get(ip_address) or {}
+        subdivisions = record.get("subdivisions") or [{}]
+
+        return LocationService._build_location(
+            city=record.get("city", {}).get("names", {}).get("en"),
+            region=subdivisions[0].get("names", {}).get("en"),
+            country=record.get("country", {}).get("iso_code"),
+        )
+
+    @staticmethod
+    def _build_location(
+            city: Optional[str] = None,
+            region: Optional[str] = None,
+            country: Optional[str] = None
+    ) -> dict:
+        """
+        Build location dict.
+
+        :param city: City.
+        :param region: Region.
+        :param country: Country code.
+
+        :return: User location.
+        """
 
         return {
-            "city": response.get("city"),
-            "region": response.get("region"),
-            "country": response.get("country"),
+            "city": city,
+            "region": region,
+            "country": country,
         }
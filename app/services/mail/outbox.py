@@ -0,0 +1,231 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.common.constants import MAIL_OUTBOX_COLLECTION, MAIL_MAX_ATTEMPTS, MAIL_RETRY_DELAY, MAIL_MAX_RETRY_DELAY, \
+    MAIL_LOCK_TIMEOUT, MAIL_RECIPIENT_LIMIT, MAIL_RECIPIENT_WINDOW
+from app.models.mail.outbox import MailOutboxModel, MailStatusEnum
+from app.models.user.settings import LanguagesEnum
+from app.services.metrics.metrics import MetricsService
+
+
+class MailOutboxService:
+    """
+    Service for mail outbox.
+
+    This class is responsible for the outbox collection: request handlers enqueue emails, and the mail worker claims,
+    sends and reschedules them.
+    """
+
+    @staticmethod
+    async def enqueue(
+            recipient: str,
+            subject: str,
+            template: str,
+            language: LanguagesEnum,
+            context: dict,
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Add email to the outbox (if the identical email isn't pending already).
+
+        :param recipient: Recipient email.
+        :param subject: Email subject.
+        :param template: Template name.
+        :param language: Email language.
+        :param context: Template variables.
+        :param db: Database connection object.
+        """
+
+        dedup_key = hashlib.sha256("\0".join((
+            recipient.lower(),
+            subject,
+            template,
+            language.value,
+            json.dumps(context, sort_keys=True, default=str),
+        )).encode("utf-8")).hexdigest()
+
+        mail = MailOutboxModel(
+            recipient=recipient,
+            subject=subject,
+            template=template,
+            language=language,
+            context=context,
+            dedup_key=dedup_key
+        )
+
+        # The unique partial index on pending `dedupKey` guarantees one pending copy for concurrent requests.
+        try:
+            result = await db[MAIL_OUTBOX_COLLECTION].update_one(
+                {"dedupKey": dedup_key, "status": MailStatusEnum.PENDING},
+                {"$setOnInsert": mail.mongo(exclude={"dedup_key", "status"})},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            result = None
+
+        if result is None or result.upserted_id is None:
+            MetricsService.increment("mail_deduplicated")
+            return
+
+        MetricsService.increment("mail_enqueued")
+
+    @staticmethod
+    async def claim(db: AsyncIOMotorClient) -> Optional[MailOutboxModel]:
+        """
+        Claim the next due email (it is locked for `MAIL_LOCK_TIMEOUT` seconds, so other workers skip it).
+
+        Every claim counts an attempt. Emails locked by a crashed worker are claimed again after the lock expires, and
+        they are marked as failed when they run out of attempts (so an email that crashes the worker isn't retried
+        forever).
+
+        :param db: Database connection object.
+
+        :return: Email object or None if there are no due emails.
+        """
+
+        while True:
+            now = datetime.utcnow()
+
+            mail = await db[MAIL_OUTBOX_COLLECTION].find_one_and_update(
+                {"$or": [
+                    {"status": MailStatusEnum.PENDING, "nextAttemptAt": {"$lte": now}},
+                    {"status": MailStatusEnum.SENDING, "lockedUntil": {"$lte": now}},
+                ]},
+                {
+                    "$set": {
+                        "status": MailStatusEnum.SENDING,
+                        "lockedUntil": now + timedelta(seconds=MAIL_LOCK_TIMEOUT),
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("nextAttemptAt", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not mail:
+                return None
+
+            mail = MailOutboxModel.from_mongo(mail)
+            if mail.attempts <= MAIL_MAX_ATTEMPTS:
+                return mail
+
+            await MailOutboxService.mark_failed(mail, mail.last_error or "Lock expired (the worker crashed).", db)
+
+    @staticmethod
+    async def get_recipient_delay(recipient: str, db: AsyncIOMotorClient) -> Optional[timedelta]:
+        """
+        Check the per-recipient rate limit.
+
+        :param recipient: Recipient email.
+        :param db: Database connection object.
+
+        :return: Time until the recipient can get the next email or None if the limit isn't exceeded.
+        """
+
+        window_start = datetime.utcnow() - timedelta(seconds=MAIL_RECIPIENT_WINDOW)
+
+        sent = await db[MAIL_OUTBOX_COLLECTION].find(
+            {"recipient": recipient, "sentAt": {"$gt": window_start}},
+            {"sentAt": 1}
+        ).sort("sentAt", 1).limit(MAIL_RECIPIENT_LIMIT).to_list(length=MAIL_RECIPIENT_LIMIT)
+
+        if len(sent) < MAIL_RECIPIENT_LIMIT:
+            return None
+
+        # The oldest email in the window leaves it first.
+        return sent[0]["sentAt"] - window_start
+
+    @staticmethod
+    async def mark_sent(mail: MailOutboxModel, db: AsyncIOMotorClient) -> None:
+        """
+        Mark email as sent.
+
+        :param mail: Email object.
+        :param db: Database connection object.
+        """
+
+        await db[MAIL_OUTBOX_COLLECTION].update_one(
+            {"_id": mail.id},
+            {
+                "$set": {"status": MailStatusEnum.SENT, "sentAt": datetime.utcnow(), "lockedUntil": None},
+                "$unset": {"dedupKey": ""},
+            }
+        )
+
+    @staticmethod
+    async def defer(mail: MailOutboxModel, delay: timedelta, db: AsyncIOMotorClient) -> None:
+        """
+        Return email to the queue without counting an attempt (e.g. the recipient rate limit is exceeded).
+
+        :param mail: Email object.
+        :param delay: Delay of the next attempt.
+        :param db: Database connection object.
+        """
+
+        await MailOutboxService._reschedule(mail, datetime.utcnow() + delay, {"attempts": mail.attempts - 1}, db)
+
+    @staticmethod
+    async def mark_failed(mail: MailOutboxModel, error: str, db: AsyncIOMotorClient) -> None:
+        """
+        Mark email attempt as failed (the email is retried with exponential backoff until `MAIL_MAX_ATTEMPTS`).
+
+        :param mail: Email object (the attempt is counted when the email is claimed).
+        :param error: Error message.
+        :param db: Database connection object.
+        """
+
+        attempts = mail.attempts
+
+        if attempts >= MAIL_MAX_ATTEMPTS:
+            MetricsService.increment("mail_failed")
+            await db[MAIL_OUTBOX_COLLECTION].update_one(
+                {"_id": mail.id},
+                {
+                    "$set": {"status": MailStatusEnum.FAILED, "attempts": attempts, "lastError": error,
+                             "lockedUntil": None},
+                    "$unset": {"dedupKey": ""},
+                }
+            )
+            return
+
+        MetricsService.increment("mail_retried")
+        delay = min(MAIL_RETRY_DELAY * 2 ** (attempts - 1), MAIL_MAX_RETRY_DELAY)
+
+        await MailOutboxService._reschedule(
+            mail,
+            datetime.utcnow() + timedelta(seconds=delay),
+            {"attempts": attempts, "lastError": error},
+            db
+        )
+
+    @staticmethod
+    async def _reschedule(mail: MailOutboxModel, next_attempt_at: datetime, fields: dict,
+                          db: AsyncIOMotorClient) -> None:
+        """
+        Return email to the pending state.
+
+        If an identical email was enqueued while this one was being sent, this copy is dropped.
+
+        :param mail: Email object.
+        :param next_attempt_at: Time of the next attempt.
+        :param fields: Other fields to update.
+        :param db: Database connection object.
+        """
+
+        try:
+            await db[MAIL_OUTBOX_COLLECTION].update_one(
+                {"_id": mail.id},
+                {"$set": {
+                    "status": MailStatusEnum.PENDING,
+                    "nextAttemptAt": next_attempt_at,
+                    "lockedUntil": None,
+                    **fields,
+                }}
+            )
+        except DuplicateKeyError:
+            await db[MAIL_OUTBOX_COLLECTION].delete_one({"_id": mail.id})
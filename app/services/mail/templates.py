@@ -0,0 +1,99 @@
+import os
+import tempfile
+from typing import Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader, Template, TemplateNotFound, select_autoescape
+
+from app.common.constants import MAIL_TEMPLATES_CACHE
+from app.models.user.settings import LanguagesEnum
+
+
+class EmailTemplateService:
+    """
+    Service for email templates.
+
+    Templates are compiled once (on startup) and their bytecode is cached on disk, so workers don't parse templates
+    again after restarts. A template can have per-language variants in `<language>/<template>.html` (e.g.
+    `ru/activation.html`), the default template is used for languages without a variant.
+    """
+
+    _env: Optional[Environment] = None
+    _templates: dict[tuple[str, LanguagesEnum], Template] = {}
+
+    @staticmethod
+    def get_environment() -> Environment:
+        """
+        Get templates environment.
+
+        :return: Jinja environment.
+        """
+
+        if EmailTemplateService._env is None:
+            cache_dir = MAIL_TEMPLATES_CACHE or os.path.join(tempfile.gettempdir(), "messenger-email-templates")
+            os.makedirs(cache_dir, exist_ok=True)
+
+            EmailTemplateService._env = Environment(
+                loader=PackageLoader("app", "templates"),
+                autoescape=select_autoescape(["html"]),
+                bytecode_cache=FileSystemBytecodeCache(cache_dir),
+                auto_reload=False,
+            )
+
+        return EmailTemplateService._env
+
+    @staticmethod
+    def load_templates() -> None:
+        """
+        Compile all email templates (on startup).
+        """
+
+        env = EmailTemplateService.get_environment()
+
+        names = {
+            name[:-len(".html")] for name in env.list_templates(extensions=["html"])
+            if "/" not in name
+        }
+
+        for name in names:
+            for language in LanguagesEnum:
+                EmailTemplateService.get_template(name, language)
+
+    @staticmethod
+    def get_template(name: str, language: LanguagesEnum = LanguagesEnum.ENGLISH) -> Template:
+        """
+        Get compiled template.
+
+        :param name: Template name (without extension).
+        :param language: Email language.
+
+        :return: Template object.
+        """
+
+        template = EmailTemplateService._templates.get((name, language))
+        if template is not None:
+            return template
+
+        env = EmailTemplateService.get_environment()
+
+        try:
+            template = env.get_template(f"{language.value}/{name}.html")
+        except TemplateNotFound:
+            template = env.get_template(f"{name}.html")
+
+        EmailTemplateService._templates[(name, language)] = template
+
+        return template
+
+    @staticmethod
+    def render(name: str, language: LanguagesEnum = LanguagesEnum.ENGLISH, **kwargs) -> str:
+        """
+        Render email template.
+
+        :param name: Template name (without extension).
+        :param language: Email language.
+        :param kwargs: Template variables.
+
+        :return: Rendered HTML.
+        """
+
+        return EmailTemplateService.get_template(name, language).render(**kwargs)
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import os
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Optional
+
+import aiosmtplib
+from jinja2 import TemplateError
+
+from app.common.constants import MAIL_WORKERS, MAIL_POLL_INTERVAL, MAIL_SMTP_IDLE_TIMEOUT
+from app.database.main import get_database
+from app.models.mail.outbox import MailOutboxModel
+from app.services.mail.outbox import MailOutboxService
+from app.services.mail.templates import EmailTemplateService
+from app.services.metrics.metrics import MetricsService
+
+logger = logging.getLogger(__name__)
+
+# Validate the mail configuration.
+MAIL_USERNAME = os.getenv("MAIL_USERNAME")
+assert MAIL_USERNAME is not None, "MAIL_USERNAME is not set. Please set it in your .env file."
+
+MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
+assert MAIL_PASSWORD is not None, "MAIL_PASSWORD is not set. Please set it in your .env file."
+
+MAIL_FROM = os.getenv("MAIL_FROM")
+assert MAIL_FROM is not None, "MAIL_FROM is not set. Please set it in your .env file."
+
+MAIL_PORT = os.getenv("MAIL_PORT")
+assert MAIL_PORT is not None, "MAIL_PORT is not set. Please set it in your .env file."
+
+MAIL_SERVER = os.getenv("MAIL_SERVER")
+assert MAIL_SERVER is not None, "MAIL_SERVER is not set. Please set it in your .env file."
+
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS")
+assert MAIL_STARTTLS is not None, "MAIL_STARTTLS is not set. Please set it in your .env file."
+
+MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS")
+assert MAIL_SSL_TLS is not None, "MAIL_SSL_TLS is not set. Please set it in your .env file."
+
+MAIL_USE_CREDENTIALS = os.getenv("MAIL_USE_CREDENTIALS")
+assert MAIL_USE_CREDENTIALS is not None, "MAIL_USE_CREDENTIALS is not set. Please set it in your .env file."
+
+MAIL_VALIDATE_CERTS = os.getenv("MAIL_VALIDATE_CERTS")
+assert MAIL_VALIDATE_CERTS is not None, "VALIDATE_CERTS is not set. Please set it in your .env file."
+
+
+def is_enabled(value: str) -> bool:
+    """
+    Parse boolean setting.
+
+    :param value: Setting value.
+
+    :return: True if the setting is enabled, False otherwise.
+    """
+
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class MailWorkerService:
+    """
+    Service for the mail worker.
+
+    This class drains the mail outbox in the background: every worker keeps its own SMTP connection open between
+    emails (it is closed after `MAIL_SMTP_IDLE_TIMEOUT` seconds without emails) and sleeps when the outbox is empty
+    (enqueueing in the same process wakes the workers up).
+    """
+
+    _tasks: list[asyncio.Task] = []
+    _wakeup: Optional[asyncio.Event] = None
+
+    @staticmethod
+    async def start() -> None:
+        """
+        Start the workers (on application startup).
+        """
+
+        if MailWorkerService._tasks:
+            return
+
+        MailWorkerService._wakeup = asyncio.Event()
+        MailWorkerService._tasks = [
+            asyncio.create_task(MailWorkerService._run(number)) for number in range(MAIL_WORKERS)
+        ]
+
+    @staticmethod
+    async def stop() -> None:
+        """
+        Stop the workers (on application shutdown), claimed emails are claimed again after their lock expires.
+        """
+
+        for task in MailWorkerService._tasks:
+            task.cancel()
+
+        await asyncio.gather(*MailWorkerService._tasks, return_exceptions=True)
+        MailWorkerService._tasks = []
+
+    @staticmethod
+    def notify() -> None:
+        """
+        Wake up the workers (a new email is enqueued).
+        """
+
+        if MailWorkerService._wakeup is not None:
+            MailWorkerService._wakeup.set()
+
+    @staticmethod
+    async def _run(number: int) -> None:
+        """
+        Worker loop.
+
+        :param number: Worker number (for logs).
+        """
+
+        db = get_database()
+        smtp: Optional[aiosmtplib.SMTP] = None
+        idle = 0.0
+
+        try:
+            while True:
+                try:
+                    mail = await MailOutboxService.claim(db)
+                except Exception:
+                    logger.exception("Mail worker %s can't claim an email.", number)
+                    mail = None
+
+                if mail is None:
+                    idle += await MailWorkerService._wait()
+
+                    if smtp is not None and idle >= MAIL_SMTP_IDLE_TIMEOUT:
+                        await MailWorkerService._disconnect(smtp)
+                        smtp = None
+
+                    continue
+
+                idle = 0.0
+                try:
+                    smtp = await MailWorkerService._process(mail, smtp, db)
+                except Exception as e:
+                    logger.exception("Mail worker %s can't process email %s.", number, mail.id)
+
+                    # The attempt is counted, so the email fails after `MAIL_MAX_ATTEMPTS` (if marking it fails as
+                    # well, the email is claimed again after its lock expires).
+                    try:
+                        await MailOutboxService.mark_failed(mail, str(e) or type(e).__name__, db)
+                    except Exception:
+                        logger.exception("Mail worker %s can't reschedule email %s.", number, mail.id)
+        finally:
+            if smtp is not None:
+                await MailWorkerService._disconnect(smtp)
+
+    @staticmethod
+    async def _wait() -> float:
+        """
+        Wait for a new email (or for the poll interval, emails can be enqueued by other processes).
+
+        :return: Waiting time (in seconds).
+        """
+
+        wakeup = MailWorkerService._wakeup
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+
+        try:
+            await asyncio.wait_for(wakeup.wait(), MAIL_POLL_INTERVAL)
+            wakeup.clear()
+        except asyncio.TimeoutError:
+            pass
+
+        return loop.time() - started_at
+
+    @staticmethod
+    async def _process(mail: MailOutboxModel, smtp: Optional[aiosmtplib.SMTP], db) -> Optional[aiosmtplib.SMTP]:
+        """
+        Send claimed email.
+
+        :param mail: Email object.
+        :param smtp: Open SMTP connection of the worker.
+        :param db: Database connection object.
+
+        :return: SMTP connection (None if it was closed because of an error).
+        """
+
+        delay = await MailOutboxService.get_recipient_delay(mail.recipient, db)
+        if delay is not None:
+            MetricsService.increment("mail_rate_limited")
+            await MailOutboxService.defer(mail, delay, db)
+            return smtp
+
+        try:
+            message = MailWorkerService._build_message(mail)
+        except TemplateError as e:
+            await MailOutboxService.mark_failed(mail, str(e), db)
+            return smtp
+
+        try:
+            if smtp is None or not smtp.is_connected:
+                smtp = await MailWorkerService._connect()
+
+            await smtp.send_message(message)
+        except (aiosmtplib.SMTPException, OSError) as e:
+            await MailOutboxService.mark_failed(mail, str(e), db)
+
+            if smtp is not None:
+                await MailWorkerService._disconnect(smtp)
+
+            return None
+
+        await MailOutboxService.mark_sent(mail, db)
+        MetricsService.increment("mail_sent")
+
+        return smtp
+
+    @staticmethod
+    def _build_message(mail: MailOutboxModel) -> EmailMessage:
+        """
+        Build MIME message (the template is rendered here, out of the request).
+
+        :param mail: Email object.
+
+        :return: Email message.
+        """
+
+        message = EmailMessage()
+        message["From"] = formataddr((MAIL_FROM, MAIL_USERNAME))
+        message["To"] = mail.recipient
+        message["Subject"] = mail.subject
+        message.set_content(
+            EmailTemplateService.render(mail.template, mail.language, **mail.context),
+            subtype="html"
+        )
+
+        return message
+
+    @staticmethod
+    async def _connect() -> aiosmtplib.SMTP:
+        """
+        Open SMTP connection.
+
+        :return: SMTP connection.
+        """
+
+        smtp = aiosmtplib.SMTP(
+            hostname=MAIL_SERVER,
+            port=int(MAIL_PORT),
+            use_tls=is_enabled(MAIL_SSL_TLS),
+            start_tls=is_enabled(MAIL_STARTTLS),
+            validate_certs=is_enabled(MAIL_VALIDATE_CERTS),
+        )
+        await smtp.connect()
+
+        if is_enabled(MAIL_USE_CREDENTIALS):
+            await smtp.login(MAIL_USERNAME, MAIL_PASSWORD)
+
+        return smtp
+
+    @staticmethod
+    async def _disconnect(smtp: aiosmtplib.SMTP) -> None:
+        """
+        Close SMTP connection (errors are ignored, the connection can be already broken).
+
+        :param smtp: SMTP connection.
+        """
+
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
@@ -0,0 +1,109 @@
+import threading
+from collections import defaultdict
+
+
+class MetricsService:
+    """
+    Service for metrics.
+
+    This class stores in-process counters, gauges and timings of the worker (they are exposed by the metrics endpoint).
+    Metric labels are passed as keyword arguments, e.g. `MetricsService.increment("search_cache_hits", section="users")`.
+    """
+
+    _lock = threading.Lock()
+    _counters: dict[str, float] = defaultdict(float)
+    _gauges: dict[str, float] = {}
+    _timings: dict[str, dict[str, float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> str:
+        """
+        Build metric key (in Prometheus-like format).
+
+        :param name: Metric name.
+        :param labels: Metric labels.
+
+        :return: Metric key.
+        """
+
+        if not labels:
+            return name
+
+        return name + "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+    @staticmethod
+    def increment(name: str, value: float = 1, **labels) -> None:
+        """
+        Increment counter.
+
+        :param name: Counter name.
+        :param value: Increment value.
+        :param labels: Counter labels.
+        """
+
+        with MetricsService._lock:
+            MetricsService._counters[MetricsService._key(name, labels)] += value
+
+    @staticmethod
+    def set_gauge(name: str, value: float, **labels) -> None:
+        """
+        Set gauge value.
+
+        :param name: Gauge name.
+        :param value: Gauge value.
+        :param labels: Gauge labels.
+        """
+
+        with MetricsService._lock:
+            MetricsService._gauges[MetricsService._key(name, labels)] = value
+
+    @staticmethod
+    def get_counter(name: str, **labels) -> float:
+        """
+        Get counter value.
+
+        :param name: Counter name.
+        :param labels: Counter labels.
+
+        :return: Counter value.
+        """
+
+        return MetricsService._counters.get(MetricsService._key(name, labels), 0)
+
+    @staticmethod
+    def observe(name: str, value: float, **labels) -> None:
+        """
+        Record timing (or any other distribution) value.
+
+        :param name: Timing name.
+        :param value: Observed value (e.g. duration in seconds).
+        :param labels: Timing labels.
+        """
+
+        with MetricsService._lock:
+            timing = MetricsService._timings.setdefault(
+                MetricsService._key(name, labels),
+                {"count": 0, "sum": 0.0, "max": 0.0}
+            )
+
+            timing["count"] += 1
+            timing["sum"] += value
+            timing["max"] = max(timing["max"], value)
+
+    @staticmethod
+    def snapshot() -> dict:
+        """
+        Get all metrics.
+
+        :return: Counters, gauges and timings (with the average value).
+        """
+
+        with MetricsService._lock:
+            return {
+                "counters": dict(MetricsService._counters),
+                "gauges": dict(MetricsService._gauges),
+                "timings": {
+                    key: {**timing, "avg": timing["sum"] / timing["count"]}
+                    for key, timing in MetricsService._timings.items()
+                },
+            }
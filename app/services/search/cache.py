@@ -0,0 +1,223 @@
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Hashable, Iterable, NamedTuple, Optional
+
+from app.common.constants import SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL
+from app.models.common.object_id import PyObjectId
+from app.models.search.search import SearchSectionsEnum
+from app.services.metrics.metrics import MetricsService
+
+
+class SearchCacheEntry(NamedTuple):
+    """
+    Cached search section.
+    """
+
+    value: Any
+    user_ids: frozenset
+    expires_at: float
+
+
+class SearchCacheService:
+    """
+    Service for search results cache.
+
+    This class keeps a bounded LRU cache of search sections keyed by (user ID, normalized query, section, section
+    parameters). Entries are invalidated by events (new messages, dialog changes, profile updates), expired entries
+    are dropped after `SEARCH_CACHE_TTL` seconds, because the cache is per worker and doesn't see events of other
+    workers.
+    """
+
+    _entries: OrderedDict[tuple, SearchCacheEntry] = OrderedDict()
+    _keys_by_user: dict[PyObjectId, set[tuple]] = defaultdict(set)
+
+    # Versions are bumped on invalidation, so a search that was started before an event can't store a stale result.
+    _global_version = 0
+    _user_versions: dict[PyObjectId, int] = defaultdict(int)
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Normalize search query (case and whitespaces).
+
+        :param query: Search query.
+
+        :return: Normalized query.
+        """
+
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def get_version(user_id: PyObjectId) -> tuple[int, int]:
+        """
+        Get cache version of the user (it must be taken before the search is started).
+
+        :param user_id: User ID.
+
+        :return: Cache version.
+        """
+
+        return SearchCacheService._global_version, SearchCacheService._user_versions[user_id]
+
+    @staticmethod
+    def get(
+            user_id: PyObjectId,
+            query: str,
+            section: SearchSectionsEnum,
+            params: Hashable = None
+    ) -> tuple[bool, Any]:
+        """
+        Get cached search section.
+
+        :param user_id: User ID.
+        :param query: Search query.
+        :param section: Search section.
+        :param params: Section parameters (e.g. pagination).
+
+        :return: Tuple of hit flag and cached section result.
+        """
+
+        key = (user_id, SearchCacheService.normalize_query(query), section, params)
+        entry = SearchCacheService._entries.get(key)
+
+        if entry is not None and entry.expires_at < time.monotonic():
+            SearchCacheService._remove(key)
+            entry = None
+
+        if entry is None:
+            SearchCacheService._record_lookup(section, False)
+            return False, None
+
+        SearchCacheService._entries.move_to_end(key)
+        SearchCacheService._record_lookup(section, True)
+
+        return True, entry.value
+
+    @staticmethod
+    def set(
+            user_id: PyObjectId,
+            query: str,
+            section: SearchSectionsEnum,
+            params: Hashable,
+            value: Any,
+            user_ids: Iterable[PyObjectId],
+            version: tuple[int, int]
+    ) -> None:
+        """
+        Store search section.
+
+        :param user_id: User ID.
+        :param query: Search query.
+        :param section: Search section.
+        :param params: Section parameters (e.g. pagination).
+        :param value: Section result.
+        :param user_ids: IDs of the users that are present in the result (their profile updates invalidate the entry).
+        :param version: Cache version of the user taken before the search was started.
+        """
+
+        if SEARCH_CACHE_SIZE <= 0 or version != SearchCacheService.get_version(user_id):
+            return
+
+        key = (user_id, SearchCacheService.normalize_query(query), section, params)
+
+        SearchCacheService._entries[key] = SearchCacheEntry(
+            value=value,
+            user_ids=frozenset(user_ids),
+            expires_at=time.monotonic() + SEARCH_CACHE_TTL
+        )
+        SearchCacheService._entries.move_to_end(key)
+        SearchCacheService._keys_by_user[user_id].add(key)
+
+        while len(SearchCacheService._entries) > SEARCH_CACHE_SIZE:
+            oldest_key = next(iter(SearchCacheService._entries))
+            SearchCacheService._remove(oldest_key)
+            MetricsService.increment("search_cache_evictions")
+
+        MetricsService.set_gauge("search_cache_size", len(SearchCacheService._entries))
+
+    @staticmethod
+    def invalidate_users(user_ids: Iterable[PyObjectId]) -> None:
+        """
+        Invalidate all cached searches of users (e.g. on a new message or a dialog change).
+
+        :param user_ids: User IDs.
+        """
+
+        for user_id in user_ids:
+            SearchCacheService._user_versions[user_id] += 1
+
+            for key in list(SearchCacheService._keys_by_user.pop(user_id, ())):
+                SearchCacheService._remove(key)
+
+            MetricsService.increment("search_cache_invalidations", reason="user")
+
+        MetricsService.set_gauge("search_cache_size", len(SearchCacheService._entries))
+
+    @staticmethod
+    def invalidate_profile(user_id: PyObjectId) -> None:
+        """
+        Invalidate cached searches after a profile update of the user.
+
+        Entries that contain the user are dropped, as well as all users sections (the user can match other queries
+        now), and the own searches of the user.
+
+        :param user_id: User ID.
+        """
+
+        SearchCacheService._global_version += 1
+
+        stale_keys = [
+            key for key, entry in SearchCacheService._entries.items()
+            if key[2] == SearchSectionsEnum.USERS or user_id in entry.user_ids
+        ]
+        for key in stale_keys:
+            SearchCacheService._remove(key)
+
+        MetricsService.increment("search_cache_invalidations", reason="profile")
+        SearchCacheService.invalidate_users([user_id])
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Clear cache.
+        """
+
+        SearchCacheService._entries.clear()
+        SearchCacheService._keys_by_user.clear()
+        SearchCacheService._global_version += 1
+
+        MetricsService.set_gauge("search_cache_size", 0)
+
+    @staticmethod
+    def _remove(key: tuple) -> None:
+        """
+        Remove cache entry.
+
+        :param key: Cache key.
+        """
+
+        if SearchCacheService._entries.pop(key, None) is None:
+            return
+
+        user_keys: Optional[set] = SearchCacheService._keys_by_user.get(key[0])
+        if user_keys is None:
+            return
+
+        user_keys.discard(key)
+        if not user_keys:
+            SearchCacheService._keys_by_user.pop(key[0], None)
+
+    @staticmethod
+    def _record_lookup(section: SearchSectionsEnum, is_hit: bool) -> None:
+        """
+        Record cache lookup in metrics (hits, misses and hit rate by section).
+
+        :param section: Search section.
+        :param is_hit: True if the section was found in cache.
+        """
+
+        MetricsService.increment("search_cache_hits" if is_hit else "search_cache_misses", section=section.value)
+
+        hits = MetricsService.get_counter("search_cache_hits", section=section.value)
+        misses = MetricsService.get_counter("search_cache_misses", section=section.value)
+        MetricsService.set_gauge("search_cache_hit_rate", hits / (hits + misses), section=section.value)
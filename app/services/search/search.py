@@ -1,10 +1,19 @@
+import asyncio
+from typing import Optional, Awaitable, Any, AsyncIterator, Callable
+
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.common.constants import SEARCH_DIALOGS_TIMEOUT, SEARCH_MESSAGES_TIMEOUT, SEARCH_USERS_TIMEOUT
+from app.exception.api import APIException
 from app.models.common.object_id import PyObjectId
-from app.models.search.search import SearchResultModel
+from app.models.dialog.dialog import DialogModel, DialogInResponseModel, LastMessageInDialogModel, \
+    UserInLastMessageModel
+from app.models.search.search import SearchResultModel, SearchSectionsEnum, SearchSectionResultModel, \
+    SearchCacheModel, UsersCursor
 from app.models.user.user import UserModel
 from app.services.dialog.dialog import DialogService
 from app.services.dialog.message import DialogMessageService
+from app.services.search.cache import SearchCacheService
 from app.services.user.user import UserService
 
 
@@ -19,7 +28,10 @@ class SearchService:
     async def search(
             query: str,
             current_user: UserModel,
-            db: AsyncIOMotorClient
+            db: AsyncIOMotorClient,
+            skip: int = 0,
+            limit: int = 100,
+            users_cursor: Optional[UsersCursor] = None
     ) -> SearchResultModel:
         """
         Search by query.
@@ -27,25 +39,295 @@ class SearchService:
         :param query: Search query.
         :param current_user: Current user.
         :param db: Database connection object.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
+        :param users_cursor: Cursor of the users page (from the previous search result).
 
         :return: Search result object.
         """
 
-        dialogs = await DialogService.search(query, current_user, db)
+        timed_out = []
+        sections = SearchService._get_sections(query, current_user, db, skip, limit, users_cursor)
+
+        dialogs, messages, (users, next_users_cursor) = await asyncio.gather(*[
+            SearchService._run_section(section, search(), timeout, default, timed_out)
+            for section, (search, timeout, default) in sections.items()
+        ])
+
+        truncated = []
+        if len(messages) == limit:
+            truncated.append(SearchSectionsEnum.MESSAGES)
+
+        if next_users_cursor is not None:
+            truncated.append(SearchSectionsEnum.USERS)
+
+        return SearchResultModel(
+            dialogs=dialogs,
+            messages=messages,
+            users=users,
+            users_cursor=next_users_cursor,
+            truncated=truncated,
+            timed_out=timed_out
+        )
+
+    @staticmethod
+    async def stream(
+            query: str,
+            current_user: UserModel,
+            db: AsyncIOMotorClient,
+            cache: Optional[SearchCacheModel] = None,
+            skip: int = 0,
+            limit: int = 100
+    ) -> AsyncIterator[SearchSectionResultModel]:
+        """
+        Search by query and yield every section as soon as it is finished.
+
+        If the query refines the cached query (e.g. the user typed one more letter), complete sections of the cached
+        result are filtered in-process instead of querying the database again. Messages are always searched again,
+        because the full-text search doesn't match by prefixes.
+
+        :param query: Search query.
+        :param current_user: Current user.
+        :param db: Database connection object.
+        :param cache: Previous search of the connection.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
+
+        :return: Async iterator of section results.
+        """
+
+        is_refinement = cache is not None and query.lower().startswith(cache.query.lower())
+
+        if is_refinement and cache.dialogs is not None:
+            yield SearchSectionResultModel(
+                section=SearchSectionsEnum.DIALOGS,
+                data=[dialog for dialog in cache.dialogs if DialogService.matches_search(dialog, query)]
+            )
+
+        if is_refinement and cache.users is not None:
+            yield SearchSectionResultModel(
+                section=SearchSectionsEnum.USERS,
+                data=[user for user in cache.users if UserService.matches_search(user, query)]
+            )
 
-        user_dialogs = await DialogService.get_dialogs(current_user, db)
-        messages = await DialogMessageService.search(query, user_dialogs, db)
+        sections = SearchService._get_sections(query, current_user, db, skip, limit)
+        if is_refinement and cache.dialogs is not None:
+            sections.pop(SearchSectionsEnum.DIALOGS)
 
-        users = await UserService.search(query, current_user, db)
+        if is_refinement and cache.users is not None:
+            sections.pop(SearchSectionsEnum.USERS)
 
-        return SearchResultModel(dialogs=dialogs, messages=messages, users=users)
+        async def run(section: SearchSectionsEnum) -> tuple[SearchSectionsEnum, Any, bool]:
+            search, timeout, default = sections[section]
+            timed_out = []
+
+            result = await SearchService._run_section(section, search(), timeout, default, timed_out)
+            return section, result, bool(timed_out)
+
+        tasks = [asyncio.create_task(run(section)) for section in sections]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                section, result, timed_out = await task
+
+                if section == SearchSectionsEnum.USERS:
+                    users, next_users_cursor = result
+                    yield SearchSectionResultModel(
+                        section=section,
+                        data=users,
+                        users_cursor=next_users_cursor,
+                        truncated=next_users_cursor is not None,
+                        timed_out=timed_out
+                    )
+                    continue
+
+                yield SearchSectionResultModel(
+                    section=section,
+                    data=result,
+                    truncated=section == SearchSectionsEnum.MESSAGES and len(result) == limit,
+                    timed_out=timed_out
+                )
+        finally:
+            # Don't leave sections running if the search was cancelled (e.g. by a newer query).
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _get_sections(
+            query: str,
+            current_user: UserModel,
+            db: AsyncIOMotorClient,
+            skip: int = 0,
+            limit: int = 100,
+            users_cursor: Optional[UsersCursor] = None
+    ) -> dict[SearchSectionsEnum, tuple[Callable[[], Awaitable], float, Any]]:
+        """
+        Get search sections.
+
+        :param query: Search query.
+        :param current_user: Current user.
+        :param db: Database connection object.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
+        :param users_cursor: Cursor of the users page.
+
+        :return: Search function, deadline and default result (if the deadline is exceeded) by section.
+        """
+
+        def cached(section: SearchSectionsEnum, params: Any, search: Callable[[], Awaitable]) -> Callable[[], Awaitable]:
+            return lambda: SearchService._run_cached_section(query, section, params, current_user, search)
+
+        return {
+            SearchSectionsEnum.DIALOGS: (
+                cached(
+                    SearchSectionsEnum.DIALOGS,
+                    None,
+                    lambda: DialogService.search(query, current_user, db)
+                ),
+                SEARCH_DIALOGS_TIMEOUT,
+                []
+            ),
+            SearchSectionsEnum.MESSAGES: (
+                cached(
+                    SearchSectionsEnum.MESSAGES,
+                    (skip, limit),
+                    lambda: SearchService.search_all_messages(query, current_user, db, skip, limit)
+                ),
+                SEARCH_MESSAGES_TIMEOUT,
+                []
+            ),
+            SearchSectionsEnum.USERS: (
+                cached(
+                    SearchSectionsEnum.USERS,
+                    users_cursor,
+                    lambda: UserService.search(query, current_user, db, users_cursor)
+                ),
+                SEARCH_USERS_TIMEOUT,
+                ([], None)
+            ),
+        }
+
+    @staticmethod
+    async def _run_cached_section(
+            query: str,
+            section: SearchSectionsEnum,
+            params: Any,
+            current_user: UserModel,
+            search: Callable[[], Awaitable]
+    ) -> Any:
+        """
+        Run search section through the search results cache.
+
+        :param query: Search query.
+        :param section: Search section.
+        :param params: Section parameters (part of the cache key, e.g. pagination).
+        :param current_user: Current user.
+        :param search: Section search function.
+
+        :return: Section result.
+        """
+
+        is_hit, result = SearchCacheService.get(current_user.id, query, section, params)
+        if is_hit:
+            return result
+
+        version = SearchCacheService.get_version(current_user.id)
+        result = await search()
+
+        SearchCacheService.set(
+            current_user.id,
+            query,
+            section,
+            params,
+            result,
+            SearchService._get_result_user_ids(section, result),
+            version
+        )
+
+        return result
+
+    @staticmethod
+    def _get_result_user_ids(section: SearchSectionsEnum, result: Any) -> set[PyObjectId]:
+        """
+        Get IDs of the users that are present in the section result.
+
+        :param section: Search section.
+        :param result: Section result.
+
+        :return: Set of user IDs.
+        """
+
+        if section == SearchSectionsEnum.USERS:
+            users, _ = result
+            return {user.id for user in users}
+
+        user_ids = set()
+        for dialog in result:
+            user_ids.add(dialog.user.id)
+
+            if dialog.last_message:
+                user_ids.add(dialog.last_message.sender.id)
+
+        return user_ids
+
+    @staticmethod
+    async def _run_section(
+            section: SearchSectionsEnum,
+            coroutine: Awaitable,
+            timeout: float,
+            default: Any,
+            timed_out: list[SearchSectionsEnum]
+    ) -> Any:
+        """
+        Run search section with a deadline.
+
+        :param section: Search section.
+        :param coroutine: Section search coroutine.
+        :param timeout: Section deadline (in seconds).
+        :param default: Section result if the deadline is exceeded.
+        :param timed_out: List of timed out sections (the section is appended to it if the deadline is exceeded).
+
+        :return: Section result.
+        """
+
+        try:
+            return await asyncio.wait_for(coroutine, timeout)
+        except asyncio.TimeoutError:
+            timed_out.append(section)
+            return default
+
+    @staticmethod
+    async def search_all_messages(
+            query: str,
+            current_user: UserModel,
+            db: AsyncIOMotorClient,
+            skip: int = 0,
+            limit: int = 100
+    ) -> list[DialogInResponseModel]:
+        """
+        Search messages in all user dialogs.
+
+        :param query: Search query.
+        :param current_user: Current user.
+        :param db: Database connection object.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
+
+        :return: List of dialogs (every found message is set as the last message of its dialog).
+        """
+
+        user_dialogs = await DialogService.get_by_user_id(current_user.id, db, limit=0)
+
+        return await SearchService.search_messages(query, user_dialogs, current_user, db, skip, limit)
 
     @staticmethod
     async def search_by_dialog(
             query: str,
             dialog_id: PyObjectId,
             current_user: UserModel,
-            db: AsyncIOMotorClient
+            db: AsyncIOMotorClient,
+            skip: int = 0,
+            limit: int = 100
     ) -> SearchResultModel:
         """
         Search by dialog.
@@ -54,12 +336,85 @@ class SearchService:
         :param dialog_id: Dialog ID.
         :param current_user: Current user.
         :param db: Database connection object.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
 
         :return: Search result object.
         """
 
         dialog = await DialogService.get_by_id(dialog_id, db)
-        dialog = await DialogService.build_dialog(dialog, current_user, db)
-        messages = await DialogMessageService.search(query, [dialog], db)
+        if not dialog or current_user.id not in (dialog.from_user.id, dialog.to_user.id):
+            raise APIException.not_found("Dialog not found.", translation_key="dialogNotFound")
+
+        messages = await SearchService.search_messages(query, [dialog], current_user, db, skip, limit)
 
         return SearchResultModel(dialogs=[], messages=messages)
+
+    @staticmethod
+    async def search_messages(
+            query: str,
+            dialogs: list[DialogModel],
+            current_user: UserModel,
+            db: AsyncIOMotorClient,
+            skip: int = 0,
+            limit: int = 100
+    ) -> list[DialogInResponseModel]:
+        """
+        Search messages in dialogs.
+
+        Messages of all dialogs are found with one full-text query, then only the dialogs with found messages are
+        built (in batch), so the count of database round trips doesn't depend on the count of dialogs and hits.
+
+        :param query: Search query.
+        :param dialogs: Dialogs to search in.
+        :param current_user: Current user.
+        :param db: Database connection object.
+        :param skip: Count of messages that will be skipped.
+        :param limit: Count of messages that will be returned.
+
+        :return: List of dialogs (every found message is set as the last message of its dialog).
+        """
+
+        messages = await DialogMessageService.get_by_text(
+            query,
+            [dialog.id for dialog in dialogs],
+            db,
+            current_user.settings.language,
+            skip,
+            limit
+        )
+        if not messages:
+            return []
+
+        found_dialog_ids = {message.dialog_id for message in messages}
+        found_dialogs = await DialogService.build_dialog_summaries(
+            [dialog for dialog in dialogs if dialog.id in found_dialog_ids],
+            current_user,
+            db,
+            include_last_message=False
+        )
+        found_dialogs = {dialog.id: dialog for dialog in found_dialogs}
+
+        result = []
+        for message in messages:
+            dialog = found_dialogs.get(message.dialog_id)
+            if not dialog:
+                continue
+
+            # Dialogs are personal, so the sender is either the current user or the dialog partner.
+            sender = current_user if message.sender_id == current_user.id else dialog.user
+            if sender.id != message.sender_id:
+                continue
+
+            result.append(
+                DialogInResponseModel(
+                    **dialog.dict(exclude={"last_message"}),
+                    last_message=LastMessageInDialogModel(
+                        sender=UserInLastMessageModel(**sender.dict()),
+                        sent_at=message.sent_at,
+                        **message.dict(exclude={"sent_at"})
+                    )
+                )
+            )
+
+        return result
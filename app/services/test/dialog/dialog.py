@@ -46,7 +46,7 @@ class TestDialogService:
 
         return DialogInResponseModel(
             last_message=None,
-            images=[],
+            media_count=0,
             unread_messages=0,
             messages=[],
             user=UserInDialogResponseModel(**user.dict()),
@@ -1,11 +1,37 @@
+import hashlib
+import json
 import os
+import time
+from collections import OrderedDict
 from datetime import timedelta, datetime, timezone
 from typing import Any, Optional
 
 import jwt
 from fastapi.encoders import jsonable_encoder
+from jwt.algorithms import get_default_algorithms
 
+from app.common.constants import JWT_CACHE_SIZE
 from app.models.user.token import TokenInCreateModel
+from app.services.metrics.metrics import MetricsService
+
+
+class TokenKeys:
+    """
+    Loaded signing and verification keys.
+    """
+
+    def __init__(self, algorithm: str, signing_key: Any, key_id: Optional[str], verification_keys: dict[str, Any]):
+        """
+        :param algorithm: JWT algorithm name (e.g. HS256, ES256 or EdDSA).
+        :param signing_key: Prepared signing key.
+        :param key_id: ID of the signing key (`kid` header), None for symmetric algorithms.
+        :param verification_keys: Prepared verification keys by key ID (old keys are kept there during rotation).
+        """
+
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.key_id = key_id
+        self.verification_keys = verification_keys
 
 
 class TokenService:
@@ -13,8 +39,114 @@ class TokenService:
     Service for working with tokens.
 
     This class allows us to work with tokens.
+    Keys are loaded once (on startup) and verified tokens are cached until their expiration, so a token that is sent
+    with every request and websocket frame is verified only once.
     """
 
+    _keys: Optional[TokenKeys] = None
+    _cache: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def load_keys() -> TokenKeys:
+        """
+        Load signing and verification keys from the environment.
+
+        * Symmetric algorithms (HS256, ...) use `JWT_SECRET`.
+        * Asymmetric algorithms (ES256, EdDSA, ...) sign with the PEM private key from `JWT_PRIVATE_KEY_FILE` (its ID
+          is `JWT_KEY_ID`) and verify with it and with the PEM public keys `<kid>.pem` from `JWT_PUBLIC_KEYS_DIR`
+          (keys of previous rotations, so tokens signed with them are still valid).
+
+        :return: Loaded keys.
+        """
+
+        algorithm_name = os.getenv("JWT_ALGORITHM", "HS256")
+
+        algorithms = get_default_algorithms()
+        if algorithm_name not in algorithms:
+            raise RuntimeError(f"Unsupported JWT algorithm: {algorithm_name} (asymmetric algorithms require "
+                               f"the `cryptography` package).")
+
+        algorithm = algorithms[algorithm_name]
+
+        if algorithm_name.startswith("HS"):
+            secret = os.getenv("JWT_SECRET")
+            assert secret is not None
+
+            key = algorithm.prepare_key(secret)
+            TokenService._keys = TokenKeys(algorithm_name, key, None, {})
+            TokenService._cache.clear()
+
+            return TokenService._keys
+
+        key_id = os.getenv("JWT_KEY_ID")
+        private_key_file = os.getenv("JWT_PRIVATE_KEY_FILE")
+        assert key_id and private_key_file
+
+        with open(private_key_file, "rb") as file:
+            signing_key = algorithm.prepare_key(file.read())
+
+        verification_keys = {key_id: signing_key.public_key()}
+
+        public_keys_dir = os.getenv("JWT_PUBLIC_KEYS_DIR")
+        if public_keys_dir:
+            for filename in os.listdir(public_keys_dir):
+                if not filename.endswith(".pem"):
+                    continue
+
+                with open(os.path.join(public_keys_dir, filename), "rb") as file:
+                    verification_keys.setdefault(filename[:-len(".pem")], algorithm.prepare_key(file.read()))
+
+        TokenService._keys = TokenKeys(algorithm_name, signing_key, key_id, verification_keys)
+        TokenService._cache.clear()
+
+        return TokenService._keys
+
+    @staticmethod
+    def get_keys() -> TokenKeys:
+        """
+        Get loaded keys (they are loaded on the first call if the application startup was skipped, e.g. in scripts).
+
+        :return: Loaded keys.
+        """
+
+        return TokenService._keys or TokenService.load_keys()
+
+    @staticmethod
+    def get_jwks() -> dict:
+        """
+        Get public verification keys as JWK Set (for other services that verify tokens).
+
+        :return: JWK Set (empty for symmetric algorithms, their secret can't be published).
+        """
+
+        keys = TokenService.get_keys()
+        if keys.key_id is None:
+            return {"keys": []}
+
+        algorithm = get_default_algorithms()[keys.algorithm]
+
+        jwks = []
+        for key_id, key in keys.verification_keys.items():
+            jwk = json.loads(algorithm.to_jwk(key))
+            jwks.append({**jwk, "kid": key_id, "alg": keys.algorithm, "use": "sig"})
+
+        return {"keys": jwks}
+
+    @staticmethod
+    def _encode(payload: dict) -> str:
+        """
+        Sign token payload with the current signing key.
+
+        :param payload: Token payload.
+
+        :return: Token.
+        """
+
+        keys = TokenService.get_keys()
+        headers = {"kid": keys.key_id} if keys.key_id else None
+
+        return jwt.encode(payload=payload, key=keys.signing_key, algorithm=keys.algorithm, headers=headers)
+
     @staticmethod
     def generate_access_token(**kwargs: Any) -> str:
         """
@@ -29,7 +161,7 @@ class TokenService:
                                      iat=datetime.now(tz=timezone.utc).timestamp(), payload=kwargs)
         payload = jsonable_encoder(payload)
 
-        return jwt.encode(payload=payload, key=os.getenv("JWT_SECRET"), algorithm=os.getenv("JWT_ALGORITHM"))
+        return TokenService._encode(payload)
 
     @staticmethod
     def decode(token: str) -> Optional[dict]:
@@ -38,17 +170,62 @@ class TokenService:
 
         :param token: Token.
 
-        :return: Decoded token.
+        :return: Decoded token (it's shared with the cache, so it must not be changed).
+        """
+
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+
+        cached = TokenService._cache.get(digest)
+        if cached is not None:
+            payload, expires_at = cached
+            if expires_at > time.time():
+                TokenService._cache.move_to_end(digest)
+                MetricsService.increment("token_cache_hits")
+                return payload
+
+            TokenService._cache.pop(digest, None)
+
+        MetricsService.increment("token_cache_misses")
+
+        payload = TokenService._verify(token)
+        if payload is None or JWT_CACHE_SIZE <= 0:
+            return payload
+
+        # Only tokens with an expiration are cached (the entry expires together with the token).
+        if isinstance(payload.get("exp"), (int, float)):
+            TokenService._cache[digest] = (payload, payload["exp"])
+
+            while len(TokenService._cache) > JWT_CACHE_SIZE:
+                TokenService._cache.popitem(last=False)
+
+        return payload
+
+    @staticmethod
+    def _verify(token: str) -> Optional[dict]:
+        """
+        Verify token signature and expiration.
+
+        :param token: Token.
+
+        :return: Decoded token or None if the token is invalid.
         """
+
         options = {
             "verify_exp": True,         # Verify the expiration time
             "verify_iat": False,        # Verify the issued at time
             "verify_signature": True,   # Verify the signature
         }
 
+        keys = TokenService.get_keys()
+
         try:
-            return jwt.decode(jwt=token, key=os.getenv("JWT_SECRET"), algorithms=[os.getenv("JWT_ALGORITHM")],
-                              options=options)
+            key = keys.signing_key
+            if keys.key_id is not None:
+                key = keys.verification_keys.get(jwt.get_unverified_header(token).get("kid"))
+                if key is None:
+                    return None
+
+            return jwt.decode(jwt=token, key=key, algorithms=[keys.algorithm], options=options)
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
@@ -72,7 +249,7 @@ class TokenService:
                                      iat=datetime.now(tz=None).timestamp(), payload=kwargs)
         payload = jsonable_encoder(payload)
 
-        return jwt.encode(payload=payload, key=os.getenv("JWT_SECRET"), algorithm=os.getenv("JWT_ALGORITHM"))
+        return TokenService._encode(payload)
 
     @staticmethod
     def get_token_expiration(token: str) -> Optional[datetime]:
@@ -0,0 +1,269 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+from app.common.constants import UPLOADS_COLLECTION, PUBLIC_FOLDER, MAX_UPLOAD_SIZE, UPLOAD_MAX_CHUNK_SIZE, \
+    UPLOAD_EXPIRATION, FILE_CHUNK_SIZE
+from app.models.common.object_id import PyObjectId
+from app.models.upload.upload import UploadModel
+from app.services.image.files import FileIOService, FileTooLargeError
+
+# Time (in seconds) after which the lock of an interrupted chunk write expires.
+UPLOAD_LOCK_TIMEOUT = 30
+
+
+class UploadOffsetError(Exception):
+    """ Raised when a chunk doesn't start at the current offset of the upload. """
+
+    def __init__(self, offset: int):
+        """
+        :param offset: Current offset of the upload.
+        """
+
+        super().__init__(f"Chunk must start at offset {offset}.")
+        self.offset = offset
+
+
+class UploadChecksumError(Exception):
+    """ Raised when the uploaded file doesn't match its declared checksum. """
+
+
+class UploadIncompleteError(Exception):
+    """ Raised when an upload is finalized before all its bytes are received. """
+
+
+class UploadService:
+    """
+    Service for resumable uploads.
+
+    An upload is created with the file size (and optionally its SHA-256), then chunks are appended at the offset that
+    is tracked by the server, so an interrupted upload is resumed from the last stored byte (also after a reconnect or
+    by another worker). Chunks are written straight to a temporary file, so only one chunk is kept in memory. The
+    finalized file is handed to the image storage.
+    """
+
+    @staticmethod
+    def get_path(upload: UploadModel) -> str:
+        """
+        Get path of the temporary file of the upload (hidden files aren't served).
+
+        :param upload: Upload object.
+
+        :return: File path.
+        """
+
+        return os.path.join(PUBLIC_FOLDER, upload.folder, f".{upload.id}.part")
+
+    @staticmethod
+    async def create(
+            user_id: PyObjectId,
+            size: int,
+            db: AsyncIOMotorClient,
+            checksum: Optional[str] = None,
+            folder: str = "uploads",
+            max_size: int = MAX_UPLOAD_SIZE
+    ) -> UploadModel:
+        """
+        Create a new upload.
+
+        :param user_id: User ID.
+        :param size: File size in bytes.
+        :param db: Database connection object.
+        :param checksum: SHA-256 of the file (hex).
+        :param folder: Folder name.
+        :param max_size: Max file size in bytes.
+
+        :raise FileTooLargeError: If the file exceeds the size limit.
+
+        :return: New upload object.
+        """
+
+        if size > max_size:
+            raise FileTooLargeError(f"File is larger than {max_size} bytes.")
+
+        upload = UploadModel(
+            user_id=user_id,
+            folder=folder,
+            size=size,
+            checksum=checksum.lower() if checksum else None,
+            expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_EXPIRATION)
+        )
+
+        def create_file() -> None:
+            path = UploadService.get_path(upload)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "wb").close()
+
+        await FileIOService.run(create_file)
+        await db[UPLOADS_COLLECTION].insert_one(upload.mongo())
+
+        return upload
+
+    @staticmethod
+    async def get(upload_id: PyObjectId, user_id: PyObjectId, db: AsyncIOMotorClient) -> Optional[UploadModel]:
+        """
+        Get upload of the user.
+
+        :param upload_id: Upload ID.
+        :param user_id: User ID.
+        :param db: Database connection object.
+
+        :return: Upload object (None if the upload doesn't exist or has expired).
+        """
+
+        upload = await db[UPLOADS_COLLECTION].find_one({"_id": upload_id, "userId": user_id})
+        if not upload:
+            return None
+
+        return UploadModel.from_mongo(upload)
+
+    @staticmethod
+    async def append(upload: UploadModel, offset: int, chunk: bytes, db: AsyncIOMotorClient) -> UploadModel:
+        """
+        Append chunk to the upload.
+
+        :param upload: Upload object.
+        :param offset: Offset of the chunk.
+        :param chunk: Chunk bytes.
+        :param db: Database connection object.
+
+        :raise UploadOffsetError: If the chunk doesn't start at the current offset (e.g. it was already received).
+        :raise FileTooLargeError: If the chunk is too large or exceeds the declared size.
+
+        :return: Updated upload object.
+        """
+
+        if offset != upload.offset:
+            raise UploadOffsetError(upload.offset)
+
+        if len(chunk) > UPLOAD_MAX_CHUNK_SIZE or offset + len(chunk) > upload.size:
+            raise FileTooLargeError(f"Chunk exceeds the upload size ({upload.size} bytes).")
+
+        # The offset is claimed before the chunk is written, so only one request writes at it.
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=UPLOAD_LOCK_TIMEOUT)
+
+        claimed = await db[UPLOADS_COLLECTION].find_one_and_update(
+            {
+                "_id": upload.id,
+                "offset": offset,
+                "$or": [{"lockedUntil": None}, {"lockedUntil": {"$lte": now}}],
+            },
+            {"$set": {"lockedUntil": locked_until}}
+        )
+        if not claimed:
+            # The chunk was already received, or it is being written by another request (e.g. a retried one).
+            current = await db[UPLOADS_COLLECTION].find_one({"_id": upload.id}, {"offset": 1})
+            raise UploadOffsetError(current["offset"] if current else upload.offset)
+
+        def write() -> None:
+            with open(UploadService.get_path(upload), "ab") as file:
+                # Bytes after the stored offset are left by an interrupted write.
+                file.truncate(offset)
+                file.write(chunk)
+
+        try:
+            await FileIOService.run(write)
+        except BaseException:
+            await db[UPLOADS_COLLECTION].update_one(
+                {"_id": upload.id, "lockedUntil": locked_until},
+                {"$set": {"lockedUntil": None}}
+            )
+            raise
+
+        updated = await db[UPLOADS_COLLECTION].find_one_and_update(
+            {"_id": upload.id, "lockedUntil": locked_until},
+            {"$set": {"offset": offset + len(chunk), "lockedUntil": None}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not updated:
+            # The lock expired while the chunk was written (or the upload was cancelled).
+            current = await db[UPLOADS_COLLECTION].find_one({"_id": upload.id}, {"offset": 1})
+            raise UploadOffsetError(current["offset"] if current else upload.offset)
+
+        return UploadModel.from_mongo(updated)
+
+    @staticmethod
+    async def complete(upload: UploadModel, db: AsyncIOMotorClient) -> tuple[str, str]:
+        """
+        Finalize the upload.
+
+        The upload is locked while its checksum is verified. If the file matches, the upload is removed and its
+        temporary file is handed to the caller (it must be stored or removed). Otherwise, the upload is reset to
+        offset 0, so the client can send the file again without creating a new upload.
+
+        :param upload: Upload object.
+        :param db: Database connection object.
+
+        :raise UploadIncompleteError: If not all bytes are received (or the upload is being finalized).
+        :raise UploadChecksumError: If the file doesn't match the declared checksum.
+
+        :return: Path of the file and its SHA-256 (hex).
+        """
+
+        if upload.offset != upload.size:
+            raise UploadIncompleteError(f"Only {upload.offset} of {upload.size} bytes are received.")
+
+        path = UploadService.get_path(upload)
+
+        def get_digest() -> str:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                while chunk := file.read(FILE_CHUNK_SIZE):
+                    digest.update(chunk)
+
+            return digest.hexdigest()
+
+        # Only one request can finalize the upload (and no chunk can be written meanwhile).
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=UPLOAD_LOCK_TIMEOUT)
+
+        claimed = await db[UPLOADS_COLLECTION].find_one_and_update(
+            {
+                "_id": upload.id,
+                "offset": upload.size,
+                "$or": [{"lockedUntil": None}, {"lockedUntil": {"$lte": now}}],
+            },
+            {"$set": {"lockedUntil": locked_until}}
+        )
+        if not claimed:
+            raise UploadIncompleteError("Upload is already being finalized.")
+
+        try:
+            digest = await FileIOService.run(get_digest)
+        except BaseException:
+            await db[UPLOADS_COLLECTION].update_one(
+                {"_id": upload.id, "lockedUntil": locked_until},
+                {"$set": {"lockedUntil": None}}
+            )
+            raise
+
+        if upload.checksum and digest != upload.checksum:
+            await db[UPLOADS_COLLECTION].update_one(
+                {"_id": upload.id, "lockedUntil": locked_until},
+                {"$set": {"offset": 0, "lockedUntil": None}}
+            )
+            raise UploadChecksumError("File doesn't match its checksum.")
+
+        deleted = await db[UPLOADS_COLLECTION].find_one_and_delete({"_id": upload.id, "lockedUntil": locked_until})
+        if not deleted:
+            # The lock expired while the file was verified (or the upload was cancelled).
+            raise UploadIncompleteError("Upload is already being finalized.")
+
+        return path, digest
+
+    @staticmethod
+    async def delete(upload: UploadModel, db: AsyncIOMotorClient) -> None:
+        """
+        Cancel the upload.
+
+        :param upload: Upload object.
+        :param db: Database connection object.
+        """
+
+        await db[UPLOADS_COLLECTION].delete_one({"_id": upload.id})
+        await FileIOService.remove(UploadService.get_path(upload))
@@ -6,7 +6,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 from app.common.constants import USERS_COLLECTION
 from app.models.common.object_id import PyObjectId
-from app.models.user.sessions import UserSessionModel, UserSessionTypesEnum, UserSessionInResponseModel
+from app.models.user.sessions import UserSessionModel, UserSessionTypesEnum, UserSessionInResponseModel, \
+    UserSessionRequestContextModel
 from app.models.user.user import UserModel
 from app.services.location.location import LocationService
 from app.services.token.token import TokenService
@@ -38,18 +39,17 @@ class UserSessionService:
         :return: User session object.
         """
 
-        ip_address = await LocationService.get_ip_address(request)
-        user_location = await LocationService.get_location(ip_address)
+        context = await UserSessionService.get_request_context(request)
 
-        client_type = request.headers.get("X-Client-Type") or "unknown"
+        client_type = context.client_type or "unknown"
         session_type = UserSessionTypesEnum(client_type.lower())
 
         user_session = UserSessionModel(
             token=token,
-            ip_address=ip_address,
+            ip_address=context.ip_address,
             type=session_type,
-            label=f'Fly Messenger {request.headers.get("X-Client-Type") or "unknown"} {request.headers.get("X-Client-Version") or "unknown"}',
-            location=f"{user_location.get('city')}, {user_location.get('region')}, {user_location.get('country')}",
+            label=f'Fly Messenger {client_type} {request.headers.get("X-Client-Version") or "unknown"}',
+            location=context.location,
             created_at=datetime.now(tz=None)
         )
 
@@ -59,9 +59,46 @@ class UserSessionService:
         return user_session
 
     @staticmethod
-    async def validate_session(
+    async def get_request_context(request: Request) -> UserSessionRequestContextModel:
+        """
+        Get session attributes of the request (IP-address, location and client type).
+
+        It must be called once per request, then the context is compared with every session.
+
+        :param request: Request object.
+
+        :return: Request context object.
+        """
+
+        ip_address = LocationService.get_ip_address(request)
+        user_location = await LocationService.get_location(ip_address)
+
+        return UserSessionRequestContextModel(
+            ip_address=ip_address,
+            location=f"{user_location.get('city')}, {user_location.get('region')}, {user_location.get('country')}",
+            client_type=request.headers.get("X-Client-Type")
+        )
+
+    @staticmethod
+    def is_session_expired(session: UserSessionModel) -> bool:
+        """
+        Check if session token is expired (or invalid).
+
+        :param session: User session object.
+
+        :return: True if session is expired, False otherwise.
+        """
+
+        token = TokenService.decode(session.token)
+        if not token:
+            return True
+
+        return datetime.fromtimestamp(token.get("exp")) < datetime.now()
+
+    @staticmethod
+    def validate_session(
             session: UserSessionModel,
-            request: Request
+            context: UserSessionRequestContextModel
     ) -> bool:
         """
         Validate session.
@@ -72,32 +109,19 @@ class UserSessionService:
         - Session is from the same location.
 
         :param session: User session object.
-        :param request: Request object.
+        :param context: Request context object.
 
         :return: True if session is valid, False if session is invalid.
         """
 
-        token = TokenService.decode(session.token)
-        if not token:
-            return False
-
-        expires_at = datetime.fromtimestamp(token.get("exp"))
-        if expires_at < datetime.now():
-            return False
-
-        if session.type != request.headers.get("X-Client-Type"):
-            return False
-
-        ip_address = await LocationService.get_ip_address(request)
-        user_location = await LocationService.get_location(ip_address)
-        if session.ip_address != ip_address:
+        if UserSessionService.is_session_expired(session):
             return False
 
-        location = f"{user_location.get('city')}, {user_location.get('region')}, {user_location.get('country')}"
-        if session.location != location:
-            return False
-
-        return True
+        return (
+            session.type == context.client_type
+            and session.ip_address == context.ip_address
+            and session.location == context.location
+        )
 
     @staticmethod
     async def get_current_by_user(
@@ -108,6 +132,8 @@ class UserSessionService:
         """
         Get current session by user.
 
+        Expired sessions found during the walk are removed with one update.
+
         :param user: User object.
         :param request: Request object.
         :param db: Database connection object.
@@ -115,17 +141,24 @@ class UserSessionService:
         :return: User session object.
         """
 
+        context = await UserSessionService.get_request_context(request)
+
+        current_session = None
+        expired_tokens = []
+
         for session in user.sessions:
             if session.type == UserSessionTypesEnum.TEST:
                 continue
 
-            is_valid_session = await UserSessionService.validate_session(session, request)
-            if is_valid_session:
-                return session
-            else:
-                await UserSessionService.delete(user, session.token, db)
+            if UserSessionService.is_session_expired(session):
+                expired_tokens.append(session.token)
+            elif current_session is None and UserSessionService.validate_session(session, context):
+                current_session = session
 
-        return None
+        if expired_tokens:
+            await UserSessionService.delete_many(user, expired_tokens, db)
+
+        return current_session
 
     @staticmethod
     async def delete(
@@ -145,6 +178,27 @@ class UserSessionService:
 
         await UserService.update(user, db)
 
+    @staticmethod
+    async def delete_many(
+            user: UserModel,
+            tokens: List[str],
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Delete several sessions by tokens (in one update).
+
+        :param user: User object.
+        :param tokens: Tokens of the sessions.
+        :param db: Database connection object.
+        """
+
+        user.sessions = [session for session in user.sessions if session.token not in tokens]
+
+        await db[USERS_COLLECTION].update_one(
+            {"_id": user.id},
+            {"$pull": {"sessions": {"token": {"$in": tokens}}}}
+        )
+
     @staticmethod
     async def get_by_id(
             session_id: PyObjectId,
@@ -207,7 +261,7 @@ class UserSessionService:
         :return: True if user is foreign, False if user is not foreign.
         """
 
-        ip_address = await LocationService.get_ip_address(request)
+        ip_address = LocationService.get_ip_address(request)
         for session in user.sessions:
             if session.ip_address == ip_address:
                 return False
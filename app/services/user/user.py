@@ -1,4 +1,3 @@
-import re
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -6,13 +5,18 @@ from fastapi import UploadFile
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import DuplicateKeyError
 
-from app.common.constants import USERS_COLLECTION
+from app.common.constants import USERS_COLLECTION, MAX_AVATAR_SIZE
+from app.common.utils.search.main import split_search_tokens, build_search_prefixes, get_ranked_search_keys, \
+    SEARCH_RANKS
 from app.common.frontend.pages import ACTIVATION_PAGE
 from app.exception.api import APIException
 from app.models.common.object_id import PyObjectId
+from app.models.image.image import ImageInStorageModel
+from app.models.search.search import UsersCursor
 from app.models.user.user import UserModel, UserInSignUpModel, UserInResponseModel, UserInSearchModel
 from app.services.hash.hash import HashService
 from app.services.image.image import ImageService
+from app.services.image.storage import ImageStorageService
 from app.services.mail.mail import EmailService
 from app.services.token.token import TokenService
 
@@ -44,6 +48,27 @@ class UserService:
 
         return UserModel.from_mongo(user) if user else None
 
+    @staticmethod
+    async def get_by_ids(
+            user_ids: list[PyObjectId],
+            db: AsyncIOMotorClient
+    ) -> list[UserModel]:
+        """
+        Get users by ids (in one query).
+
+        :param user_ids: List of user IDs.
+        :param db: Database connection object.
+
+        :return: List of found users.
+        """
+
+        if not user_ids:
+            return []
+
+        users = db[USERS_COLLECTION].find({"_id": {"$in": list(set(user_ids))}})
+
+        return [UserModel.from_mongo(user) async for user in users]
+
     @staticmethod
     async def authenticate(username: str, password: str, db: AsyncIOMotorClient) -> UserModel:
         """
@@ -63,12 +88,17 @@ class UserService:
                 translation_key="userNotFound"
             )
 
-        if not HashService.verify_password(password, user.password):
+        if not await HashService.verify_password(password, user.password):
             raise APIException.unauthorized(
                 "Wrong password. Check your credentials and try again.",
                 translation_key="incorrectPassword"
             )
 
+        # Upgrade the hash transparently if the bcrypt cost setting was changed.
+        if HashService.needs_rehash(user.password):
+            user.password = await HashService.get_hash(password)
+            await UserService.update(user, db)
+
         if not user.is_active:
             token_expiration = TokenService.get_token_expiration(user.activation_token) or None
             if token_expiration is None or token_expiration.timestamp() < datetime.now(tz=None).timestamp():
@@ -79,6 +109,8 @@ class UserService:
                     user.email,
                     "Activate your account",
                     "activation",
+                    db,
+                    language=user.settings.language,
                     username=user.username,
                     url=f"{ACTIVATION_PAGE}/{user.activation_token}"
                 )
@@ -102,10 +134,13 @@ class UserService:
         """
 
         try:
-            image = await ImageService.generate_mock_image(body.username)
-            user = UserModel(first_name=body.username, photo_url=image, **body.dict())
+            image = await ImageService.generate_mock_image(body.username, db)
+            password = await HashService.get_hash(body.password)
+            user = UserModel(first_name=body.username, photo_url=image.url, photo_variants=image.variants,
+                             **body.dict(exclude={"password"}), password=password)
 
             new_user = await db[USERS_COLLECTION].insert_one(user.mongo())
+            await ImageStorageService.add_references([image.url], db)
 
             return await UserService.get_by_id(new_user.inserted_id, db)
         except DuplicateKeyError:
@@ -146,11 +181,31 @@ class UserService:
         :return: Updated user object.
         """
 
-        filename = await ImageService.upload_image(file, "avatars")
+        image = await ImageService.upload_image(file, db, "avatars", MAX_AVATAR_SIZE)
+
+        return await UserService.set_avatar(image, user, db)
 
-        user.photo_url = filename
+    @staticmethod
+    async def set_avatar(image: ImageInStorageModel, user: UserModel, db: AsyncIOMotorClient) -> UserModel:
+        """
+        Set stored image as user avatar (the previous avatar is released after the new one is saved).
+
+        :param image: Stored image.
+        :param user: User object.
+        :param db: Database connection object.
+
+        :return: Updated user object.
+        """
+
+        previous_photo_url, previous_photo_variants = user.photo_url, user.photo_variants
+
+        user.photo_url = image.url
+        user.photo_variants = image.variants
         await UserService.update(user, db)
 
+        await ImageStorageService.add_references([image.url], db)
+        await ImageService.delete_image(previous_photo_url, db, "avatars", previous_photo_variants)
+
         return user
 
     @staticmethod
@@ -181,43 +236,177 @@ class UserService:
     async def search(
             query: str,
             current_user: UserModel,
-            db: AsyncIOMotorClient
-    ) -> list[UserInSearchModel]:
+            db: AsyncIOMotorClient,
+            cursor: Optional[UsersCursor] = None,
+            limit: int = 100
+    ) -> tuple[list[UserInSearchModel], Optional[UsersCursor]]:
         """
-        Search for users.
+        Search for users (by prefixes of names, username and email).
+
+        Every query token must be a prefix of some user token. Users are ordered by relevance: the rank of the first
+        query token among their ranked `searchKeys` (username matches first, then names and emails, full tokens before
+        prefixes), then by ID. Every rank is read in this order from the `searchKeys` index, so pages are stable. The
+        exact username/email match is the first result of the first page (and it is excluded from the next pages).
 
         :param query: Search query.
         :param current_user: User object.
         :param db: Database connection object.
+        :param cursor: Cursor of the page (from the previous search result).
+        :param limit: Count of users per page.
 
-        :return: List of users.
+        :return: List of users and the cursor of the next page (or None if there are no more users).
         """
 
-        query = re.sub(r"[^\w\s.]", "", query)
+        tokens = split_search_tokens(query)
+        if not tokens:
+            return [], None
+
+        base_filter = {
+            "isTest": False,
+            "isActive": True,
+        }
+        excluded_ids = [current_user.id]
 
-        users = await db[USERS_COLLECTION].find(
+        # The exact match is looked up on every page, so it isn't repeated by the next pages.
+        normalized_query = query.strip().lower()
+        exact_match = await db[USERS_COLLECTION].find_one(
             {
-                "$and": [
-                    {
-                        "$or": [
-                            {"firstName": {"$regex": query, "$options": "i"}},
-                            {"lastName": {"$regex": query, "$options": "i"}},
-                            {"username": {"$regex": query, "$options": "i"}},
-                            {"email": {"$regex": query, "$options": "i"}}
-                        ]
-                    },
-                    {
-                        "isTest": False,
-                        "_id": {"$ne": current_user.id},
-                        "isActive": True,
-                    }
-                ]
-            }
-        ).to_list(length=100)
-        if not users:
-            return []
+                "$or": [{"username": normalized_query}, {"email": normalized_query}],
+                **base_filter,
+                "_id": {"$ne": current_user.id},
+            },
+            {"searchKeys": 0, "password": 0, "sessions": 0}
+        )
+
+        users = []
+        if exact_match:
+            excluded_ids.append(exact_match["_id"])
+
+            if cursor is None:
+                users.append(UserInSearchModel.from_mongo(exact_match))
+
+        # The other tokens can match with any rank.
+        tokens_filter = {}
+        if len(tokens) > 1:
+            tokens_filter["$and"] = [{"searchKeys": {"$in": get_ranked_search_keys(token)}} for token in tokens[1:]]
+
+        start_rank = cursor.rank if cursor is not None else 0
+        start_id = cursor.last_id if cursor is not None else None
+
+        # One more user is read to know if there is the next page.
+        ranked_users = []
+        for rank in range(start_rank, SEARCH_RANKS):
+            count = limit - len(users) + 1 - len(ranked_users)
+            if count <= 0:
+                break
+
+            id_filter = {"$nin": excluded_ids}
+            if rank == start_rank and start_id is not None:
+                id_filter["$gt"] = start_id
+
+            found = await db[USERS_COLLECTION].find(
+                {
+                    "searchKeys": f"{rank}:{tokens[0]}",
+                    **tokens_filter,
+                    **base_filter,
+                    "_id": id_filter,
+                },
+                {"searchKeys": 0, "password": 0, "sessions": 0}
+            ).sort("_id", 1).limit(count).to_list(length=count)
+
+            ranked_users.extend((rank, user) for user in found)
+
+        count = limit - len(users)
+
+        next_cursor = None
+        if len(ranked_users) > count:
+            ranked_users = ranked_users[:count]
+
+            if ranked_users:
+                rank, user = ranked_users[-1]
+                next_cursor = UsersCursor.build(rank, user["_id"])
+            else:
+                # The page is filled by the exact match only, so the next page starts where this one started.
+                next_cursor = UsersCursor.build(start_rank, start_id)
+
+        users.extend(UserInSearchModel.from_mongo(user) for _, user in ranked_users)
+
+        return users, next_cursor
 
-        return [UserInSearchModel.from_mongo(user) for user in users]
+    @staticmethod
+    def matches_search(user: UserInSearchModel, query: str) -> bool:
+        """
+        Check if user matches the search query (with the same rules as `search`).
+
+        :param user: User object.
+        :param query: Search query.
+
+        :return: True if user matches the query, False otherwise.
+        """
+
+        tokens = split_search_tokens(query)
+        search_keys = set(build_search_prefixes(user.first_name, user.last_name, user.username,
+                                                user.email.split("@")[0]))
+
+        return bool(tokens) and all(token in search_keys for token in tokens)
+
+    @staticmethod
+    def matches_name_search(
+            first_name: str,
+            last_name: Optional[str],
+            query: str,
+            photo_url: Optional[str] = None
+    ) -> bool:
+        """
+        Check if name matches the search query (every query token must be a prefix of a name token).
+
+        As in the original dialogs search, the first name is matched only for users with a photo.
+
+        :param first_name: First name.
+        :param last_name: Last name.
+        :param query: Search query.
+        :param photo_url: User photo URL.
+
+        :return: True if name matches the query, False otherwise.
+        """
+
+        tokens = split_search_tokens(query)
+        search_keys = set(build_search_prefixes(first_name if photo_url is not None else None, last_name))
+
+        return bool(tokens) and all(token in search_keys for token in tokens)
+
+    @staticmethod
+    async def get_ids_by_name(query: str, user_ids: list[PyObjectId], db: AsyncIOMotorClient) -> set[PyObjectId]:
+        """
+        Get IDs of the users (among the given ones) whose name matches the search query (in one query).
+
+        The query is served by the `searchKeys` index, then username/email matches are filtered out, because
+        `searchKeys` contains their prefixes as well.
+
+        :param query: Search query.
+        :param user_ids: IDs of the users to search among.
+        :param db: Database connection object.
+
+        :return: Set of matching user IDs.
+        """
+
+        tokens = split_search_tokens(query)
+        if not tokens or not user_ids:
+            return set()
+
+        users = db[USERS_COLLECTION].find(
+            {
+                "$and": [{"searchKeys": {"$in": get_ranked_search_keys(token)}} for token in tokens],
+                "_id": {"$in": list(set(user_ids))},
+            },
+            {"firstName": 1, "lastName": 1, "photoURL": 1}
+        )
+
+        return {
+            user["_id"] async for user in users
+            if UserService.matches_name_search(user.get("firstName", ""), user.get("lastName"), query,
+                                               user.get("photoURL"))
+        }
 
     @staticmethod
     async def get_by_username(username: str, db: AsyncIOMotorClient) -> Optional[UserModel]:
@@ -297,3 +486,4 @@ class UserService:
         """
 
         await db[USERS_COLLECTION].delete_one({"_id": current_user.id})
+        await ImageService.delete_image(current_user.photo_url, db, "avatars", current_user.photo_variants)
@@ -1,3 +1,4 @@
+import asyncio
 from enum import Enum
 from typing import Union, Optional
 
@@ -9,6 +10,7 @@ from starlette.websockets import WebSocket
 from app.database.main import get_database
 from app.models.common.exceptions.body import InvalidObjectId
 from app.models.common.object_id import PyObjectId
+from app.models.search.search import SearchCacheModel
 from app.services.token.token import TokenService
 from app.services.user.blacklist import BlacklistService
 from app.services.user.online_status import UserOnlineStatusService
@@ -24,6 +26,9 @@ class SocketReceiveTypesEnum(str, Enum):
     TYPING = "TYPING"
     UNTYPING = "UNTYPING",
     DESTROY_SESSION = "DESTROY_SESSION"
+    SEARCH = "SEARCH"
+    UPLOAD_BEGIN = "UPLOAD_BEGIN"
+    UPLOAD_COMMIT = "UPLOAD_COMMIT"
 
 
 class SocketSendTypesEnum(str, Enum):
@@ -38,6 +43,11 @@ class SocketSendTypesEnum(str, Enum):
     USER_LOGOUT = "USER_LOGOUT"
     DELETE_DIALOG = "DELETE_DIALOG"
     DELETE_USER = "DELETE_USER"
+    SEARCH_RESULT = "SEARCH_RESULT"
+    SEARCH_DONE = "SEARCH_DONE"
+    UPLOAD_READY = "UPLOAD_READY"
+    UPLOAD_ACK = "UPLOAD_ACK"
+    UPLOAD_ERROR = "UPLOAD_ERROR"
 
 
 class ConnectionModel(BaseModel):
@@ -47,6 +57,10 @@ class ConnectionModel(BaseModel):
     user_id: PyObjectId
     websocket: WebSocket
 
+    # In-flight search of the connection and the result of the previous search.
+    search_task: Optional[asyncio.Task] = None
+    search_cache: Optional[SearchCacheModel] = None
+
     class Config:
         arbitrary_types_allowed = True
 
@@ -96,6 +110,10 @@ class SocketBase:
         for connection in self.connections:
             if connection.websocket == websocket:
                 self.connections.remove(connection)
+
+                if connection.search_task is not None:
+                    connection.search_task.cancel()
+
                 try:
                     await UserOnlineStatusService.toggle_online_status(connection.user_id, False, db)
                     await websocket.close()
@@ -117,6 +135,20 @@ class SocketBase:
 
         return None
 
+    def find_connection_by_websocket(self, websocket: WebSocket) -> Optional[ConnectionModel]:
+        """
+        Find connection by websocket.
+
+        :param websocket: Websocket.
+        :return: ConnectionModel or None (if connection not found).
+        """
+
+        for connection in self.connections:
+            if connection.websocket == websocket:
+                return connection
+
+        return None
+
     def find_connections_by_user_id(self, user_id: PyObjectId) -> list[ConnectionModel]:
         """
         Find connection by user ID.
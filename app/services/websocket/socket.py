@@ -1,20 +1,43 @@
+import asyncio
 import json
+import logging
+import re
+import struct
 from typing import Optional
 
 from fastapi.encoders import jsonable_encoder
 from motor.motor_asyncio import AsyncIOMotorClient
+from pydantic import ValidationError
 from starlette.websockets import WebSocket
 
+from app.common.constants import UPLOAD_MAX_CHUNK_SIZE
+from app.models.common.exceptions.body import InvalidObjectId
 from app.models.common.object_id import PyObjectId
+from app.models.common.search.skip_and_limit import SkipAndLimitModel
 from app.models.dialog.messages import DialogMessageInCreateModel
+from app.models.image.image import ImageInStorageModel
+from app.models.search.search import SearchCacheModel, SearchSectionsEnum
+from app.models.user.user import UserModel
 from app.services.dialog.dialog import DialogService
 from app.services.dialog.message import DialogMessageService
+from app.services.image.files import FileTooLargeError
 from app.services.image.image import ImageService
+from app.services.image.variants import InvalidImageError
+from app.services.search.cache import SearchCacheService
+from app.services.search.search import SearchService
 from app.services.token.token import TokenService
+from app.services.upload.upload import UploadService, UploadOffsetError, UploadChecksumError, UploadIncompleteError
 from app.services.user.online_status import UserOnlineStatusService
 from app.services.user.sessions import UserSessionService
 from app.services.user.user import UserService
-from app.services.websocket.base import SocketBase, SocketReceiveTypesEnum, SocketSendTypesEnum
+from app.services.websocket.base import SocketBase, SocketReceiveTypesEnum, SocketSendTypesEnum, ConnectionModel
+
+logger = logging.getLogger(__name__)
+
+# Header of a binary upload frame: upload ID (12 bytes) and offset of the chunk (8 bytes, big-endian).
+UPLOAD_FRAME_HEADER = struct.Struct(">12sQ")
+
+CHECKSUM_PATTERN = re.compile(r"^[0-9a-fA-F]{64}$")
 
 
 class SocketService(SocketBase):
@@ -117,6 +140,75 @@ class SocketService(SocketBase):
                 "sessions": sessions
             }, user_id)
 
+        elif user_type == SocketReceiveTypesEnum.UPLOAD_BEGIN:
+            await self._handle_upload_begin(websocket, user_id, json_data.get("uploadId"), json_data.get("size"),
+                                            json_data.get("checksum"), db)
+
+        elif user_type == SocketReceiveTypesEnum.UPLOAD_COMMIT:
+            await self._handle_upload_commit(websocket, user_id, dialog_id, json_data.get("uploadId"),
+                                             json_data.get("text"), db)
+
+        elif user_type == SocketReceiveTypesEnum.SEARCH:
+            try:
+                pagination = SkipAndLimitModel(skip=json_data.get("skip", 0), limit=json_data.get("limit", 100))
+            except ValidationError:
+                return
+
+            await self._handle_search(websocket, user_id, json_data.get("query"), json_data.get("requestId"),
+                                      pagination, db)
+
+    async def handle_binary(
+            self,
+            websocket: WebSocket,
+            data: bytes,
+            token: str,
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Handle binary frame (a chunk of an upload).
+
+        Frames are handled one by one and every chunk is written to disk before the next frame is received, so only
+        one chunk per connection is kept in memory.
+
+        :param websocket: Websocket connection.
+        :param data: Frame from client (header and chunk).
+        :param token: Token from client.
+        :param db: Database connection.
+        """
+
+        if not token:
+            await websocket.close()
+            return
+
+        user_id = PyObjectId(TokenService.decode(token).get("payload").get("id"))
+
+        if len(data) <= UPLOAD_FRAME_HEADER.size:
+            await self._send_upload_error(websocket, None, "uploadFrameIsNotCorrect")
+            return
+
+        upload_id, offset = UPLOAD_FRAME_HEADER.unpack_from(data)
+        upload_id = PyObjectId(upload_id)
+
+        upload = await UploadService.get(upload_id, user_id, db)
+        if not upload:
+            await self._send_upload_error(websocket, upload_id, "uploadNotFound")
+            return
+
+        try:
+            upload = await UploadService.append(upload, offset, memoryview(data)[UPLOAD_FRAME_HEADER.size:], db)
+        except UploadOffsetError as e:
+            await self._send_upload_error(websocket, upload_id, "uploadOffsetIsNotCorrect", e.offset)
+            return
+        except FileTooLargeError:
+            await self._send_upload_error(websocket, upload_id, "fileTooLarge", upload.offset)
+            return
+
+        await self._send_message({
+            "type": SocketSendTypesEnum.UPLOAD_ACK,
+            "uploadId": str(upload.id),
+            "offset": upload.offset,
+        }, websocket=websocket)
+
     async def _get_recipient_id(
             self,
             user_id: PyObjectId,
@@ -164,20 +256,49 @@ class SocketService(SocketBase):
         if not is_user_can_send_message:
             return
 
-        filename = None
+        image = None
         if file:
-            filename = await ImageService.upload_base64_image(file, "uploads")
+            try:
+                image = await ImageService.upload_base64_image(file, db, "uploads")
+            except (FileTooLargeError, InvalidImageError):
+                return
+
+        await self.create_message(user_id, recipient_id, dialog_id, text, image, db)
+
+    async def create_message(
+            self,
+            user_id: PyObjectId,
+            recipient_id: PyObjectId,
+            dialog_id: PyObjectId,
+            text: Optional[str],
+            image: Optional[ImageInStorageModel],
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Create message and send it to the sender and the recipient.
+
+        :param user_id: User id.
+        :param recipient_id: Recipient id.
+        :param dialog_id: Dialog id.
+        :param text: Message text.
+        :param image: Stored image of the message.
+        :param db: Database connection.
+        """
+
+        current_user = await UserService.get_by_id(user_id, db)
 
         new_message_payload = DialogMessageInCreateModel(
             sender_id=user_id,
             dialog_id=dialog_id,
             text=text,
-            file=filename,
+            file=image.url if image else None,
+            file_variants=image.variants if image else {},
+            language=current_user.settings.language,
         )
 
         new_message = await DialogMessageService.create(new_message_payload, db)
+        SearchCacheService.invalidate_users([user_id, recipient_id])
 
-        current_user = await UserService.get_by_id(user_id, db)
         recipient = await UserService.get_by_id(recipient_id, db)
 
         dialog = await DialogService.get_by_id(dialog_id, db)
@@ -214,6 +335,141 @@ class SocketService(SocketBase):
             "userId": str(user_id),
         }, recipient_id)
 
+    async def _handle_upload_begin(
+            self,
+            websocket: WebSocket,
+            user_id: PyObjectId,
+            upload_id: Optional[str],
+            size: Optional[int],
+            checksum: Optional[str],
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Handle upload begin event.
+
+        A new upload is created, or an existing upload is resumed (e.g. after a reconnect) if its ID is passed. The
+        client sends chunks from the returned offset.
+
+        :param websocket: Websocket connection.
+        :param user_id: User id.
+        :param upload_id: ID of the resumed upload.
+        :param size: File size in bytes.
+        :param checksum: SHA-256 of the file (hex).
+        :param db: Database connection.
+        """
+
+        if upload_id:
+            try:
+                upload_id = PyObjectId.validate(upload_id)
+            except InvalidObjectId:
+                await self._send_upload_error(websocket, None, "uploadNotFound")
+                return
+
+            upload = await UploadService.get(upload_id, user_id, db)
+            if not upload:
+                await self._send_upload_error(websocket, upload_id, "uploadNotFound")
+                return
+        else:
+            if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+                await self._send_upload_error(websocket, None, "fileSizeIsNotCorrect")
+                return
+
+            if checksum is not None and (not isinstance(checksum, str) or not CHECKSUM_PATTERN.match(checksum)):
+                await self._send_upload_error(websocket, None, "checksumIsNotCorrect")
+                return
+
+            try:
+                upload = await UploadService.create(user_id, size, db, checksum)
+            except FileTooLargeError:
+                await self._send_upload_error(websocket, None, "fileTooLarge")
+                return
+
+        await self._send_message({
+            "type": SocketSendTypesEnum.UPLOAD_READY,
+            "uploadId": str(upload.id),
+            "size": upload.size,
+            "offset": upload.offset,
+            "chunkSize": UPLOAD_MAX_CHUNK_SIZE,
+        }, websocket=websocket)
+
+    async def _handle_upload_commit(
+            self,
+            websocket: WebSocket,
+            user_id: PyObjectId,
+            dialog_id: PyObjectId,
+            upload_id: Optional[str],
+            text: Optional[str],
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Handle upload commit event (the uploaded image is stored and the message is created).
+
+        :param websocket: Websocket connection.
+        :param user_id: User id.
+        :param dialog_id: Dialog id.
+        :param upload_id: Upload ID.
+        :param text: Message text.
+        :param db: Database connection.
+        """
+
+        try:
+            upload_id = PyObjectId.validate(upload_id)
+        except InvalidObjectId:
+            await self._send_upload_error(websocket, None, "uploadNotFound")
+            return
+
+        recipient_id = await self._get_recipient_id(user_id, dialog_id, db)
+
+        is_user_can_send_message = await self.check_if_user_can_send_message(user_id, recipient_id, db)
+        if not is_user_can_send_message:
+            return
+
+        upload = await UploadService.get(upload_id, user_id, db)
+        if not upload:
+            await self._send_upload_error(websocket, upload_id, "uploadNotFound")
+            return
+
+        try:
+            path, digest = await UploadService.complete(upload, db)
+        except UploadIncompleteError:
+            await self._send_upload_error(websocket, upload_id, "uploadIsNotComplete", upload.offset)
+            return
+        except UploadChecksumError:
+            # The upload is reset, so the file is sent again from the start.
+            await self._send_upload_error(websocket, upload_id, "checksumIsNotCorrect", 0)
+            return
+
+        try:
+            image = await ImageService.upload_file(path, digest, db, upload.folder)
+        except InvalidImageError:
+            await self._send_upload_error(websocket, upload_id, "invalidFileType")
+            return
+
+        await self.create_message(user_id, recipient_id, dialog_id, text, image, db)
+
+    async def _send_upload_error(
+            self,
+            websocket: WebSocket,
+            upload_id: Optional[PyObjectId],
+            translation_key: str,
+            offset: Optional[int] = None
+    ) -> None:
+        """
+        Send upload error to the connection.
+
+        :param websocket: Websocket connection.
+        :param upload_id: Upload ID.
+        :param translation_key: Error translation key.
+        :param offset: Current offset of the upload (the client resumes from it).
+        """
+
+        await self._send_message({
+            "type": SocketSendTypesEnum.UPLOAD_ERROR,
+            "uploadId": str(upload_id) if upload_id else None,
+            "translation": translation_key,
+            "offset": offset,
+        }, websocket=websocket)
+
     async def _handle_read_message(
             self,
             message_id: PyObjectId,
@@ -236,6 +492,9 @@ class SocketService(SocketBase):
 
         recipient_id = await self._get_recipient_id(user_id, dialog_id, db)
 
+        # Unread counters of the dialog are changed.
+        SearchCacheService.invalidate_users([user_id, recipient_id])
+
         await self._send_personal_message_by_user_id({
             "type": SocketSendTypesEnum.READ_MESSAGE,
             "messageId": str(message.id),
@@ -267,5 +526,128 @@ class SocketService(SocketBase):
             "lastActivity": user.last_activity,
         })
 
+    async def _handle_search(
+            self,
+            websocket: WebSocket,
+            user_id: PyObjectId,
+            query: Optional[str],
+            request_id: Optional[str],
+            pagination: SkipAndLimitModel,
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Handle search event.
+
+        The search runs in background, so the connection keeps receiving events. A newer search cancels the previous
+        one, so only the results of the latest query are sent.
+
+        :param websocket: Websocket connection.
+        :param user_id: User id.
+        :param query: Search query.
+        :param request_id: Client ID of the search request (it is sent back with the results).
+        :param pagination: Messages pagination.
+        :param db: Database connection.
+        """
+
+        connection = self.find_connection_by_websocket(websocket)
+        if not connection:
+            return
+
+        if connection.search_task is not None and not connection.search_task.done():
+            connection.search_task.cancel()
+
+        if not query or not query.strip():
+            connection.search_cache = None
+            return
+
+        current_user = await UserService.get_by_id(user_id, db)
+        if not current_user:
+            return
+
+        connection.search_task = asyncio.create_task(
+            self._stream_search(connection, current_user, query, request_id, pagination, db)
+        )
+        connection.search_task.add_done_callback(
+            lambda task: self._on_search_done(task, connection, query, request_id)
+        )
+
+    def _on_search_done(
+            self,
+            task: asyncio.Task,
+            connection: ConnectionModel,
+            query: str,
+            request_id: Optional[str]
+    ) -> None:
+        """
+        Handle the end of the search task (the failed search is logged and finished for the client).
+
+        :param task: Search task.
+        :param connection: Websocket connection.
+        :param query: Search query.
+        :param request_id: Client ID of the search request.
+        """
+
+        if task.cancelled() or task.exception() is None:
+            return
+
+        logger.error("Search failed.", exc_info=task.exception())
+
+        # The client has already started a newer search.
+        if connection.search_task is not task:
+            return
+
+        connection.search_task = asyncio.create_task(self._send_message({
+            "type": SocketSendTypesEnum.SEARCH_DONE,
+            "requestId": request_id,
+            "query": query,
+            "error": True,
+        }, websocket=connection.websocket))
+
+    async def _stream_search(
+            self,
+            connection: ConnectionModel,
+            current_user: UserModel,
+            query: str,
+            request_id: Optional[str],
+            pagination: SkipAndLimitModel,
+            db: AsyncIOMotorClient
+    ) -> None:
+        """
+        Send search results to the connection section by section.
+
+        :param connection: Websocket connection.
+        :param current_user: Current user.
+        :param query: Search query.
+        :param request_id: Client ID of the search request.
+        :param pagination: Messages pagination.
+        :param db: Database connection.
+        """
+
+        cache = SearchCacheModel(query=query)
+
+        async for result in SearchService.stream(query, current_user, db, connection.search_cache, pagination.skip,
+                                                 pagination.limit):
+            # Only complete sections can be reused by the next (refined) query.
+            if not result.timed_out and not result.truncated:
+                if result.section == SearchSectionsEnum.DIALOGS:
+                    cache.dialogs = result.data
+                elif result.section == SearchSectionsEnum.USERS:
+                    cache.users = result.data
+
+            await self._send_message({
+                "type": SocketSendTypesEnum.SEARCH_RESULT,
+                "requestId": request_id,
+                "query": query,
+                **jsonable_encoder(result),
+            }, websocket=connection.websocket)
+
+        connection.search_cache = cache
+
+        await self._send_message({
+            "type": SocketSendTypesEnum.SEARCH_DONE,
+            "requestId": request_id,
+            "query": query,
+        }, websocket=connection.websocket)
+
 
 socket_service = SocketService()
@@ -43,6 +43,29 @@ def test_get_first_dialog_messages(client: TestClient, get_user_headers: dict[st
     assert request.status_code == 200
 
 
+def test_get_first_dialog_media(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for `get first dialog media` endpoint. """
+
+    request = client.get("/api/dialogs/me", headers=get_user_headers)
+    response = request.json()
+
+    assert request.status_code == 200
+    assert "mediaCount" in response[0]
+
+    dialog_id = response[0]["id"]
+
+    request = client.get(f"/api/dialogs/{dialog_id}/media", headers=get_user_headers)
+    assert request.status_code == 200
+    assert isinstance(request.json(), list)
+
+
+def test_get_foreign_dialog_media(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for `get dialog media` endpoint with a dialog of other users. """
+
+    request = client.get("/api/dialogs/5f9f1b9b9b9b9b9b9b9b9b9b/media", headers=get_user_headers)
+    assert request.status_code == 404
+
+
 def test_update_dialog(client: TestClient, get_user_headers: dict[str, str]) -> None:
     """ Test for `update dialog` endpoint. """
 
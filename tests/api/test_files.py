@@ -0,0 +1,154 @@
+import io
+import os
+from urllib.parse import urlsplit
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from PIL import Image
+from starlette.testclient import TestClient
+
+from app.common.constants import PUBLIC_FOLDER, USERS_COLLECTION, IMMUTABLE_FILE_MAX_AGE
+from app.database.migrations.image_storage import migrate
+from app.models.user.user import UserModel
+from app.services.image.serving import BLOB_PATH_PATTERN
+from tests.utils.utils import random_lower_string, random_email
+
+
+def create_image(color: tuple[int, int, int]) -> bytes:
+    """ Create PNG image. """
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, "PNG")
+
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def image_path(client: TestClient, get_user_headers: dict[str, str]) -> str:
+    """ Upload avatar and get the path of its URL. """
+
+    file = create_image((255, 0, 0))
+    request = client.put("/api/users/me/avatar", files={"file": ("avatar.png", file, "image/png")},
+                         headers=get_user_headers)
+
+    return urlsplit(request.json()["photoURL"]).path
+
+
+def test_get_file(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint, content-addressed files are immutable. """
+
+    request = client.get(image_path)
+    name = BLOB_PATH_PATTERN.match(image_path.split("/", 3)[3]).group("name")
+
+    assert request.status_code == 200
+    assert request.headers["etag"] == f'"{name}"'
+    assert request.headers["cache-control"] == f"public, max-age={IMMUTABLE_FILE_MAX_AGE}, immutable"
+    assert request.headers["accept-ranges"] == "bytes"
+    assert request.headers["content-type"].startswith("image/")
+    assert int(request.headers["content-length"]) == len(request.content)
+
+
+def test_head_file(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint with HEAD request. """
+
+    size = len(client.get(image_path).content)
+    request = client.head(image_path)
+
+    assert request.status_code == 200
+    assert int(request.headers["content-length"]) == size
+    assert request.content == b""
+
+
+def test_get_file_not_modified(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint with a cached file. """
+
+    etag = client.get(image_path).headers["etag"]
+    request = client.get(image_path, headers={"If-None-Match": etag})
+
+    assert request.status_code == 304
+    assert request.headers["etag"] == etag
+    assert request.content == b""
+
+
+def test_get_file_range(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint with byte ranges. """
+
+    file = client.get(image_path).content
+
+    request = client.get(image_path, headers={"Range": "bytes=0-9"})
+
+    assert request.status_code == 206
+    assert request.headers["content-range"] == f"bytes 0-9/{len(file)}"
+    assert request.content == file[:10]
+
+    request = client.get(image_path, headers={"Range": "bytes=-5"})
+
+    assert request.status_code == 206
+    assert request.content == file[-5:]
+
+    # The range is ignored if the file was changed.
+    request = client.get(image_path, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+
+    assert request.status_code == 200
+    assert request.content == file
+
+
+def test_get_file_range_not_satisfiable(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint with a range outside the file. """
+
+    size = len(client.get(image_path).content)
+    request = client.get(image_path, headers={"Range": f"bytes={size}-"})
+
+    assert request.status_code == 416
+    assert request.headers["content-range"] == f"bytes */{size}"
+
+
+def test_get_file_not_found(client: TestClient, image_path: str) -> None:
+    """ Test for `get file` endpoint with paths outside the public folders and hidden files. """
+
+    folder = image_path.split("/")[2]
+
+    for path in (
+            f"/{PUBLIC_FOLDER}/{folder}/.{random_lower_string()}.part",
+            f"/{PUBLIC_FOLDER}/{folder}/%2E%2E/%2E%2E/app/main.py",
+            f"/{PUBLIC_FOLDER}/{folder}/{random_lower_string()}.png",
+    ):
+        assert client.get(path).status_code == 404
+
+
+def test_migrate_legacy_image(client: TestClient, db: AsyncIOMotorClient) -> None:
+    """ Test for migration of legacy images into the content-addressed layout. """
+
+    file = create_image((0, 255, 0))
+    name = f"{random_lower_string()}.png"
+    os.makedirs(os.path.join(PUBLIC_FOLDER, "avatars"), exist_ok=True)
+    with open(os.path.join(PUBLIC_FOLDER, "avatars", name), "wb") as legacy_file:
+        legacy_file.write(file)
+
+    user = UserModel(
+        username=random_lower_string(),
+        email=random_email(),
+        first_name="test",
+        photo_url=f"http://localhost:8000/{PUBLIC_FOLDER}/avatars/{name}",
+        password="9328490289304829385902385902838435345234",
+        is_test=True
+    )
+    async def run_migration() -> tuple[int, dict]:
+        await db[USERS_COLLECTION].insert_one(user.mongo())
+        count = await migrate(db)
+
+        return count, await db[USERS_COLLECTION].find_one({"_id": user.id})
+
+    # The migration runs in the event loop of the application (the database client is bound to it).
+    count, migrated = client.portal.call(run_migration)
+    path = urlsplit(migrated["photoURL"]).path
+
+    assert count >= 1
+
+    assert BLOB_PATH_PATTERN.match(path.split("/", 3)[3])
+    assert not os.path.exists(os.path.join(PUBLIC_FOLDER, "avatars", name))
+
+    request = client.get(path)
+
+    assert request.status_code == 200
+    assert request.content == file
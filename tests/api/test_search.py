@@ -1,3 +1,4 @@
+import pytest
 from motor.motor_asyncio import AsyncIOMotorClient
 from starlette.testclient import TestClient
 
@@ -17,6 +18,15 @@ def test_global_search(client: TestClient, get_user_headers: dict[str, str]) ->
     assert "messages" in response
 
 
+def test_global_search_incorrect_users_cursor(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for `global search` endpoint with incorrect users cursor. """
+
+    params = {"query": "test", "usersCursor": "9:test"}
+    request = client.get("/api/search", params=params, headers=get_user_headers)
+
+    assert request.status_code == 422
+
+
 def test_in_dialog_search(client: TestClient, get_user_headers: dict[str, str], db: AsyncIOMotorClient) -> None:
     """ Test for `in dialog search` endpoint. """
 
@@ -37,4 +47,38 @@ def test_in_dialog_search(client: TestClient, get_user_headers: dict[str, str],
     response = request.json()
 
     assert request.status_code == 200
-    assert "messages" in response
\ No newline at end of file
+    assert "messages" in response
+
+
+def test_global_search_cache_metrics(
+        client: TestClient,
+        get_user_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """ Test that repeated `global search` is served from the search cache. """
+
+    monkeypatch.setattr("app.api.endpoints.metrics.METRICS_TOKEN", "metrics-token")
+
+    client.get("/api/search", params={"query": "cached"}, headers=get_user_headers)
+    client.get("/api/search", params={"query": "cached"}, headers=get_user_headers)
+
+    request = client.get("/api/metrics", headers={"X-Metrics-Token": "metrics-token"})
+    response = request.json()
+
+    assert request.status_code == 200
+    assert response["counters"]['search_cache_hits{section="users"}'] >= 1
+    assert 'search_cache_hit_rate{section="users"}' in response["gauges"]
+
+
+def test_metrics_not_available_to_users(
+        client: TestClient,
+        get_user_headers: dict[str, str],
+        monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """ Test that metrics aren't available without the metrics token (also to logged-in users). """
+
+    monkeypatch.setattr("app.api.endpoints.metrics.METRICS_TOKEN", "metrics-token")
+
+    assert client.get("/api/metrics").status_code == 404
+    assert client.get("/api/metrics", headers=get_user_headers).status_code == 404
+    assert client.get("/api/metrics", headers={"X-Metrics-Token": "other"}).status_code == 404
@@ -0,0 +1,111 @@
+import hashlib
+import io
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from PIL import Image
+from starlette.testclient import TestClient
+
+from tests.utils.user import create_fake_user
+
+
+def create_image() -> bytes:
+    """ Create PNG image. """
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (0, 0, 255)).save(buffer, "PNG")
+
+    return buffer.getvalue()
+
+
+def create_dialog(client: TestClient, headers: dict[str, str], db: AsyncIOMotorClient) -> str:
+    """ Create dialog with a new user. """
+
+    user = create_fake_user(db)
+    request = client.post("/api/dialogs", json={"toUserId": user["id"]}, headers=headers)
+
+    return request.json()["id"]
+
+
+def test_resumable_upload(client: TestClient, get_user_headers: dict[str, str], db: AsyncIOMotorClient) -> None:
+    """ Test for `resumable upload` endpoints. """
+
+    file = create_image()
+    half = len(file) // 2
+
+    data = {"size": len(file), "checksum": hashlib.sha256(file).hexdigest()}
+    request = client.post("/api/uploads", json=data, headers=get_user_headers)
+    response = request.json()
+
+    assert request.status_code == 200
+    assert response["offset"] == 0
+    upload_id = response["id"]
+
+    headers = {**get_user_headers, "Upload-Offset": "0"}
+    request = client.patch(f"/api/uploads/{upload_id}", content=file[:half], headers=headers)
+
+    assert request.status_code == 200
+    assert request.json()["offset"] == half
+
+    # The chunk is sent again (e.g. its response was lost).
+    request = client.patch(f"/api/uploads/{upload_id}", content=file[:half], headers=headers)
+
+    assert request.status_code == 409
+    assert request.headers["Upload-Offset"] == str(half)
+
+    request = client.get(f"/api/uploads/{upload_id}", headers=get_user_headers)
+
+    assert request.status_code == 200
+    assert request.json()["offset"] == half
+
+    headers = {**get_user_headers, "Upload-Offset": str(half)}
+    request = client.patch(f"/api/uploads/{upload_id}", content=file[half:], headers=headers)
+
+    assert request.status_code == 200
+    assert request.json()["offset"] == len(file)
+
+    dialog_id = create_dialog(client, get_user_headers, db)
+
+    data = {"dialogId": dialog_id, "text": "Image"}
+    request = client.post(f"/api/uploads/{upload_id}/finalize", json=data, headers=get_user_headers)
+    response = request.json()
+
+    assert request.status_code == 200
+    assert response["url"]
+    assert response["variants"]
+
+    # The image is sent in a message, so it is in the dialog media.
+    request = client.get(f"/api/dialogs/{dialog_id}/media", headers=get_user_headers)
+
+    assert request.status_code == 200
+    assert request.json()[0]["file"] == response["url"]
+
+    request = client.get(f"/api/uploads/{upload_id}", headers=get_user_headers)
+    assert request.status_code == 404
+
+
+def test_resumable_upload_checksum_mismatch(
+        client: TestClient,
+        get_user_headers: dict[str, str],
+        db: AsyncIOMotorClient
+) -> None:
+    """ Test for `resumable upload` endpoints with a corrupted file. """
+
+    file = create_image()
+
+    data = {"size": len(file), "checksum": hashlib.sha256(b"other").hexdigest()}
+    request = client.post("/api/uploads", json=data, headers=get_user_headers)
+    upload_id = request.json()["id"]
+
+    headers = {**get_user_headers, "Upload-Offset": "0"}
+    request = client.patch(f"/api/uploads/{upload_id}", content=file, headers=headers)
+    assert request.status_code == 200
+
+    data = {"dialogId": create_dialog(client, get_user_headers, db)}
+    request = client.post(f"/api/uploads/{upload_id}/finalize", json=data, headers=get_user_headers)
+    assert request.status_code == 422
+
+    # The upload is kept, so the file can be sent again.
+    request = client.get(f"/api/uploads/{upload_id}", headers=get_user_headers)
+
+    assert request.status_code == 200
+    assert request.json()["offset"] == 0
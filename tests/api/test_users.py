@@ -2,6 +2,7 @@ import urllib.request
 from fastapi.testclient import TestClient
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.common.constants import IMAGE_VARIANT_SIZES
 from tests.utils.user import create_fake_user
 
 
@@ -60,6 +61,37 @@ def test_update_my_avatar(client: TestClient, get_user_headers: dict[str, str])
 
         assert request.status_code == 200
         assert "photoURL" in response
+        assert set(response["photoVariants"]) == {str(size) for size in IMAGE_VARIANT_SIZES}
+
+
+def test_update_my_avatar_deduplicated(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for `update my avatar` endpoint, identical images are stored once. """
+
+    file_url = "https://avatars.githubusercontent.com/u/45159366?v=4"
+    headers = {'Content-Type': 'multipart/form-data; boundary=--------------------------', **get_user_headers}
+
+    with urllib.request.urlopen(file_url) as response:
+        file = response.read()
+
+    urls = []
+    for _ in range(2):
+        request = client.put("/api/users/me/avatar", files={"file": ("avatar.png", file, "image/png")}, headers=headers)
+
+        assert request.status_code == 200
+        urls.append(request.json()["photoURL"])
+
+    assert urls[0] == urls[1]
+
+
+def test_update_my_avatar_invalid_image(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for `update my avatar` endpoint with a file that isn't an image. """
+
+    headers = {'Content-Type': 'multipart/form-data; boundary=--------------------------', **get_user_headers}
+
+    request = client.put("/api/users/me/avatar", files={"file": ("avatar.png", b"not an image", "image/png")},
+                         headers=headers)
+
+    assert request.status_code == 422
 
 
 def test_add_to_blacklist(client: TestClient, get_user_headers: dict[str, str], db) -> None:
@@ -0,0 +1,20 @@
+from app.models.user.settings import LanguagesEnum
+from app.services.mail.templates import EmailTemplateService
+
+
+def test_render_template_language_variant() -> None:
+    """ Test that the language variant of the email template is rendered. """
+
+    html = EmailTemplateService.render("activation", LanguagesEnum.RUSSIAN, username="john", url="https://example.com")
+
+    assert "Здравствуйте, <b>john</b>" in html
+    assert 'href="https://example.com"' in html
+
+
+def test_render_template_fallback() -> None:
+    """ Test that the default email template is rendered for languages without a variant. """
+
+    for language in (LanguagesEnum.ENGLISH, LanguagesEnum.ESTONIAN):
+        html = EmailTemplateService.render("activation", language, username="john", url="https://example.com")
+
+        assert "Hello, <b>john</b>" in html
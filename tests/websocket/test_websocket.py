@@ -1,10 +1,15 @@
 import base64
+import hashlib
+import io
 import urllib
 
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from PIL import Image
 from starlette.testclient import TestClient
 
 from app.services.websocket.base import SocketReceiveTypesEnum
+from app.services.websocket.socket import UPLOAD_FRAME_HEADER
 from tests.utils.user import create_fake_user
 
 
@@ -92,4 +97,89 @@ def test_websocket_send_message_with_file(client: TestClient, get_user_headers:
     response = request.json()
 
     assert request.status_code == 200
-    assert response[-1]["text"] == "test"
\ No newline at end of file
+    assert response[-1]["text"] == "test"
+
+
+def test_websocket_search(client: TestClient, get_user_headers: dict[str, str]) -> None:
+    """ Test for websocket search. """
+
+    token = get_user_headers["Authorization"].split(" ")[1]
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        data = websocket.receive_json()
+        assert data["ping"] == "pong"
+
+        websocket.send_json({"type": SocketReceiveTypesEnum.SEARCH, "query": "test", "requestId": "1"})
+
+        sections = set()
+        data = websocket.receive_json()
+        while data["type"] == "SEARCH_RESULT":
+            assert data["requestId"] == "1"
+            sections.add(data["section"])
+
+            data = websocket.receive_json()
+
+        assert data["type"] == "SEARCH_DONE"
+        assert sections == {"dialogs", "messages", "users"}
+
+
+def test_websocket_upload_file(client: TestClient, get_user_headers: dict[str, str], db: AsyncIOMotorClient) -> None:
+    """ Test for websocket chunked upload (resumed after a reconnect). """
+
+    token = get_user_headers["Authorization"].split(" ")[1]
+
+    user = create_fake_user(db)
+    request = client.post("/api/dialogs", json={"toUserId": user["id"]}, headers=get_user_headers)
+    assert request.status_code == 200
+    dialog_id = request.json()["id"]
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (255, 0, 0)).save(buffer, "PNG")
+    file = buffer.getvalue()
+    half = len(file) // 2
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        assert websocket.receive_json()["ping"] == "pong"
+
+        websocket.send_json({
+            "type": SocketReceiveTypesEnum.UPLOAD_BEGIN,
+            "size": len(file),
+            "checksum": hashlib.sha256(file).hexdigest(),
+        })
+
+        data = websocket.receive_json()
+        assert data["type"] == "UPLOAD_READY"
+        assert data["offset"] == 0
+        upload_id = data["uploadId"]
+
+        websocket.send_bytes(UPLOAD_FRAME_HEADER.pack(ObjectId(upload_id).binary, 0) + file[:half])
+
+        data = websocket.receive_json()
+        assert data["type"] == "UPLOAD_ACK"
+        assert data["offset"] == half
+
+    with client.websocket_connect(f"/ws?token={token}") as websocket:
+        assert websocket.receive_json()["ping"] == "pong"
+
+        websocket.send_json({"type": SocketReceiveTypesEnum.UPLOAD_BEGIN, "uploadId": upload_id})
+
+        data = websocket.receive_json()
+        assert data["type"] == "UPLOAD_READY"
+        assert data["offset"] == half
+
+        websocket.send_bytes(UPLOAD_FRAME_HEADER.pack(ObjectId(upload_id).binary, half) + file[half:])
+
+        data = websocket.receive_json()
+        assert data["type"] == "UPLOAD_ACK"
+        assert data["offset"] == len(file)
+
+        websocket.send_json({
+            "type": SocketReceiveTypesEnum.UPLOAD_COMMIT,
+            "uploadId": upload_id,
+            "dialogId": dialog_id,
+            "text": "test",
+        })
+
+        data = websocket.receive_json()
+        assert data["type"] == "RECEIVE_MESSAGE"
+        assert data["message"]["file"]